@@ -2,11 +2,23 @@ from http.server import BaseHTTPRequestHandler
 import json
 import sys
 import os
-from datetime import datetime
 
 # Add the parent directory to sys.path so we can import from app
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from app.intents import FALLBACK_REPLIES, IntentRouter, render
+from app.workpool import DeadlinePool
+
+# Same local answers as the FastAPI app; kept per warm instance
+_intents = IntentRouter()
+
+# Bedrock calls run on one bounded pool per warm instance: at most
+# CHAT_WORKERS upstream calls plus CHAT_QUEUE waiting, each abandoned (and its
+# retries cancelled) once CHAT_TIMEOUT passes
+CHAT_TIMEOUT = float(os.getenv("CHAT_TIMEOUT", "10"))
+_bedrock_pool = DeadlinePool("chat-bedrock", workers=int(os.getenv("CHAT_WORKERS", "4")),
+                             max_queue=int(os.getenv("CHAT_QUEUE", "8")))
+
 class handler(BaseHTTPRequestHandler):
     def do_POST(self):
         try:
@@ -29,58 +41,44 @@ class handler(BaseHTTPRequestHandler):
                 self.wfile.write(json.dumps({'error': 'Empty text'}).encode())
                 return
             
-            # Handle special built-in queries
+            # Handle special built-in queries; local answers are final and skip the cleanup
+            # below, exactly as the FastAPI app returns them
             q = text.lower()
-            if "date" in q and "update" not in q:
-                reply = datetime.now().strftime("Today is %B %d, %Y.")
-            elif "time" in q:
-                reply = datetime.now().strftime("It's %I:%M %p.")
-            elif q in {"what's your name","whats your name","your name?","who are you"}:
-                reply = "Rem."
-            else:
+            final_reply = _intents.answer(text)
+            if not final_reply:
                 # Use full AI with personality styles and conversation history (with timeout)
-                import threading
-                import time
-                
-                result = [None]
-                error = [None]
-                
-                def ai_call():
-                    try:
-                        result[0] = bedrock_reply(_compose_system(PERSONA_BLESSED_BOY, style), session_id, text, style)
-                    except Exception as e:
-                        error[0] = e
-                
-                # Start AI call in separate thread with 10 second timeout
-                thread = threading.Thread(target=ai_call)
-                thread.daemon = True
-                thread.start()
-                thread.join(timeout=10)
+                status, value = _bedrock_pool.run(
+                    lambda cancel: bedrock_reply(_compose_system(PERSONA_BLESSED_BOY, style), session_id, text, style,
+                                                 cancel=cancel),
+                    CHAT_TIMEOUT)
                 
-                if thread.is_alive():
-                    # AI call timed out
-                    if "hello" in q or "hi" in q or "hey" in q:
-                        reply = "Hello! I'm Rem. How can I help you today?"
+                # Greetings still get a proper answer when they are not served locally
+                hit = _intents.match(text)
+                greeting = render(*hit) if hit and hit[0] == "greeting" else None
+                if status in ("timeout", "rejected"):
+                    # AI call timed out, or every worker and queue slot is taken
+                    if greeting:
+                        reply = greeting
                     elif "how are you" in q:
-                        reply = "I'm doing great! Thanks for asking. What would you like to chat about?"
+                        reply = FALLBACK_REPLIES["how_are_you"]
                     elif "what" in q and ("doing" in q or "up" in q):
-                        reply = "Just here chatting with you! What's on your mind?"
+                        reply = FALLBACK_REPLIES["whats_up"]
                     else:
-                        reply = "I'm here and ready to chat! Could you try asking that again?"
-                elif error[0]:
+                        reply = FALLBACK_REPLIES["retry"]
+                elif status == "error":
                     # AI call failed
-                    if "hello" in q or "hi" in q or "hey" in q:
-                        reply = "Hello! I'm Rem. How can I help you today?"
+                    if greeting:
+                        reply = greeting
                     elif "how are you" in q:
-                        reply = "I'm doing great! Thanks for asking. What would you like to chat about?"
+                        reply = FALLBACK_REPLIES["how_are_you"]
                     else:
-                        reply = "I'm here and ready to chat! Could you try asking that again?"
+                        reply = FALLBACK_REPLIES["retry"]
                 else:
                     # AI call succeeded
-                    reply = result[0] or "I'm here and ready to help!"
-            
-            # Clean the response and maintain identity
-            final_reply = enforce_identity(reply)
+                    reply = value or FALLBACK_REPLIES["ready"]
+
+                # Clean the response and maintain identity
+                final_reply = enforce_identity(reply)
             
             # Add to conversation history for context
             add_turn(session_id, "user", text)
@@ -109,6 +107,14 @@ class handler(BaseHTTPRequestHandler):
         self.end_headers()
     
     def do_GET(self):
+        if 'stats' in self.path.partition('?')[2]:
+            # Queue depth and abandoned-work counters for this warm instance
+            self.send_response(200)
+            self.send_header('Content-type', 'application/json')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            self.wfile.write(json.dumps({'bedrock_pool': _bedrock_pool.stats(), 'intents': _intents.stats()}).encode())
+            return
         self.send_response(405)
         self.send_header('Content-type', 'application/json')
         self.send_header('Access-Control-Allow-Origin', '*')
@@ -20,7 +20,7 @@ class handler(BaseHTTPRequestHandler):
             messages = get_msgs(session_id)
             
             # Also show raw history
-            raw_history = dict(_history)
+            raw_turns = [{'role': t.role, 'content': t.text} for t in _history.turns(session_id)]
             
             self.send_response(200)
             self.send_header('Content-type', 'application/json')
@@ -29,8 +29,9 @@ class handler(BaseHTTPRequestHandler):
             
             response = {
                 'status': 'success',
-                'raw_history_keys': list(raw_history.keys()),
-                'test_session_raw': list(raw_history.get('test', [])),
+                'raw_history_keys': _history.session_ids(),
+                'test_session_raw': raw_turns,
+                'history_stats': _history.stats(),
                 'formatted_messages': messages,
                 'message_count': len(messages)
             }
@@ -11,7 +11,8 @@ class handler(BaseHTTPRequestHandler):
         try:
             # Import sing functions
             from app.utils import polly_sing_with_visemes
-            from fastapi import HTTPException
+            from app.lang_detect import detect
+            from app.voices import voice_for
             
             content_length = int(self.headers.get('Content-Length', 0))
             post_data = self.rfile.read(content_length)
@@ -29,8 +30,16 @@ class handler(BaseHTTPRequestHandler):
                 self.wfile.write(json.dumps({'error': 'Provide lyrics to sing'}).encode())
                 return
             
+            # No language from the page: identify it (Hinglish included) to pick a native voice
+            if not lang or lang == 'auto':
+                lang = detect(text)
+            voice = voice_for(lang) if lang and lang.split('-')[0].lower() != 'en' else None
+            
             # Generate singing
-            audio_b64, marks = polly_sing_with_visemes(text, lang, mode)
+            result = polly_sing_with_visemes(text, voice)
+            if 'error' in result:
+                raise RuntimeError(result['error'])
+            audio_b64, marks = result['audio'], result['visemes']
             
             self.send_response(200)
             self.send_header('Content-type', 'application/json')
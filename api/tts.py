@@ -11,6 +11,8 @@ class handler(BaseHTTPRequestHandler):
         try:
             # Import TTS functions
             from app.utils import polly_tts_with_visemes
+            from app.lang_detect import detect
+            from app.voices import voice_for
             
             content_length = int(self.headers.get('Content-Length', 0))
             post_data = self.rfile.read(content_length)
@@ -28,31 +30,16 @@ class handler(BaseHTTPRequestHandler):
                 self.wfile.write(json.dumps({'error': 'Provide text to speak'}).encode())
                 return
             
-            # Detect Hinglish (Hindi written in English letters) and common Hindi words
-            hinglish_words = [
-                'aap', 'aapka', 'aapki', 'haan', 'nahin', 'nahi', 'kya', 'kaise', 'kab', 'kahan', 
-                'kyun', 'kaun', 'main', 'meri', 'mera', 'mujhe', 'tumhara', 'tumhari', 'tumhe',
-                'woh', 'yeh', 'yah', 'iske', 'uske', 'iska', 'uska', 'bahut', 'accha', 'achha',
-                'bura', 'theek', 'thik', 'samjha', 'samjhi', 'pata', 'malum', 'dekho', 'suno',
-                'bol', 'bolo', 'kar', 'karo', 'mat', 'padh', 'padho', 'likh', 'likho', 'chal',
-                'chalo', 'aa', 'aao', 'ja', 'jao', 'paani', 'pani', 'khana', 'ghar', 'kaam',
-                'kitna', 'kitni', 'kuch', 'sab', 'sabhi', 'mere', 'tere', 'humara', 'tumhara',
-                'bhi', 'toh', 'to', 'se', 'mein', 'pe', 'par', 'ke', 'ki', 'ka', 'hai', 'hain',
-                'tha', 'thi', 'the', 'hoga', 'hogi', 'honge', 'dost', 'bhai', 'behen', 'mama',
-                'papa', 'dada', 'dadi', 'nana', 'nani', 'beta', 'beti'
-            ]
-            
-            # Check if text contains significant Hinglish words
-            text_words = text.lower().split()
-            hinglish_count = sum(1 for word in text_words if word in hinglish_words)
-            hinglish_ratio = hinglish_count / len(text_words) if text_words else 0
-            
-            # If more than 20% of words are Hinglish, switch to Hindi TTS
-            if hinglish_ratio > 0.2 and not lang:
-                lang = 'hi-IN'  # Switch to Hindi TTS automatically
+            # No language from the page: identify it (Hinglish included) to pick a native voice
+            if not lang or lang == 'auto':
+                lang = detect(text)
+            voice = voice_for(lang) if lang and lang.split('-')[0].lower() != 'en' else None
             
             # Generate speech
-            audio_b64, marks = polly_tts_with_visemes(text, lang, mode)
+            result = polly_tts_with_visemes(text, voice)
+            if 'error' in result:
+                raise RuntimeError(result['error'])
+            audio_b64, marks = result['audio'], result['visemes']
             
             self.send_response(200)
             self.send_header('Content-type', 'application/json')
@@ -0,0 +1,92 @@
+"""Pre-synthesized speech for replies the app says over and over.
+
+An ``AudioPack`` maps TTS cache keys to (audio, marks) and is held in memory
+with no expiry or eviction. It is persisted as one JSON file named after its
+``version``, a hash of everything that shapes the audio (phrases, voices,
+prosody, viseme source). A pack written under other settings is ignored and
+rendered again instead of serving stale audio.
+"""
+import base64, hashlib, json, os, tempfile, threading, time
+from typing import Dict, Iterable, Optional, Tuple
+
+FORMAT = 1
+
+def pack_version(*parts) -> str:
+    blob = json.dumps([FORMAT, *parts], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()[:12]
+
+class AudioPack:
+    def __init__(self, directory: str, version: str):
+        self.directory = directory
+        self.version = version
+        self._data: Dict[str, Tuple[bytes, list]] = {}
+        self._lock = threading.Lock()
+        self.hits = self.loaded = self.rendered = 0
+        self.saved_at: Optional[float] = None
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, f"audio_pack-{self.version}.json")
+
+    def get(self, key: str) -> Optional[Tuple[bytes, list]]:
+        rec = self._data.get(key)
+        if rec is not None:
+            self.hits += 1
+        return rec
+
+    def put(self, key: str, audio: bytes, marks: list):
+        with self._lock:
+            self._data[key] = (bytes(audio), marks)
+        self.rendered += 1
+
+    def missing(self, keys: Iterable[str]) -> list:
+        return [k for k in keys if k not in self._data]
+
+    def load(self) -> int:
+        """Read this version's pack from disk; returns the number of entries loaded."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                doc = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if doc.get("version") != self.version:
+            return 0
+        entries = {k: (base64.b64decode(v["audio_b64"]), v.get("marks") or [])
+                   for k, v in doc.get("entries", {}).items()}
+        with self._lock:
+            for k, rec in entries.items():
+                self._data.setdefault(k, rec)
+        self.loaded = len(entries)
+        return self.loaded
+
+    def save(self):
+        """Write the pack atomically (temp file + rename) so readers never see half a file."""
+        with self._lock:
+            entries = {k: {"audio_b64": base64.b64encode(a).decode("ascii"), "marks": m}
+                       for k, (a, m) in self._data.items()}
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".audio_pack-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"version": self.version, "created": time.time(), "entries": entries}, f,
+                          ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except BaseException:
+            try: os.unlink(tmp)
+            except OSError: pass
+            raise
+        self.saved_at = time.time()
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = sum(len(a) for a, _ in self._data.values())
+            entries = len(self._data)
+        return {
+            "version": self.version,
+            "entries": entries,
+            "bytes": size,
+            "hits": self.hits,
+            "loaded": self.loaded,
+            "rendered": self.rendered,
+            "saved_at": self.saved_at,
+        }
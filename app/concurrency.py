@@ -0,0 +1,261 @@
+"""Async admission gates and the shared executor for blocking AWS calls.
+
+boto3 has no native asyncio support, so every Bedrock/Polly call is pushed onto
+a dedicated, bounded thread pool. Waiting for a gate slot or sleeping between
+retries happens on the event loop and never holds a thread.
+"""
+import asyncio, functools, os, random, threading, time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Optional
+
+UPSTREAM_IO_THREADS = int(os.getenv("UPSTREAM_IO_THREADS", "128"))
+_io_pool = ThreadPoolExecutor(max_workers=UPSTREAM_IO_THREADS, thread_name_prefix="upstream-io")
+
+# Secondary pool for calls fanned out from *inside* an upstream call (e.g. the
+# viseme request that runs alongside audio synthesis). Kept separate so a
+# saturated I/O pool can never deadlock waiting on its own sub-tasks.
+POLLY_SIDE_THREADS = int(os.getenv("POLLY_SIDE_THREADS", "16"))
+_side_pool = ThreadPoolExecutor(max_workers=POLLY_SIDE_THREADS, thread_name_prefix="polly-side")
+
+def submit_side(fn: Callable, *args, **kwargs) -> Future:
+    return _side_pool.submit(fn, *args, **kwargs)
+
+async def run_io(fn: Callable, *args, **kwargs) -> Any:
+    """Run a blocking upstream call on the I/O pool and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_io_pool, functools.partial(fn, *args, **kwargs))
+
+async def run_io_or_release(release: Callable[[Any], None], fn: Callable, *args, **kwargs) -> Any:
+    """``run_io`` for calls that return a resource (e.g. an open response stream).
+
+    If the caller is cancelled before ``fn`` returns, the thread keeps running;
+    ``release(result)`` is called once it finishes so the resource is not leaked.
+    """
+    loop = asyncio.get_running_loop()
+    fut = loop.run_in_executor(_io_pool, functools.partial(fn, *args, **kwargs))
+    try:
+        return await asyncio.shield(fut)
+    except asyncio.CancelledError:
+        fut.add_done_callback(lambda f: f.cancelled() or f.exception() is not None or release(f.result()))
+        raise
+
+_DONE = object()
+
+def _next_or_done(it):
+    try:
+        return next(it)
+    except StopIteration:
+        return _DONE
+
+async def aiter_io(iterable: Iterable) -> AsyncIterator[Any]:
+    """Iterate a blocking iterable (e.g. a Bedrock event stream) from async code.
+
+    Each ``next()`` runs on the I/O pool, so a thread is only occupied while a
+    chunk is actually being read. Streams are still thread-bound: at most
+    ``UPSTREAM_IO_THREADS`` reads are in flight at once, and beyond that
+    streams wait for a pool thread.
+    """
+    it = iter(iterable)
+    while True:
+        item = await run_io(_next_or_done, it)
+        if item is _DONE:
+            return
+        yield item
+
+async def retry_sleep(attempt: int):
+    """Non-blocking exponential backoff with jitter (same curve as the sync path)."""
+    base = 0.25 * (2 ** attempt)
+    await asyncio.sleep(base + random.random() * 0.2)
+
+class AsyncGate:
+    """Awaitable counterpart of ``threading.Semaphore`` with an acquire timeout.
+
+    Usage mirrors the sync gates::
+
+        if not await gate.acquire(timeout=10):
+            raise HTTPException(429, "busy")
+        try: ...
+        finally: gate.release()
+    """
+
+    def __init__(self, limit: int):
+        self.limit = max(1, int(limit))
+        self._sem = asyncio.Semaphore(self.limit)
+        self.waiting = 0
+
+    async def acquire(self, timeout: Optional[float] = None) -> bool:
+        self.waiting += 1
+        try:
+            if timeout is None:
+                await self._sem.acquire()
+                return True
+            try:
+                await asyncio.wait_for(self._sem.acquire(), timeout)
+                return True
+            except asyncio.TimeoutError:
+                return False
+        finally:
+            self.waiting -= 1
+
+    def release(self):
+        self._sem.release()
+
+    @property
+    def in_use(self) -> int:
+        return self.limit - self._sem._value
+
+class AdaptiveGate:
+    """Admission gate whose limit adapts to the upstream (AIMD).
+
+    Same ``acquire(timeout)`` / ``release()`` contract as ``AsyncGate``. Callers
+    report outcomes with ``observe()``; while the gate is busy and calls are
+    healthy the limit grows by ``increase`` per ``limit`` successes, and a
+    throttle, or a latency beyond ``tolerance`` x the recent minimum, multiplies
+    it by ``decrease`` (at most once per ``cooldown`` seconds). Latencies of
+    different kinds of call (time to first token, a whole completion) are only
+    compared within their own ``series``. ``observe()`` is safe to call from I/O
+    threads: the update is handed to the event loop the gate is used on, which
+    also admits waiters as soon as the limit grows.
+    """
+
+    def __init__(self, name: str, initial: int, min_limit: int = 1, max_limit: int = 64,
+                 increase: float = 1.0, decrease: float = 0.7, tolerance: float = 2.5,
+                 cooldown: float = 1.0, window: int = 50):
+        self.name = name
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(self.max_limit, max(self.min_limit, initial)))
+        self.increase = increase
+        self.decrease = decrease
+        self.tolerance = tolerance
+        self.cooldown = cooldown
+        self._lat = deque(maxlen=window)
+        self._series: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+        self._last_cut = 0.0
+        self._in_use = 0
+        self._waiters: deque = deque()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.throttles = self.cuts = 0
+
+    # ---- queueing policy (overridable) -----------------------------------------
+    def _push(self, waiter: "asyncio.Future", **info):
+        self._waiters.append(waiter)
+
+    def _pop(self) -> Optional["asyncio.Future"]:
+        return self._waiters.popleft() if self._waiters else None
+
+    def _discard(self, waiter: "asyncio.Future"):
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def _queued(self) -> int:
+        return len(self._waiters)
+
+    # ---- admission ------------------------------------------------------------------
+    def _capacity(self) -> int:
+        return max(self.min_limit, int(self.limit))
+
+    def _wake(self):
+        while self._in_use < self._capacity():
+            w = self._pop()
+            if w is None:
+                return
+            if not w.done():
+                self._in_use += 1
+                w.set_result(True)
+
+    def try_acquire(self) -> bool:
+        """Take a slot only if one is free and nobody is waiting; never queues."""
+        if not self._queued() and self._in_use < self._capacity():
+            self._in_use += 1
+            return True
+        return False
+
+    async def acquire(self, timeout: Optional[float] = None, **info) -> bool:
+        self._loop = asyncio.get_running_loop()
+        if not self._queued() and self._in_use < self._capacity():
+            self._in_use += 1
+            return True
+        fut = asyncio.get_running_loop().create_future()
+        self._push(fut, **info)
+        self._wake()   # the limit may have grown since the last release
+        try:
+            await asyncio.wait_for(fut, timeout)
+            return True
+        except asyncio.TimeoutError:
+            self._discard(fut)
+            return False
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release()   # granted just as we were cancelled
+            else:
+                self._discard(fut)
+            raise
+
+    def release(self):
+        self._in_use -= 1
+        self._wake()
+
+    @property
+    def in_use(self) -> int:
+        return self._in_use
+
+    @property
+    def waiting(self) -> int:
+        return self._queued()
+
+    # ---- feedback -------------------------------------------------------------------
+    def observe(self, latency: Optional[float] = None, throttled: bool = False, series: str = ""):
+        now = time.monotonic()
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            if running is not loop:
+                # _in_use and the waiters belong to the loop; never touch them from a pool thread
+                loop.call_soon_threadsafe(self._observe, latency, throttled, series, now)
+                return
+        self._observe(latency, throttled, series, now)
+
+    def _observe(self, latency: Optional[float], throttled: bool, series: str, now: float):
+        with self._lock:
+            if throttled:
+                self.throttles += 1
+                self._cut(now)
+                return
+            if latency is not None:
+                lat = self._lat if not series else self._series.setdefault(series, deque(maxlen=self._lat.maxlen))
+                lat.append(latency)
+                if len(lat) >= 10 and latency > min(lat) * self.tolerance:
+                    self._cut(now)
+                    return
+            # Only grow while the limit is actually what holds callers back
+            if self._in_use >= self._capacity() - 1 and self.limit < self.max_limit:
+                self.limit = min(float(self.max_limit), self.limit + self.increase / self.limit)
+            else:
+                return
+        self._wake()   # a whole new slot may have opened up for a waiter
+
+    def _cut(self, now: float):
+        if now - self._last_cut < self.cooldown:
+            return
+        self._last_cut = now
+        self.limit = max(float(self.min_limit), self.limit * self.decrease)
+        self.cuts += 1
+
+    def stats(self) -> dict:
+        return {
+            "limit": round(self.limit, 2),
+            "in_use": self._in_use,
+            "waiting": self._queued(),
+            "throttles": self.throttles,
+            "cuts": self.cuts,
+            "min_latency_ms": round(min(self._lat) * 1000, 1) if self._lat else None,
+            **{f"min_latency_ms.{k}": round(min(v) * 1000, 1) for k, v in list(self._series.items()) if v},
+        }
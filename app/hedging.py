@@ -0,0 +1,106 @@
+"""Request hedging for tail latency.
+
+``Hedger.run(start)`` awaits ``start()``; if it has not finished after the
+adaptive delay (the ``quantile`` of recent latencies) and the hedge budget
+allows, an identical second attempt is started. The first attempt to succeed
+wins and the other is cancelled. Each request earns ``budget_ratio`` of a hedge
+(so 0.05 keeps hedges to about 5% extra requests); no hedging happens until
+``min_samples`` latencies have been seen.
+
+With a ``gate``, the hedge takes its own slot without queueing (a saturated
+gate means no hedge) and gives it back when the hedge task finishes. A
+``start()`` whose work cannot be stopped should only finish once that work has,
+so the slot covers the upstream call for as long as it actually runs.
+"""
+import asyncio, time
+from collections import deque
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+class Hedger:
+    def __init__(self, enabled: bool = False, quantile: float = 0.9, budget_ratio: float = 0.05,
+                 max_credit: float = 5.0, min_delay: float = 0.25, window: int = 200, min_samples: int = 20):
+        self.enabled = enabled
+        self.quantile = quantile
+        self.budget_ratio = budget_ratio
+        self.max_credit = max_credit
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self._lat = deque(maxlen=window)   # seconds
+        self._credit = 0.0
+        self.requests = self.hedged = self.hedge_wins = self.denied = self.saturated = 0
+
+    def delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None while there is too little data."""
+        if len(self._lat) < self.min_samples:
+            return None
+        xs = sorted(self._lat)
+        return max(self.min_delay, xs[min(len(xs) - 1, int(len(xs) * self.quantile))])
+
+    def _spend(self) -> bool:
+        if self._credit >= 1.0:
+            self._credit -= 1.0
+            return True
+        self.denied += 1
+        return False
+
+    async def run(self, start: Callable[[], Awaitable[T]], discard: Optional[Callable[[T], None]] = None,
+                  gate: Optional[Any] = None) -> T:
+        self.requests += 1
+        self._credit = min(self.max_credit, self._credit + self.budget_ratio)
+        t0 = time.perf_counter()
+        delay = self.delay() if self.enabled else None
+        if delay is None:
+            result = await start()
+            self._lat.append(time.perf_counter() - t0)
+            return result
+
+        primary = asyncio.ensure_future(start())
+        tasks = {primary: t0}
+        winner, err = None, None
+        try:
+            done, _ = await asyncio.wait([primary], timeout=delay)
+            if not done and self._spend():
+                if gate is not None and not gate.try_acquire():
+                    self.saturated += 1
+                    self._credit += 1.0   # not spent: no hedge was sent
+                else:
+                    self.hedged += 1
+                    hedge = asyncio.ensure_future(start())
+                    if gate is not None:
+                        hedge.add_done_callback(lambda _: gate.release())
+                    tasks[hedge] = time.perf_counter()
+            pending = set(tasks)
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for t in done:
+                    if t.exception() is not None:
+                        err = err or t.exception()
+                    elif winner is None:
+                        winner = t
+                    elif discard is not None:
+                        discard(t.result())   # both finished together; release the spare
+        finally:
+            for t in tasks:
+                if not t.done():
+                    t.cancel()
+        if winner is None:
+            raise err
+        if winner is not primary:
+            self.hedge_wins += 1
+        self._lat.append(time.perf_counter() - tasks[winner])
+        return winner.result()
+
+    def stats(self) -> dict:
+        delay = self.delay()
+        return {
+            "enabled": self.enabled,
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "denied": self.denied,
+            "saturated": self.saturated,
+            "delay_ms": round(delay * 1000, 1) if delay is not None else None,
+            "credit": round(self._credit, 2),
+        }
@@ -0,0 +1,261 @@
+"""Local answers for canned queries (time, date, name, creator, greetings).
+
+Phrases are normalized (casefolded, Latin accents and apostrophes dropped)
+and compiled into a token trie. A message matches only when the whole message
+is one phrase, give or take filler words ("hey ... please", "... right now"),
+so "sometimes" or "candidate" never look like a time or date question. Lookups
+are a handful of dict steps; replies are rendered here so the FastAPI app and
+the Vercel handlers answer identically.
+
+``LOCAL_INTENTS`` (comma separated) chooses which intents answer locally.
+
+Short messages that match nothing are tallied as candidates for the table.
+They are kept and published only as ``miss_id`` hashes, never as text: the
+stats are served without authentication. Check a phrase with ``miss_id()``.
+"""
+import hashlib, os, re, unicodedata
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+LOCAL_INTENTS = os.getenv("LOCAL_INTENTS", "time,date,name,creator,greeting")
+
+# intent -> lang -> phrases
+INTENTS: Dict[str, Dict[str, List[str]]] = {
+    "time": {
+        "en": ["what time is it", "whats the time", "what is the time", "current time", "time",
+               "tell me the time", "do you know the time", "do you know what time it is", "got the time"],
+        "es": ["qué hora es", "me dices la hora", "hora"],
+        "fr": ["quelle heure est-il", "quelle heure il est", "il est quelle heure"],
+        "de": ["wie spät ist es", "wie viel uhr ist es", "wieviel uhr ist es"],
+        "it": ["che ore sono", "che ora è"],
+        "pt": ["que horas são"],
+        "hi": ["कितने बजे हैं", "क्या समय हुआ है", "समय क्या है", "टाइम क्या है", "kitne baje hain"],
+    },
+    "date": {
+        "en": ["whats the date", "what is the date", "what date is it", "whats todays date", "what is todays date",
+               "todays date", "date", "what day is it"],
+        "es": ["qué fecha es", "cuál es la fecha", "qué día es"],
+        "fr": ["quelle est la date", "on est quel jour", "quel jour sommes-nous", "quel jour on est"],
+        "de": ["welches datum ist heute", "der wievielte ist heute", "welcher tag ist heute"],
+        "it": ["che giorno è", "che data è"],
+        "pt": ["que dia é", "qual é a data"],
+        "hi": ["आज की तारीख क्या है", "आज तारीख क्या है", "आज कौन सा दिन है"],
+    },
+    "name": {
+        "en": ["whats your name", "what is your name", "your name", "who are you", "what are you called",
+               "what should i call you"],
+        "es": ["cómo te llamas", "cuál es tu nombre", "quién eres"],
+        "fr": ["comment tu t'appelles", "comment t'appelles-tu", "quel est ton nom", "qui es-tu"],
+        "de": ["wie heißt du", "wer bist du", "wie ist dein name"],
+        "it": ["come ti chiami", "chi sei"],
+        "pt": ["qual é o seu nome", "como você se chama", "quem é você"],
+        "hi": ["तुम्हारा नाम क्या है", "आपका नाम क्या है", "तुम कौन हो", "आप कौन हैं"],
+    },
+    "creator": {
+        "en": ["who made you", "who created you", "who built you", "who developed you", "who programmed you",
+               "who designed you", "who is your creator", "who is your developer"],
+        "es": ["quién te creó", "quién te hizo"],
+        "fr": ["qui t'a créé", "qui t'a créée", "qui t'a fait"],
+        "de": ["wer hat dich gemacht", "wer hat dich erschaffen", "wer hat dich entwickelt"],
+        "it": ["chi ti ha creato", "chi ti ha fatto"],
+        "pt": ["quem te criou", "quem te fez"],
+        "hi": ["तुम्हें किसने बनाया", "आपको किसने बनाया"],
+    },
+    "greeting": {
+        "en": ["hi", "hello", "hey", "hiya", "howdy", "yo", "hi there", "hello there", "hey there",
+               "good morning", "good afternoon", "good evening"],
+        "es": ["hola", "buenos días", "buenas tardes", "buenas noches"],
+        "fr": ["bonjour", "salut", "bonsoir", "coucou"],
+        "de": ["hallo", "guten morgen", "guten tag", "guten abend", "servus"],
+        "it": ["ciao", "buongiorno", "buonasera"],
+        "pt": ["olá", "oi", "bom dia", "boa tarde", "boa noite"],
+        "hi": ["नमस्ते", "नमस्कार", "namaste"],
+        "ja": ["こんにちは", "こんばんは", "おはよう"],
+    },
+}
+
+# Words that may surround a phrase without changing what is asked
+_LEADING = {"hey", "hi", "hello", "ok", "okay", "so", "um", "rem", "please", "oye", "dis", "sag", "bhai"}
+_TRAILING = {"rem", "please", "pls", "now", "right", "today", "hoy", "aujourdhui", "heute", "oggi", "hoje",
+             "abhi", "आज", "अभी", "bitte", "por", "favor", "svp"}
+_MAX_TOKENS = 10
+
+_MONTHS = {
+    "es": "enero febrero marzo abril mayo junio julio agosto septiembre octubre noviembre diciembre",
+    "fr": "janvier février mars avril mai juin juillet août septembre octobre novembre décembre",
+    "de": "Januar Februar März April Mai Juni Juli August September Oktober November Dezember",
+    "it": "gennaio febbraio marzo aprile maggio giugno luglio agosto settembre ottobre novembre dicembre",
+    "pt": "janeiro fevereiro março abril maio junho julho agosto setembro outubro novembro dezembro",
+    "hi": "जनवरी फ़रवरी मार्च अप्रैल मई जून जुलाई अगस्त सितंबर अक्टूबर नवंबर दिसंबर",
+}
+
+_TIME = {
+    "en": lambda d: d.strftime("It's %I:%M %p."),
+    "es": lambda d: d.strftime("Son las %H:%M."),
+    "fr": lambda d: d.strftime("Il est %H h %M."),
+    "de": lambda d: d.strftime("Es ist %H:%M Uhr."),
+    "it": lambda d: d.strftime("Sono le %H:%M."),
+    "pt": lambda d: d.strftime("São %H:%M."),
+    "hi": lambda d: d.strftime("अभी %H:%M बजे हैं।"),
+}
+
+def _month(lang: str, d: datetime) -> str:
+    return _MONTHS[lang].split()[d.month - 1]
+
+_DATE = {
+    "en": lambda d: d.strftime("Today is %B %d, %Y."),
+    "es": lambda d: f"Hoy es {d.day} de {_month('es', d)} de {d.year}.",
+    "fr": lambda d: f"Nous sommes le {d.day} {_month('fr', d)} {d.year}.",
+    "de": lambda d: f"Heute ist der {d.day}. {_month('de', d)} {d.year}.",
+    "it": lambda d: f"Oggi è il {d.day} {_month('it', d)} {d.year}.",
+    "pt": lambda d: f"Hoje é {d.day} de {_month('pt', d)} de {d.year}.",
+    "hi": lambda d: f"आज {d.day} {_month('hi', d)} {d.year} है।",
+}
+
+_FIXED = {
+    "name": {
+        "en": "Rem.", "es": "Soy Rem.", "fr": "Je m'appelle Rem.", "de": "Ich heiße Rem.",
+        "it": "Mi chiamo Rem.", "pt": "Eu sou a Rem.", "hi": "मेरा नाम रेम है।",
+    },
+    "creator": {
+        "en": "BlessedBoy built and named me.",
+        "es": "BlessedBoy me creó y me puso nombre.",
+        "fr": "BlessedBoy m'a créée et m'a donné mon nom.",
+        "de": "BlessedBoy hat mich gebaut und mir meinen Namen gegeben.",
+        "it": "BlessedBoy mi ha creata e mi ha dato il nome.",
+        "pt": "BlessedBoy me criou e me deu meu nome.",
+        "hi": "BlessedBoy ने मुझे बनाया और मेरा नाम रखा।",
+    },
+    "greeting": {
+        "en": "Hello! I'm Rem. How can I help you today?",
+        "es": "¡Hola! Soy Rem. ¿En qué puedo ayudarte hoy?",
+        "fr": "Bonjour ! Je suis Rem. Comment puis-je t'aider aujourd'hui ?",
+        "de": "Hallo! Ich bin Rem. Wie kann ich dir heute helfen?",
+        "it": "Ciao! Sono Rem. Come posso aiutarti oggi?",
+        "pt": "Olá! Eu sou a Rem. Como posso ajudar hoje?",
+        "hi": "नमस्ते! मैं रेम हूँ। आज मैं आपकी क्या मदद कर सकती हूँ?",
+        "ja": "こんにちは！レムです。今日は何をお手伝いしましょうか？",
+    },
+}
+
+# Fixed lines the chat paths fall back to when Bedrock cannot answer
+FALLBACK_REPLIES = {
+    "empty": "I'm here.",
+    "retry": "I'm here and ready to chat! Could you try asking that again?",
+    "ready": "I'm here and ready to help!",
+    "how_are_you": "I'm doing great! Thanks for asking. What would you like to chat about?",
+    "whats_up": "Just here chatting with you! What's on your mind?",
+}
+
+def canned_replies() -> List[Tuple[str, str]]:
+    """``(lang, text)`` for every reply that never changes (time and date do)."""
+    out = [(lang, text) for replies in _FIXED.values() for lang, text in replies.items()]
+    return out + [("en", text) for text in FALLBACK_REPLIES.values()]
+
+_APOSTROPHES = re.compile(r"['’`´]")
+_SPLIT = re.compile(r"[^\w\u0900-\u097f]+")   # keep Devanagari vowel signs inside words
+
+def tokens(text: str) -> List[str]:
+    """Casefolded word tokens; Latin accents and apostrophes dropped ("qu'est" -> "quest")."""
+    t = unicodedata.normalize("NFKD", text.casefold())
+    t = "".join(ch for ch in t if not "\u0300" <= ch <= "\u036f")
+    t = unicodedata.normalize("NFC", _APOSTROPHES.sub("", t))
+    return [w for w in _SPLIT.split(t) if w]
+
+def miss_id(text: str) -> str:
+    """Stable id under which an unmatched message is counted in ``stats()``."""
+    key = " ".join(tokens(text))
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+
+def render(intent: str, lang: str, now: Optional[datetime] = None) -> str:
+    if intent in ("time", "date"):
+        table = _TIME if intent == "time" else _DATE
+        return table.get(lang, table["en"])(now or datetime.now())
+    replies = _FIXED[intent]
+    return replies.get(lang, replies["en"])
+
+class IntentRouter:
+    def __init__(self, enabled: Optional[Iterable[str]] = None, table: Dict[str, Dict[str, List[str]]] = INTENTS,
+                 max_candidates: int = 256):
+        if enabled is None:
+            enabled = LOCAL_INTENTS.split(",")
+        self.enabled = {e.strip() for e in enabled if e.strip()}
+        self._trie: dict = {}
+        for intent, langs in table.items():
+            for lang, phrases in langs.items():
+                for phrase in phrases:
+                    node = self._trie
+                    for tok in tokens(phrase):
+                        node = node.setdefault(tok, {})
+                    node.setdefault(None, (intent, lang))   # first phrase wins on duplicates
+        self.max_candidates = max_candidates
+        self.lookups = self.matched = 0
+        self.hits: Counter = Counter()
+        self.disabled_hits: Counter = Counter()
+        self._misses: Counter = Counter()   # miss_id -> count of short unmatched messages
+
+    def _walk(self, toks: List[str], i: int, j: int) -> Optional[Tuple[str, str]]:
+        node = self._trie
+        for k in range(i, j):
+            node = node.get(toks[k])
+            if node is None:
+                return None
+        return node.get(None)
+
+    def match(self, text: str) -> Optional[Tuple[str, str]]:
+        """``(intent, lang)`` when the whole message is a known phrase, else None."""
+        toks = tokens(text)
+        if not toks or len(toks) > _MAX_TOKENS:
+            return None
+        j = len(toks)
+        while j > 1 and toks[j - 1] in _TRAILING:
+            j -= 1
+        for end in (len(toks), j) if j != len(toks) else (j,):
+            i = 0
+            while True:
+                hit = self._walk(toks, i, end)
+                if hit or i + 1 >= end or toks[i] not in _LEADING:
+                    break
+                i += 1
+            if hit:
+                return hit
+        return None
+
+    def answer(self, text: str, now: Optional[datetime] = None,
+               only: Optional[Iterable[str]] = None) -> Optional[str]:
+        """Local reply for ``text`` if it is an enabled (or ``only``) intent, else None."""
+        self.lookups += 1
+        hit = self.match(text)
+        allowed = self.enabled if only is None else set(only)
+        if hit is None or hit[0] not in allowed:
+            if hit is not None:
+                self.disabled_hits[hit[0]] += 1
+            else:
+                toks = tokens(text)
+                if toks and len(toks) <= 4:
+                    self._count_miss(miss_id(text))
+            return None
+        self.matched += 1
+        self.hits[f"{hit[0]}:{hit[1]}"] += 1
+        return render(hit[0], hit[1], now)
+
+    def _count_miss(self, mid: str):
+        # Space-saving: when full, a new id replaces the rarest one and inherits its
+        # count, so the top list keeps following what users say now
+        if mid not in self._misses and len(self._misses) >= self.max_candidates:
+            victim = min(self._misses, key=self._misses.__getitem__)
+            self._misses[mid] = self._misses.pop(victim)
+        self._misses[mid] += 1
+
+    def stats(self) -> dict:
+        return {
+            "enabled": sorted(self.enabled),
+            "lookups": self.lookups,
+            "matched": self.matched,
+            "match_rate": round(self.matched / self.lookups, 4) if self.lookups else 0.0,
+            "hits": dict(self.hits),
+            "disabled_hits": dict(self.disabled_hits),
+            "miss_candidates": len(self._misses),
+            "top_misses": dict(self._misses.most_common(20)),   # miss_id -> count
+        }
@@ -0,0 +1,284 @@
+"""Language identification for TTS voice routing.
+
+Covers every language in ``voices.VOICE_MAP`` plus Hinglish (Hindi written in
+Latin letters, routed to the Hindi voice). Everything is built once at import:
+
+* non-Latin scripts decide on their own (Devanagari -> hi, kana -> ja,
+  Hangul -> ko, Han -> zh, Arabic -> ar, Cyrillic -> ru);
+* Latin text is scored per language from character trigrams (average log
+  probability under a small per-language profile), the share of words found
+  in that language's frozenset of function words, and a penalty for letters
+  the language's alphabet does not use (``ñ`` rules out French, ``ł`` all but
+  Polish).
+
+Short Latin text is where trigrams mislead ("Cool" scores as Portuguese), so
+the lead needed over the runner-up grows as the text gets shorter, and a text
+of one or two words is only classified when a function word or a letter of the
+winning language backs the trigrams up.
+
+``detect`` returns a base code ("hi" for Hinglish) or ``default`` when the
+text is too short or the top two languages are too close to call;
+``detect_batch`` does the same for many sentences in one call.
+"""
+import math, re
+from collections import Counter
+from itertools import repeat
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+try:
+    from voices import VOICE_MAP
+except ImportError:
+    from app.voices import VOICE_MAP
+
+HINGLISH = "hi-Latn"
+MIN_LETTERS = 3       # Latin text with fewer letters is never classified
+MIN_MARGIN = 0.1      # score gap to the runner-up needed for a confident answer
+MARGIN_LETTERS = 30   # below this many letters the gap needed grows in proportion
+MIN_WORDS = 3         # with fewer words trigrams alone are not trusted (see ``classify``)
+STOP_WEIGHT = 1.5     # score for a text made only of one language's function words
+ALIEN_PENALTY = 1.5   # per distinct letter outside a language's alphabet
+
+# ---- scripts ---------------------------------------------------------------------
+# (first, last code point, lang); compiling these as regex classes costs ms at import
+_SCRIPT_RANGES: Tuple[Tuple[int, int, str], ...] = (
+    (0x0900, 0x097F, "hi"),                       # Devanagari
+    (0x3040, 0x30FF, "ja"), (0x31F0, 0x31FF, "ja"),   # kana
+    (0x1100, 0x11FF, "ko"), (0x3130, 0x318F, "ko"), (0xAC00, 0xD7AF, "ko"),   # Hangul
+    (0x3400, 0x4DBF, "zh"), (0x4E00, 0x9FFF, "zh"),   # Han
+    (0x0600, 0x06FF, "ar"), (0x0750, 0x077F, "ar"),
+    (0x0400, 0x04FF, "ru"),                       # Cyrillic
+)
+# Kana decides over Han, since Japanese mixes both
+_SCRIPT_ORDER = ("hi", "ja", "ko", "zh", "ar", "ru")
+_WORD = re.compile(r"[^\W\d_]+")
+
+# ---- Latin-script languages: function words, alphabet extras, training text ------------
+_STOPWORDS: Dict[str, str] = {
+    "en": "the a an and or but is are was were be been have has had do does did i you he she it we they "
+          "me my your his her our their this that these those what who how why when where of to in on at "
+          "for with from not no yes can will would just so very hello hi thanks please",
+    "es": "el la los las un una unos y o pero es son está están ser fue yo tú él ella nosotros ellos "
+          "me te se mi tu su que qué quién cómo por para con sin de del al en no sí muy hola gracias "
+          "también porque cuando donde este esta eso hay puedo quiero",
+    "fr": "le la les un une des et ou mais est sont être était je tu il elle nous vous ils elles me te "
+          "se mon ma mes ton ta son sa ce cette que qui quoi comment pourquoi de du au aux en dans sur "
+          "avec pour pas ne oui non très bonjour merci avez suis",
+    "de": "der die das ein eine und oder aber ist sind war waren sein ich du er sie es wir ihr mich "
+          "dich mein dein sein was wer wie warum wann wo von zu im in auf mit für nicht kein ja nein "
+          "sehr hallo danke bitte auch noch habe",
+    "it": "il lo la i gli le un una e o ma è sono era essere io tu lui lei noi voi loro mi ti si mio "
+          "tuo suo che chi come perché quando dove di del della da in con per non sì molto ciao grazie "
+          "anche questo sei",
+    "pt": "o a os as um uma e ou mas é são está estão ser foi eu tu ele ela nós vocês eles me te se "
+          "meu minha seu sua que quem como porque quando onde de do da em no na com para por não sim "
+          "muito olá obrigado obrigada você também",
+    "nl": "de het een en of maar is zijn was waren ik jij je hij zij wij jullie mij mijn jouw zijn "
+          "wat wie hoe waarom wanneer waar van te in op met voor niet geen ja nee heel hallo dank "
+          "alsjeblieft ook nog heb",
+    "sv": "en ett och eller men är var vara jag du han hon det vi ni de mig dig min din hans hennes "
+          "vad vem hur varför när var av till i på med för inte ja nej mycket hej tack också har",
+    "da": "en et og eller men er var være jeg du han hun det vi i de mig dig min din hans hendes hvad "
+          "hvem hvordan hvorfor hvornår hvor af til på med for ikke ja nej meget hej tak også har",
+    "nb": "en et og eller men er var være jeg du han hun det vi dere de meg deg min din hans hennes "
+          "hva hvem hvordan hvorfor når hvor av til på med for ikke ja nei veldig hei takk også har",
+    "pl": "i lub ale jest są był była być ja ty on ona my wy oni mnie cię mój twój jego jej co kto "
+          "jak dlaczego kiedy gdzie z do w na o dla nie tak bardzo cześć dziękuję proszę też to się",
+    "tr": "ve veya ama bir bu şu o ben sen biz siz onlar beni seni benim senin onun ne kim nasıl neden "
+          "ne zaman nerede ile için değil evet hayır çok merhaba teşekkürler lütfen de da mi mı var yok",
+    HINGLISH: "aap aapka aapki haan nahin nahi kya kaise kab kahan kyun kaun meri mera mujhe tumhara "
+              "tumhari tumhe woh yeh iske uske iska uska bahut accha achha bura theek thik samjha samjhi "
+              "pata malum dekho suno bolo kar karo mat padho likho chalo aao jao paani pani khana ghar "
+              "kaam kitna kitni kuch sab sabhi mere tere humara bhi toh mein hai hain tha thi hoga hogi "
+              "honge dost bhai behen beta beti yaar matlab abhi kal aaj",
+}
+_STOP: Dict[str, frozenset] = {lang: frozenset(words.split()) for lang, words in _STOPWORDS.items()}
+# word -> languages listing it, so each word of a text is looked up once
+_STOP_INDEX: Dict[str, Tuple[str, ...]] = {
+    w: tuple(lang for lang, stop in _STOP.items() if w in stop) for w in frozenset().union(*_STOP.values())}
+
+# Letters beyond a-z each language writes; any other one counts against it
+_ALPHABET_EXTRA: Dict[str, str] = {
+    "en": "",
+    "es": "áéíóúüñ",
+    "fr": "àâæçéèêëîïôœùûüÿ",
+    "de": "äöüß",
+    "it": "àèéìíîòóùú",
+    "pt": "áâãàçéêíóôõú",
+    "nl": "áéèëïóöü",
+    "sv": "åäöé",
+    "da": "æøåé",
+    "nb": "æøåéóôò",
+    "pl": "ąćęłńóśźż",
+    "tr": "âçğıîöşûü",
+    HINGLISH: "",
+}
+
+_SAMPLES: Dict[str, str] = {
+    "en": "I was thinking about what you said yesterday and I think you are right. The weather has been "
+          "really nice this week, so we should go outside more often. Could you tell me how your day went? "
+          "Thanks for helping me with the project, it would have taken much longer without you. Let me know "
+          "whether you want to grab something to eat later tonight.",
+    "es": "Estaba pensando en lo que dijiste ayer y creo que tienes razón. El tiempo ha estado muy bonito "
+          "esta semana, así que deberíamos salir más a menudo. ¿Me cuentas cómo te fue el día? Gracias por "
+          "ayudarme con el proyecto, habría tardado mucho más sin ti. Avísame si quieres comer algo esta noche.",
+    "fr": "Je pensais à ce que tu as dit hier et je crois que tu as raison. Il a fait vraiment beau cette "
+          "semaine, alors nous devrions sortir plus souvent. Tu peux me raconter comment s'est passée ta "
+          "journée ? Merci de m'avoir aidé avec le projet, ça m'aurait pris beaucoup plus de temps sans toi. "
+          "Dis-moi si tu veux manger quelque chose ce soir.",
+    "de": "Ich habe über das nachgedacht, was du gestern gesagt hast, und ich glaube, du hast recht. Das "
+          "Wetter war diese Woche wirklich schön, also sollten wir öfter nach draußen gehen. Kannst du mir "
+          "erzählen, wie dein Tag war? Danke, dass du mir bei dem Projekt geholfen hast, ohne dich hätte es "
+          "viel länger gedauert. Sag mir Bescheid, ob du heute Abend etwas essen möchtest.",
+    "it": "Stavo pensando a quello che hai detto ieri e credo che tu abbia ragione. Il tempo è stato "
+          "davvero bello questa settimana, quindi dovremmo uscire più spesso. Mi racconti com'è andata la "
+          "tua giornata? Grazie per avermi aiutato con il progetto, senza di te ci avrei messo molto di più. "
+          "Fammi sapere se vuoi mangiare qualcosa stasera.",
+    "pt": "Eu estava pensando no que você disse ontem e acho que você tem razão. O tempo esteve muito "
+          "bonito esta semana, então deveríamos sair mais vezes. Você pode me contar como foi o seu dia? "
+          "Obrigado por me ajudar com o projeto, sem você eu teria demorado muito mais. Me avisa se você "
+          "quer comer alguma coisa hoje à noite.",
+    "nl": "Ik zat na te denken over wat je gisteren zei en ik denk dat je gelijk hebt. Het weer was deze "
+          "week echt mooi, dus we zouden vaker naar buiten moeten gaan. Kun je me vertellen hoe je dag was? "
+          "Bedankt dat je me met het project hebt geholpen, zonder jou had het veel langer geduurd. Laat me "
+          "weten of je vanavond iets wilt eten.",
+    "sv": "Jag tänkte på det du sa igår och jag tror att du har rätt. Vädret har varit riktigt fint den "
+          "här veckan, så vi borde gå ut oftare. Kan du berätta hur din dag var? Tack för att du hjälpte mig "
+          "med projektet, utan dig hade det tagit mycket längre tid. Säg till om du vill äta något i kväll.",
+    "da": "Jeg tænkte på det, du sagde i går, og jeg tror, du har ret. Vejret har været rigtig godt i denne "
+          "uge, så vi burde gå mere udenfor. Kan du fortælle mig, hvordan din dag var? Tak fordi du hjalp mig "
+          "med projektet, uden dig havde det taget meget længere tid. Sig til, hvis du vil have noget at "
+          "spise i aften.",
+    "nb": "Jeg tenkte på det du sa i går, og jeg tror du har rett. Været har vært veldig fint denne uken, "
+          "så vi burde gå mer ut. Kan du fortelle meg hvordan dagen din var? Takk for at du hjalp meg med "
+          "prosjektet, uten deg hadde det tatt mye lengre tid. Si ifra hvis du vil spise noe i kveld.",
+    "pl": "Myślałem o tym, co powiedziałeś wczoraj, i chyba masz rację. Pogoda w tym tygodniu była "
+          "naprawdę ładna, więc powinniśmy częściej wychodzić. Możesz mi opowiedzieć, jak minął ci dzień? "
+          "Dziękuję, że pomogłeś mi przy projekcie, bez ciebie zajęłoby to dużo dłużej. Daj znać, czy chcesz "
+          "dziś wieczorem coś zjeść.",
+    "tr": "Dün söylediklerini düşünüyordum ve bence haklısın. Bu hafta hava gerçekten çok güzeldi, bu "
+          "yüzden daha sık dışarı çıkmalıyız. Bana günün nasıl geçtiğini anlatır mısın? Projede bana "
+          "yardım ettiğin için teşekkürler, sensiz çok daha uzun sürerdi. Bu akşam bir şeyler yemek "
+          "istersen haber ver.",
+    HINGLISH: "Main soch raha tha jo tumne kal kaha tha aur mujhe lagta hai tum sahi ho. Is hafte mausam "
+              "bahut accha tha, toh humein zyada bahar jaana chahiye. Mujhe batao tumhara din kaisa gaya? "
+              "Project mein meri madad karne ke liye shukriya, tumhare bina bahut zyada time lagta. Agar "
+              "aaj raat kuch khana hai toh mujhe bata dena yaar.",
+}
+
+# ---- model ---------------------------------------------------------------------------
+def _trigrams(words: List[str]) -> List[str]:
+    # One pass over the words joined by single spaces; trigrams spanning a word gap count too
+    t = " " + " ".join(words) + " "
+    return [t[i:i + 3] for i in range(len(t) - 2)]
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+LATIN = tuple(_SAMPLES)
+
+def _build():
+    """Trigram -> log probability in each of ``LATIN`` (add-one smoothed), plus the
+    per-language floor for trigrams a profile never saw."""
+    counts = [Counter(_trigrams(_words(_SAMPLES[lang])) + _trigrams(_STOPWORDS[lang].split())) for lang in LATIN]
+    grams = list(set().union(*counts))
+    cols = []
+    for c in counts:
+        d = sum(c.values()) + len(grams)
+        logs = [math.log((k + 1) / d) for k in range(max(c.values()) + 1)]
+        cols.append(list(map(logs.__getitem__, map(c.get, grams, repeat(0)))))
+    floor = tuple(math.log(1 / (sum(c.values()) + len(grams))) for c in counts)
+    return dict(zip(grams, zip(*cols))), floor
+
+_LOGP, _FLOOR = _build()
+_ASCII_LETTERS = frozenset("abcdefghijklmnopqrstuvwxyz")
+_ALPHABET = {lang: frozenset(extra) for lang, extra in _ALPHABET_EXTRA.items()}
+
+# Every voice language must be detectable
+assert {k.split("-")[0] for k in VOICE_MAP} <= set(LATIN) | set(_SCRIPT_ORDER)
+
+class Guess(NamedTuple):
+    lang: Optional[str]   # base code ("hi" for Hinglish), None when undecided
+    label: Optional[str]  # as scored: HINGLISH stays distinct from "hi"
+    margin: float         # lead over the runner-up (inf for script decisions)
+
+_UNDECIDED = Guess(None, None, 0.0)
+
+def _script(text: str) -> Optional[str]:
+    found = set()
+    for ch in text:
+        cp = ord(ch)
+        if cp < 0x0400:
+            continue
+        for lo, hi, lang in _SCRIPT_RANGES:
+            if lo <= cp <= hi:
+                found.add(lang)
+                break
+    for lang in _SCRIPT_ORDER:
+        if lang in found:
+            return lang
+    return None
+
+def _scores(words: List[str]) -> Dict[str, float]:
+    grams = _trigrams(words)
+    n = len(grams)
+    # Per-language totals: column sums over the trigrams' log-probability vectors
+    totals = map(sum, zip(*map(_LOGP.get, grams, repeat(_FLOOR, n))))
+    out = {lang: t / n for lang, t in zip(LATIN, totals)}
+    step = STOP_WEIGHT / len(words)
+    for w in words:
+        for lang in _STOP_INDEX.get(w, ()):
+            out[lang] += step
+    alien = set("".join(words)) - _ASCII_LETTERS
+    if alien:
+        for lang in LATIN:
+            out[lang] -= ALIEN_PENALTY * len(alien - _ALPHABET[lang])
+    return out
+
+def scores(text: str) -> Dict[str, float]:
+    """Score of every Latin-script language for ``text`` (higher is more likely)."""
+    words = _words(text)
+    return _scores(words) if words else {}
+
+def classify(text: str) -> Guess:
+    if not text:
+        return _UNDECIDED
+    if not text.isascii():
+        # A script of its own settles it, even for a word or two ("你好")
+        lang = _script(text)
+        if lang is not None:
+            return Guess(lang, lang, math.inf)
+    words = _words(text)
+    letters = sum(map(len, words))
+    if letters < MIN_LETTERS:
+        return _UNDECIDED
+    s = _scores(words)
+    (best, top), (_, second) = sorted(s.items(), key=lambda kv: kv[1], reverse=True)[:2]
+    margin = top - second
+    if margin < MIN_MARGIN * max(1.0, MARGIN_LETTERS / letters):
+        return Guess(None, best, margin)
+    if len(words) < MIN_WORDS and not _backed(words, best):
+        return Guess(None, best, margin)
+    return Guess("hi" if best == HINGLISH else best, best, margin)
+
+def _backed(words: List[str], lang: str) -> bool:
+    """Whether more than trigrams points at ``lang``: one of its function words,
+    or letters outside a-z that its alphabet has."""
+    if any(lang in _STOP_INDEX.get(w, ()) for w in words):
+        return True
+    alien = set("".join(words)) - _ASCII_LETTERS
+    return bool(alien) and alien <= _ALPHABET[lang]
+
+def detect(text: str, default: Optional[str] = None) -> Optional[str]:
+    """Base language code of ``text`` ("hi" for Hinglish), or ``default`` if unsure."""
+    return classify(text).lang or default
+
+def detect_batch(texts: Iterable[str], default: Optional[str] = None) -> List[Optional[str]]:
+    """``detect`` for many sentences at once; repeated sentences are scored once."""
+    seen: Dict[str, Optional[str]] = {}
+    out = []
+    for t in texts:
+        lang = seen.get(t, seen)
+        if lang is seen:
+            lang = seen[t] = classify(t).lang
+        out.append(lang or default)
+    return out
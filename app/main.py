@@ -1,18 +1,19 @@
-import base64, json, os, re, html, time, threading, random
+import asyncio, base64, json, os, random, re, html, time
 import logging
-from collections import defaultdict, deque
+from collections import deque
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Tuple, List, Dict, Optional
+from typing import Any, Callable, Tuple, List, Dict, Optional
 
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from pydantic import BaseModel
 
 import boto3
 from botocore.config import Config
-from botocore.exceptions import ClientError
+from botocore.exceptions import BotoCoreError, ClientError
 
 # load persona
 try:
@@ -20,6 +21,41 @@ try:
 except Exception:
     from persona_prompts import PERSONA_BLESSED_BOY
 
+try:
+    from concurrency import AdaptiveGate, run_io, run_io_or_release, aiter_io, retry_sleep, submit_side
+    from hedging import Hedger
+    from scheduler import CHAT, SPEECH, BACKGROUND, SING, FairGate, Overloaded
+    from reply_cache import ReplyCache
+    from session_store import SessionStore
+    from singleflight import SingleFlight
+    from tts_cache import TTSCache
+    from visemes import local_visemes, mp3_duration_ms
+    from sanitize import StreamSanitizer, enforce_identity, strip_stage
+    from intents import FALLBACK_REPLIES, IntentRouter, canned_replies
+    from audio_pack import AudioPack, pack_version
+    from voices import VOICE_MAP
+    from lang_detect import detect as detect_lang
+    from polly_caps import AttemptBudget, BudgetExhausted, CapabilityIndex
+    from region_health import RegionHealth
+    import metrics
+except ImportError:
+    from app.concurrency import AdaptiveGate, run_io, run_io_or_release, aiter_io, retry_sleep, submit_side
+    from app.hedging import Hedger
+    from app.scheduler import CHAT, SPEECH, BACKGROUND, SING, FairGate, Overloaded
+    from app.reply_cache import ReplyCache
+    from app.session_store import SessionStore
+    from app.singleflight import SingleFlight
+    from app.tts_cache import TTSCache
+    from app.visemes import local_visemes, mp3_duration_ms
+    from app.sanitize import StreamSanitizer, enforce_identity, strip_stage
+    from app.intents import FALLBACK_REPLIES, IntentRouter, canned_replies
+    from app.audio_pack import AudioPack, pack_version
+    from app.voices import VOICE_MAP
+    from app.lang_detect import detect as detect_lang
+    from app.polly_caps import AttemptBudget, BudgetExhausted, CapabilityIndex
+    from app.region_health import RegionHealth
+    from app import metrics
+
 BEDROCK_REGION = os.getenv("BEDROCK_REGION", "ap-south-1")
 BEDROCK_MODEL  = os.getenv("BEDROCK_MODEL",  "anthropic.claude-3-haiku-20240307-v1:0")
 POLLY_REGION   = os.getenv("POLLY_REGION",   "ap-south-1")
@@ -27,6 +63,9 @@ POLLY_FALLBACK_REGION = os.getenv("POLLY_FALLBACK_REGION", "us-east-1")
 POLLY_VOICE    = os.getenv("POLLY_VOICE",    "Ruth")
 POLLY_RATE     = os.getenv("POLLY_RATE",     "medium")
 POLLY_PITCH    = os.getenv("POLLY_PITCH",    "+4%")
+# Bounded so a browned-out region fails over quickly instead of hanging for botocore's 60 s default
+POLLY_CONNECT_TIMEOUT = float(os.getenv("POLLY_CONNECT_TIMEOUT", "3"))
+POLLY_READ_TIMEOUT    = float(os.getenv("POLLY_READ_TIMEOUT", "15"))
 
 # Add adaptive retries on clients
 bedrock = boto3.client(
@@ -35,7 +74,8 @@ bedrock = boto3.client(
 )
 polly   = boto3.client(
     "polly",
-    config=Config(region_name=POLLY_REGION, retries={"max_attempts": 3, "mode": "standard"})
+    config=Config(region_name=POLLY_REGION, retries={"max_attempts": 3, "mode": "standard"},
+                  connect_timeout=POLLY_CONNECT_TIMEOUT, read_timeout=POLLY_READ_TIMEOUT)
 )
 
 # Optional fallback region (keeps the same voice, different region)
@@ -44,19 +84,50 @@ if POLLY_FALLBACK_REGION and POLLY_FALLBACK_REGION != POLLY_REGION:
     try:
         polly_fb = boto3.client(
             "polly",
-            config=Config(region_name=POLLY_FALLBACK_REGION, retries={"max_attempts": 3, "mode": "standard"})
+            config=Config(region_name=POLLY_FALLBACK_REGION, retries={"max_attempts": 3, "mode": "standard"},
+                          connect_timeout=POLLY_CONNECT_TIMEOUT, read_timeout=POLLY_READ_TIMEOUT)
         )
     except Exception:
         polly_fb = None
 
+# Per-region latency/error tracking; regions with an open breaker are skipped
+_polly_regions = RegionHealth(
+    failure_threshold=int(os.getenv("POLLY_BREAKER_FAILURES", "3")),
+    cooldown=float(os.getenv("POLLY_BREAKER_COOLDOWN", "30")),
+)
+
 def _polly_clients():
-    # Try primary region first, then fallback if configured
-    return [c for c in (polly, polly_fb) if c is not None]
+    # Fastest healthy region first (primary, then fallback, until there is latency data)
+    return _polly_regions.order([c for c in (polly, polly_fb) if c is not None])
+
+# One adaptive, per-session fair admission gate per Polly region
+_polly_gates: Dict[str, FairGate] = {}
+
+def _polly_gate(client) -> FairGate:
+    region = getattr(client.meta, "region_name", None) or "default"
+    gate = _polly_gates.get(region)
+    if gate is None:
+        gate = _polly_gates.setdefault(region, FairGate(
+            f"polly:{region}", _TTS_MAX_CONCURRENCY, max_limit=_TTS_MAX_LIMIT,
+            rate=TTS_SESSION_RATE, burst=TTS_SESSION_BURST, max_queue_per_session=8))
+    return gate
+
+def _tts_gate() -> FairGate:
+    """Admission gate of the region this request will most likely be served from."""
+    return _polly_gate(_polly_regions.peek([c for c in (polly, polly_fb) if c is not None]))
 
 # ---- app --------------------------------------------------------------------
-app = FastAPI()
+@asynccontextmanager
+async def _lifespan(app):
+    # Background warm-ups only: startup never waits on AWS
+    _warm_polly_caps()
+    _start_tts_cache_sweeper()
+    _start_audio_pack()
+    yield
+
+app = FastAPI(lifespan=_lifespan)
 logger = logging.getLogger("blessedboy")
-app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"], expose_headers=["X-Visemes", "Retry-After"])
 
 BASE_DIR = Path(__file__).parent
 STATIC_DIR = BASE_DIR / "static"
@@ -81,20 +152,50 @@ def version():
         "polly_voice": POLLY_VOICE,
     }
 
+@app.get("/api/metrics")
+def get_metrics():
+    return metrics.snapshot()
+
 # ---- rolling memory (per session_id) ----------------------------------------
 MAX_TURNS = 10  # user+assistant pairs
-_history: Dict[str, deque] = defaultdict(lambda: deque(maxlen=MAX_TURNS*2))
+_history = SessionStore(
+    max_turns=MAX_TURNS*2,
+    max_bytes=int(os.getenv("SESSION_MAX_BYTES", str(64 << 20))),
+    idle_ttl=float(os.getenv("SESSION_IDLE_TTL", "3600")),
+)
+metrics.register("sessions", _history.stats)
+
+# Prompt history is built to a token budget; older turns live on as a rolling summary
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "400"))
+
 def add_turn(session_id: str, role: str, content: str):
-    _history[session_id].append({"role": role, "content": content})
+    _history.append(session_id, role, content)
+    if role == "assistant":
+        _schedule_compaction(session_id)
 
 def get_msgs(session_id: str) -> List[Dict]:
-    msgs = []
-    for m in _history[session_id]:
-        msgs.append({
-            "role": "user" if m["role"] == "user" else "assistant",
-            "content": [{"type": "text", "text": m["content"]}]
-        })
-    return msgs
+    # Reading never creates a session
+    return _history.messages(session_id)
+
+def _prompt_history(session_id: str) -> Tuple[List[Dict], str, Dict[str, int]]:
+    """(messages within budget, rolling summary, token usage) for the next Bedrock call."""
+    w = _history.window(session_id, HISTORY_TOKEN_BUDGET)
+    usage = {
+        "history_tokens": w.history_tokens,
+        "sent_tokens": w.sent_tokens,
+        "saved_tokens": w.history_tokens - w.sent_tokens,
+    }
+    metrics.incr("history.requests")
+    for k, v in usage.items():
+        metrics.incr(f"history.{k}", v)
+    logger.debug("history session=%s %s", session_id, usage)
+    msgs = [{"role": t.role, "content": [{"type": "text", "text": t.text}]} for t in w.turns]
+    return msgs, w.summary, usage
+
+def _with_summary(system_prompt: str, summary: str) -> str:
+    if not summary:
+        return system_prompt
+    return f"{system_prompt}\n\nEarlier in this conversation (summary): {summary}"
 
 # ---- models -----------------------------------------------------------------
 class ChatIn(BaseModel):
@@ -106,46 +207,118 @@ class TTSIn(BaseModel):
     text: str
     lang: Optional[str] = None   # e.g., 'en','es','fr'
     mode: Optional[str] = None   # 'auto' chooses a female voice by language; default uses Ruth
+    stream: bool = False         # chunked audio/mpeg as Polly produces it (visemes in X-Visemes)
+    session_id: Optional[str] = None  # fairness/rate-limit key; defaults to the client address
 
 class ChatStreamIn(BaseModel):
     text: str
     session_id: str = "local"
     style: Optional[str] = None
+    speak: bool = False          # interleave per-sentence {"tts": {...}} frames into the stream
+    lang: Optional[str] = None   # TTS hints, same meaning as TTSIn
+    mode: Optional[str] = None
 
 class SingIn(BaseModel):
     text: str  # user-provided lyrics only
     lang: Optional[str] = None
     mode: Optional[str] = None  # 'auto' to select a native female voice for that language
+    stream: bool = False
+    session_id: Optional[str] = None
 
 # ---- helpers ----------------------------------------------------------------
-ACTION_PATTERNS = [
-    r"\*[^*]{0,120}\*", r"\[[^\]]{0,120}\]",
-    r"\((?:smiles|laughs|chuckles|sighs|clears throat|giggles)[^)]*\)"
-]
-def strip_stage(text: str) -> str:
-    t = text
-    for pat in ACTION_PATTERNS:
-        t = re.sub(pat, "", t, flags=re.I)
-    t = re.sub(r"^As an AI(?: language model)?[, ]*", "", t, flags=re.I)
-    t = re.sub(r"\s{2,}", " ", t).strip()
-    return t
-
-def enforce_identity(text: str) -> str:
-    t = re.sub(r"\bClaude\b", "Rem", text, flags=re.I)
-    t = re.sub(r"\bBlessed Boy\b", "Rem", t, flags=re.I)
-    t = re.sub(r"\bAnthropic\b", "my team", t, flags=re.I)
-    # Remove leading assistant name tags like "Rem:", "Rem -", "Rem." at the start
-    t = re.sub(r"^\s*Rem\s*[:\-–—.,]\s*", "", t, flags=re.I)
-    return strip_stage(t)
-
-def clamp_sentences(text: str, n: int = 2) -> str:
-    parts = re.split(r'(?<=[.!?])\s+', text.strip())
+# Replies are clamped to this many sentences; streams stop reading Bedrock once they have them
+CLAMP_SENTENCES = int(os.getenv("CLAMP_SENTENCES", "2"))
+_SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+')
+
+def clamp_sentences(text: str, n: int = CLAMP_SENTENCES) -> str:
+    parts = _SENTENCE_BREAK.split(text.strip())
     return " ".join(parts[:n]).strip()
 
+class _ClampWatch:
+    """Follows streamed (sanitized) text against ``clamp_sentences``.
+
+    ``feed`` returns the part of a chunk that survives the clamp; ``done`` turns
+    True once ``n`` sentences are complete, after which nothing more is kept.
+    """
+
+    def __init__(self, n: int = CLAMP_SENTENCES):
+        self.n = n
+        self.text = ""
+        self.done = False
+
+    def feed(self, chunk: str) -> str:
+        if self.done or not chunk:
+            return ""
+        text = self.text + chunk
+        parts = _SENTENCE_BREAK.split(text, maxsplit=self.n)
+        if len(parts) <= self.n:
+            self.text = text
+            return chunk
+        self.done = True
+        keep = text[:len(text) - len(parts[-1])].rstrip()
+        out, self.text = keep[len(self.text):], keep
+        return out
+
+# A stopped stream never reports how much more it would have written, so a small
+# share of streams is read to the end (text past the clamp still discarded) to
+# learn the size of that tail; early stops are credited with its running average.
+CLAMP_SAMPLE = float(os.getenv("CLAMP_SAMPLE", "0.02"))
+
+class _ClampSavings:
+    def __init__(self, alpha: float = 0.1):
+        self.alpha = alpha
+        self.tail_tokens: Optional[float] = None
+        self.early_stops = self.samples = self.saved_tokens = 0
+
+    def sample(self) -> bool:
+        return self.tail_tokens is None or random.random() < CLAMP_SAMPLE
+
+    def observe_tail(self, tokens: float):
+        self.samples += 1
+        a = self.alpha
+        self.tail_tokens = tokens if self.tail_tokens is None else (1 - a) * self.tail_tokens + a * tokens
+
+    def early_stop(self) -> int:
+        saved = round(self.tail_tokens or 0)
+        self.early_stops += 1
+        self.saved_tokens += saved
+        return saved
+
+    def stats(self) -> dict:
+        return {
+            "early_stops": self.early_stops,
+            "samples": self.samples,
+            "tail_tokens_avg": round(self.tail_tokens, 1) if self.tail_tokens is not None else None,
+            "saved_tokens_est": self.saved_tokens,
+        }
+
+_clamp_savings = _ClampSavings()
+metrics.register("clamp", _clamp_savings.stats)
+
 # ---- LLM --------------------------------------------------------------------
 BEDROCK_MAX_RETRIES = int(os.getenv("BEDROCK_MAX_RETRIES", "3"))
-CHAT_MAX_CONCURRENCY = int(os.getenv("CHAT_MAX_CONCURRENCY", "4"))
-_chat_gate = threading.Semaphore(CHAT_MAX_CONCURRENCY)
+# Backoff runs on the event loop so a retrying request never pins a thread
+_retry_sleep = retry_sleep
+CHAT_MAX_CONCURRENCY = int(os.getenv("CHAT_MAX_CONCURRENCY", "4"))   # starting limit; adapts (AIMD)
+CHAT_MAX_LIMIT = int(os.getenv("CHAT_MAX_LIMIT", "32"))
+# Per-session token bucket in front of the chat gate (requests per second, burst)
+CHAT_SESSION_RATE = float(os.getenv("CHAT_SESSION_RATE", "0.5"))
+CHAT_SESSION_BURST = float(os.getenv("CHAT_SESSION_BURST", "5"))
+
+# Opt-in hedging: a slow Bedrock call (past the recent p90) gets a duplicate, first result wins
+BEDROCK_HEDGE = os.getenv("BEDROCK_HEDGE", "0").lower() in ("1", "true", "yes")
+def _bedrock_hedger() -> Hedger:
+    return Hedger(
+        enabled=BEDROCK_HEDGE,
+        quantile=float(os.getenv("BEDROCK_HEDGE_QUANTILE", "0.9")),
+        budget_ratio=float(os.getenv("BEDROCK_HEDGE_BUDGET", "0.05")),
+    )
+_hedge_reply = _bedrock_hedger()    # whole /api/chat completion
+_hedge_stream = _bedrock_hedger()   # time to first token on streams
+metrics.register("hedge.reply", _hedge_reply.stats)
+metrics.register("hedge.stream", _hedge_stream.stats)
+_chat_gate = FairGate(f"bedrock:{BEDROCK_REGION}", CHAT_MAX_CONCURRENCY, max_limit=CHAT_MAX_LIMIT,
+                      rate=CHAT_SESSION_RATE, burst=CHAT_SESSION_BURST)
 
 STYLE_GUIDES = {
     "witty": "Style: Add light humor and playful comments when appropriate. Keep it clever but friendly.",
@@ -172,35 +345,141 @@ def _user_for_style(text: str, style: Optional[str]) -> str:
         return text
     return text
 
-def bedrock_reply(system_prompt: str, session_id: str, user_text: str, style: Optional[str] = None) -> str:
-    messages = get_msgs(session_id)
-    messages.append({"role":"user","content":[{"type":"text","text":_user_for_style(user_text, style)}]})
+# Streams stop at the clamp on their own, so they keep the full budget. Whole replies
+# are cut server side instead: enough for CLAMP_SENTENCES sentences in each style.
+STREAM_MAX_TOKENS = int(os.getenv("STREAM_MAX_TOKENS", "480"))
+REPLY_MAX_TOKENS = {"precise": 120, "witty": 160, "spicy": 160, "empathetic": 200}
+REPLY_MAX_TOKENS_DEFAULT = int(os.getenv("REPLY_MAX_TOKENS", "180"))
+
+def _reply_max_tokens(style: Optional[str]) -> int:
+    return REPLY_MAX_TOKENS.get((style or "").strip().lower(), REPLY_MAX_TOKENS_DEFAULT)
+
+def _bedrock_body(system_prompt: str, messages: list, style: Optional[str], max_tokens: int = STREAM_MAX_TOKENS) -> dict:
     s = (style or "").strip().lower()
     temp = 0.7
     if s in ("witty","spicy"): temp = 0.9
     elif s == "precise": temp = 0.4
     elif s == "empathetic": temp = 0.7
-    body = {
+    return {
         "anthropic_version": "bedrock-2023-05-31",
-    "max_tokens": 480,
+        "max_tokens": max_tokens,
         "temperature": temp,     # style-aware variety
         "top_p": 0.9,
-        "system": _compose_system(system_prompt, style),
+        "system": system_prompt,
         "messages": messages,
     }
+
+def _invoke_bedrock(body: dict) -> dict:
+    r = bedrock.invoke_model(
+        modelId=BEDROCK_MODEL, accept="application/json",
+        contentType="application/json", body=json.dumps(body)
+    )
+    return json.loads(r["body"].read())
+
+async def _invoke_bedrock_io(body: dict) -> dict:
+    """``_invoke_bedrock`` on the I/O pool for a hedged call.
+
+    A blocking ``invoke_model`` cannot be stopped, so a losing attempt still
+    runs (and is billed) to the end. When cancelled, this only finishes once
+    the call has, so the hedge's gate slot is held for as long as Bedrock works.
+    """
+    fut = asyncio.ensure_future(run_io(_invoke_bedrock, body))
+    try:
+        return await asyncio.shield(fut)
+    except asyncio.CancelledError:
+        await asyncio.wait([fut])
+        raise
+
+SUMMARY_PROMPT = (
+    "You keep Rem's memory of a chat. Summarize the conversation below in at most three short sentences. "
+    "Keep the user's name, facts they shared, preferences and any open questions. Plain text only."
+)
+SUMMARY_MAX_TOKENS = int(os.getenv("SUMMARY_MAX_TOKENS", "160"))
+COMPACTION_WAIT = float(os.getenv("COMPACTION_WAIT", "5"))
+_compacting: set = set()
+
+async def _compact_history(session_id: str):
+    w = _history.window(session_id, HISTORY_TOKEN_BUDGET)
+    if not w.fold:
+        return
+    lines = [f"{'User' if t.user else 'Rem'}: {t.text}" for t in w.fold]
+    if w.summary:
+        lines.insert(0, f"Summary so far: {w.summary}")
+    body = _bedrock_body(SUMMARY_PROMPT, [{"role": "user", "content": [{"type": "text", "text": "\n".join(lines)}]}], "precise",
+                         SUMMARY_MAX_TOKENS)
+    # Summaries are background work: they queue behind every chat turn, and are
+    # skipped (retried on a later turn) rather than adding load when Bedrock is busy
+    try:
+        acquired = await _chat_gate.acquire(timeout=COMPACTION_WAIT, session=session_id, priority=BACKGROUND)
+    except Overloaded:
+        acquired = False
+    if not acquired:
+        metrics.incr("history.compaction_deferred")
+        return
+    try:
+        data = await run_io(_invoke_bedrock, body)
+    finally:
+        _chat_gate.release()
+    summary = "".join(b.get("text") or "" for b in data.get("content", []) if b.get("type") == "text").strip()
+    if summary:
+        _history.set_summary(session_id, summary, w.fold_upto)
+        metrics.incr("history.compactions")
+
+def _compaction_done(session_id: str, task: "asyncio.Task"):
+    _compacting.discard(session_id)
+    if not task.cancelled() and task.exception():
+        metrics.incr("history.compaction_errors")
+        logger.warning("History compaction failed for %s: %r", session_id, task.exception())
+
+def _schedule_compaction(session_id: str):
+    """Regenerate the rolling summary in the background once turns fall out of the window."""
+    if session_id in _compacting or not _history.window(session_id, HISTORY_TOKEN_BUDGET).fold:
+        return
+    try:
+        task = asyncio.get_running_loop().create_task(_compact_history(session_id))
+    except RuntimeError:
+        return  # no event loop (e.g. called from a script); next request will retry
+    _compacting.add(session_id)
+    task.add_done_callback(lambda t: _compaction_done(session_id, t))
+
+# Repeated prompts (greetings, "what can you do") with the same persona/style/history
+_reply_cache = ReplyCache(
+    max_keys=int(os.getenv("REPLY_CACHE_MAX_KEYS", "512")),
+    ttl=float(os.getenv("REPLY_CACHE_TTL", "3600")),
+    variants=int(os.getenv("REPLY_CACHE_VARIANTS", "3")),
+    max_chars=int(os.getenv("REPLY_CACHE_MAX_CHARS", "120")),
+)
+metrics.register("reply_cache", _reply_cache.stats)
+
+def _reply_prompt(system_prompt: str, session_id: str, user_text: str,
+                  style: Optional[str] = None) -> Tuple[List[Dict], str, Optional[str]]:
+    """(history messages, system prompt with summary, reply cache key) for one chat turn."""
+    messages, summary, _ = _prompt_history(session_id)
+    system_prompt = _with_summary(system_prompt, summary)
+    return messages, system_prompt, _reply_cache.key(system_prompt, style, messages, user_text)
+
+async def bedrock_reply(system_prompt: str, session_id: str, user_text: str, style: Optional[str] = None,
+                        prompt: Optional[tuple] = None) -> str:
+    """One full completion. Callers look in the reply cache first (before the gate);
+    ``prompt`` is the ``_reply_prompt()`` they did that with, if any."""
+    messages, system_prompt, cache_key = prompt or _reply_prompt(system_prompt, session_id, user_text, style)
+    messages.append({"role":"user","content":[{"type":"text","text":_user_for_style(user_text, style)}]})
+    body = _bedrock_body(_compose_system(system_prompt, style), messages, style, _reply_max_tokens(style))
     last_err = None
     for attempt in range(BEDROCK_MAX_RETRIES):
         try:
-            r = bedrock.invoke_model(
-                modelId=BEDROCK_MODEL, accept="application/json",
-                contentType="application/json", body=json.dumps(body)
-            )
-            data = json.loads(r["body"].read())
+            t0 = time.perf_counter()
+            data = await _hedge_reply.run(lambda: _invoke_bedrock_io(body), gate=_chat_gate)
+            # Whole completions are kept apart from the streams' time to first token, and
+            # compared per 50 output tokens so a longer reply does not read as a slowdown
+            produced = data.get("usage", {}).get("output_tokens") or 0
+            _chat_gate.observe(latency=(time.perf_counter() - t0) / max(1.0, produced / 50), series="reply")
             break
         except ClientError as e:
             code = e.response.get("Error", {}).get("Code", "ClientError")
             if code in {"ThrottlingException", "TooManyRequestsException", "ServiceUnavailableException"}:
-                last_err = e; _retry_sleep(attempt); continue
+                _chat_gate.observe(throttled=True)
+                last_err = e; await _retry_sleep(attempt); continue
             raise
     else:
         raise last_err or RuntimeError("Bedrock retries exhausted")
@@ -208,43 +487,107 @@ def bedrock_reply(system_prompt: str, session_id: str, user_text: str, style: Op
     for block in data.get("content", []):
         if block.get("type") == "text":
             out += block.get("text") or ""
-    return clamp_sentences(enforce_identity(out) or "I'm here.")
+    if data.get("stop_reason") == "max_tokens":
+        # Cut mid-sentence: keep the complete sentences if there are any
+        parts = _SENTENCE_BREAK.split(out.strip())
+        if len(parts) > 1:
+            out = " ".join(parts[:-1])
+        metrics.incr("chat.reply_truncated")
+    clean = enforce_identity(out)
+    reply = clamp_sentences(clean or FALLBACK_REPLIES["empty"])
+    output_tokens = data.get("usage", {}).get("output_tokens", 0)
+    metrics.incr("chat.reply_output_tokens", output_tokens)
+    if clean:
+        # Tokens generated but thrown away by the clamp (proportional to the characters dropped)
+        metrics.incr("chat.reply_clamp_waste_tokens", round(output_tokens * (1 - len(reply) / len(clean))))
+    if out.strip():
+        _reply_cache.put(cache_key, reply)
+    return reply
+
+def _event_text(ev: dict, usage: Optional[dict] = None) -> Optional[str]:
+    chunk = ev.get("chunk", {}).get("bytes")
+    if not chunk:
+        return None
+    data = json.loads(chunk.decode("utf-8"))
+    if usage is not None:
+        if data.get("type") == "message_start":
+            usage.update(data.get("message", {}).get("usage", {}))
+        elif data.get("type") == "message_delta":
+            usage.update(data.get("usage", {}))
+    if data.get("type") == "content_block_delta":
+        d = data.get("delta", {})
+        if d.get("type") == "text_delta":
+            return d.get("text", "")
+    return None
+
+def _close_stream(resp: dict):
+    try:
+        resp["body"].close()
+    except Exception:
+        pass
 
-def _stream_bedrock_text(model_id: str, system_prompt: str, messages: list, style: Optional[str] = None):
-    s = (style or "").strip().lower()
-    temp = 0.7
-    if s in ("witty","spicy"): temp = 0.9
-    elif s == "precise": temp = 0.4
-    elif s == "empathetic": temp = 0.7
-    body = {
-        "anthropic_version": "bedrock-2023-05-31",
-    "max_tokens": 480,
-        "temperature": temp,
-        "top_p": 0.9,
-        "system": system_prompt,
-        "messages": messages,
-    }
+async def _open_bedrock_stream(model_id: str, body_json: str):
+    """Start a response stream and read up to its first text token.
+
+    Returns ``(stream, events, first_text, usage)``; ``events`` continues after
+    the first token and ``usage`` holds this attempt's token counts so far. The
+    stream is closed if this is cancelled (a losing hedge).
+    """
+    usage: dict = {}
+    resp = await run_io_or_release(
+        _close_stream, bedrock.invoke_model_with_response_stream,
+        modelId=model_id, accept="application/json",
+        contentType="application/json", body=body_json
+    )
+    stream = resp["body"]
+    events = iter(stream)
+    try:
+        async for ev in aiter_io(events):
+            text = _event_text(ev, usage)
+            if text is not None:
+                return stream, events, text, usage
+        return stream, events, None, usage
+    except BaseException:
+        stream.close()
+        raise
+
+async def _stream_bedrock_text(model_id: str, system_prompt: str, messages: list, style: Optional[str] = None,
+                               usage: Optional[dict] = None, on_open: Optional[Callable[[Any], None]] = None):
+    """Text deltas of one streamed completion; Bedrock's token counts go into ``usage``.
+
+    Closing the generator early (``aclose()``) closes the Bedrock stream, which
+    stops generation and billing there. ``on_open(stream)`` hands the stream to
+    callers that may need to close it from outside the generator.
+    """
+    body_json = json.dumps(_bedrock_body(system_prompt, messages, style))
     last_err = None
     for attempt in range(BEDROCK_MAX_RETRIES):
         try:
-            resp = bedrock.invoke_model_with_response_stream(
-                modelId=model_id, accept="application/json",
-                contentType="application/json", body=json.dumps(body)
+            t0 = time.perf_counter()
+            stream, events, first, opened = await _hedge_stream.run(
+                lambda: _open_bedrock_stream(model_id, body_json),
+                discard=lambda r: r[0].close(), gate=_chat_gate,
             )
-            for ev in resp["body"]:
-                chunk = ev.get("chunk", {}).get("bytes")
-                if not chunk:
-                    continue
-                data = json.loads(chunk.decode("utf-8"))
-                if data.get("type") == "content_block_delta":
-                    d = data.get("delta", {})
-                    if d.get("type") == "text_delta":
-                        yield d.get("text", "")
+            _chat_gate.observe(latency=time.perf_counter() - t0)   # time to first token
+            if usage is not None:
+                usage.update(opened)   # only the attempt that is kept counts
+            if on_open is not None:
+                on_open(stream)
+            try:
+                if first is not None:
+                    yield first
+                async for ev in aiter_io(events):
+                    text = _event_text(ev, usage)
+                    if text is not None:
+                        yield text
+            finally:
+                stream.close()
             return
         except ClientError as e:
             code = e.response.get("Error", {}).get("Code", "ClientError")
             if code in {"ThrottlingException", "TooManyRequestsException", "ServiceUnavailableException"}:
-                last_err = e; _retry_sleep(attempt); continue
+                _chat_gate.observe(throttled=True)
+                last_err = e; await _retry_sleep(attempt); continue
             raise
     raise last_err or RuntimeError("Bedrock stream retries exhausted")
 
@@ -348,17 +691,22 @@ def make_sing_ssml(text: str, lang: Optional[str] = None) -> str:
         return f"<speak><lang xml:lang='{lang_norm}'>{body}</lang></speak>"
     return f"<speak>{body}</speak>"
 
-_VOICES_CACHE = {}
+POLLY_ATTEMPT_BUDGET = int(os.getenv("POLLY_ATTEMPT_BUDGET", "6"))
+_polly_caps = CapabilityIndex(
+    voices_ttl=float(os.getenv("POLLY_VOICES_TTL", "21600")),
+    bad_ttl=float(os.getenv("POLLY_CAPS_BAD_TTL", "3600")),
+)
+metrics.register("polly_caps", _polly_caps.stats)
+
+def _warm_polly_caps():
+    # describe_voices for every region in the background; synthesis never waits on it
+    _polly_caps.warm(_polly_clients())
+metrics.register("polly_regions", _polly_regions.snapshot)
+metrics.register("limits", lambda: {g.name: g.stats() for g in [_chat_gate, *_polly_gates.values()]})
+
 def _get_voices(client=None):
-    """Cache voices per region client."""
-    c = client or polly
-    key = getattr(c.meta, "region_name", "default")
-    if key not in _VOICES_CACHE:
-        try:
-            _VOICES_CACHE[key] = c.describe_voices().get("Voices", [])
-        except Exception:
-            _VOICES_CACHE[key] = []
-    return _VOICES_CACHE[key]
+    """Voices per region client (refreshed periodically; failed lookups are retried)."""
+    return _polly_caps.voices(client or polly)
 
 def _choose_voice(preferred: str, engine: str) -> str:
     """Return the preferred voice only (strict). Engine compatibility is handled by callers.
@@ -370,82 +718,126 @@ def _choose_voice(preferred: str, engine: str) -> str:
     """
     return preferred
 
-def _synthesize_audio(clean: str, voice: str, lang: Optional[str] = None) -> Tuple[bytes, str, str, any]:
+_SKIPPABLE_POLLY_ERRORS = {"InvalidSsmlException","EngineNotSupportedException","TextLengthExceededException",
+                           "InvalidVoiceIdException","UnsupportedPlsAlphabetException","LanguageNotSupportedException",
+                           "ValidationException"}
+
+# Errors that say the region is unwell rather than that the request is wrong
+_REGION_ERRORS = {"ThrottlingException", "ServiceFailureException", "ServiceUnavailableException",
+                  "InternalFailure", "RequestTimeout"}
+
+def _region_failure(e: Exception) -> bool:
+    if isinstance(e, ClientError):
+        code = e.response.get("Error", {}).get("Code", "")
+        status = e.response.get("ResponseMetadata", {}).get("HTTPStatusCode") or 0
+        return code in _REGION_ERRORS or status >= 500
+    return isinstance(e, BotoCoreError)  # connection errors and timeouts
+
+class _RegionStream:
+    """An open Polly ``AudioStream`` that reports read failures against the region serving it.
+
+    Opening the stream already counted as a success for the region; a connection
+    that breaks while the audio is still being read has to count as well.
+    """
+    def __init__(self, body, client):
+        self._body = body
+        self._client = client
+
+    def iter_chunks(self, chunk_size: int = 1024):
+        t0 = time.perf_counter()
+        try:
+            yield from self._body.iter_chunks(chunk_size=chunk_size)
+        except Exception:
+            _polly_regions.record(self._client, (time.perf_counter() - t0) * 1000, ok=False)
+            metrics.incr("polly.stream_errors")
+            raise
+
+    def close(self):
+        self._body.close()
+
+def _run_plan(name: str, voice: str, steps: List[tuple], stream: bool, budget: Optional[AttemptBudget]) -> Tuple[bytes, str, str, any]:
+    """Try ``(engine, text_type, text, kind)`` steps on each region in capability order.
+
+    A region-level failure (throttling, 5xx, timeout) is recorded against that
+    region's breaker and the request moves on to the next region.
+    """
+    last = region_err = None
+    failed = set()
+    for client, engine, text_type, text, kind in _polly_caps.plan(name, voice, steps, _polly_clients()):
+        if id(client) in failed:
+            continue
+        if budget is not None:
+            budget.take()
+        metrics.incr("polly.attempts")
+        t0 = time.perf_counter()
+        try:
+            r = client.synthesize_speech(
+                VoiceId=voice, OutputFormat="mp3",
+                Text=text, TextType=text_type, Engine=engine
+            )
+            audio = _RegionStream(r["AudioStream"], client) if stream else r["AudioStream"].read()
+        except Exception as e:
+            if _region_failure(e):
+                _polly_regions.record(client, (time.perf_counter() - t0) * 1000, ok=False)
+                _polly_gate(client).observe(throttled=True)
+                metrics.incr("polly.region_failover")
+                failed.add(id(client))
+                region_err = e; continue
+            if not isinstance(e, ClientError):
+                raise
+            # The region answered; the request itself was rejected (not a health signal)
+            code = e.response.get("Error", {}).get("Code", "")
+            if code in _SKIPPABLE_POLLY_ERRORS:
+                _polly_caps.record_failure(voice, client, engine, kind, code)
+                last = e; continue
+            raise
+        elapsed = time.perf_counter() - t0
+        _polly_regions.record(client, elapsed * 1000, ok=True)
+        # Synthesis time scales with text length; compare per 100 characters
+        _polly_gate(client).observe(latency=elapsed / max(1.0, len(text) / 100))
+        _polly_caps.record_success(name, voice, client, engine, kind)
+        # Serving from a fallback region is routine once the primary is slow or open;
+        # count it (see /api/metrics) and keep the per-request line at DEBUG.
+        try:
+            region = getattr(client.meta, "region_name", "")
+            if region and region != POLLY_REGION:
+                metrics.incr("polly.fallback_region")
+                logger.debug(
+                    "Polly voice %s synthesized from fallback region %s (primary %s)",
+                    voice, region, POLLY_REGION
+                )
+        except Exception:
+            pass
+        return audio, engine, voice, client
+    if region_err: raise region_err
+    if last: raise last
+    raise RuntimeError(f"Polly {name} synthesis failed")
+
+def _synthesize_audio(clean: str, voice: str, lang: Optional[str] = None, stream: bool = False,
+                      budget: Optional[AttemptBudget] = None) -> Tuple[bytes, str, str, any]:
     """Return (audio_bytes, engine_used, voice_used, polly_client_used).
 
     Always uses the preferred voice (POLLY_VOICE). Tries neural/standard and
     will switch to a fallback region if necessary, but never changes the voice.
+    Combinations known not to work are skipped (see ``_polly_caps``).
+    With ``stream=True`` the unread Polly ``AudioStream`` is returned instead of bytes.
     """
+    ssml = make_ssml(clean, lang)
     plan = [
-        ("neural",   "ssml", make_ssml(clean, lang)),
-        ("standard", "ssml", make_ssml(clean, lang)),
-        ("neural",   "text", clean),
-        ("standard", "text", clean),
+        ("neural",   "ssml", ssml,  "ssml"),
+        ("standard", "ssml", ssml,  "ssml"),
+        ("neural",   "text", clean, "text"),
+        ("standard", "text", clean, "text"),
     ]
-    last = None
-    for client in _polly_clients():
-        for engine, text_type, text in plan:
-            voice_id = voice
-            try:
-                r = client.synthesize_speech(
-                    VoiceId=voice_id, OutputFormat="mp3",
-                    Text=text, TextType=text_type, Engine=engine
-                )
-                # If we had to use fallback region, log once
-                try:
-                    region = getattr(client.meta, "region_name", "")
-                    if region and region != POLLY_REGION:
-                        logger.warning(
-                            "Polly voice %s synthesized from fallback region %s (primary %s)",
-                            voice_id, region, POLLY_REGION
-                        )
-                except Exception:
-                    pass
-                return r["AudioStream"].read(), engine, voice_id, client
-            except ClientError as e:
-                code = e.response.get("Error", {}).get("Code", "")
-                if code in {"InvalidSsmlException","EngineNotSupportedException","TextLengthExceededException",
-                            "InvalidVoiceIdException","UnsupportedPlsAlphabetException","LanguageNotSupportedException",
-                            "ValidationException"}:
-                    last = e; continue
-                raise
-        # try next client (fallback region)
-    if last: raise last
-    raise RuntimeError("Polly synthesis failed")
+    return _run_plan("tts", voice, plan, stream, budget)
 
-def _synthesize_ssml(ssml: str, voice: str) -> Tuple[bytes, str, str, any]:
+def _synthesize_ssml(ssml: str, voice: str, stream: bool = False,
+                     budget: Optional[AttemptBudget] = None) -> Tuple[bytes, str, str, any]:
     plan = [
-        ("neural",   "ssml"),
-        ("standard", "ssml"),
+        ("neural",   "ssml", ssml, "sing"),
+        ("standard", "ssml", ssml, "sing"),
     ]
-    last = None
-    for client in _polly_clients():
-        for engine, text_type in plan:
-            voice_id = voice
-            try:
-                r = client.synthesize_speech(
-                    VoiceId=voice_id, OutputFormat="mp3",
-                    Text=ssml, TextType=text_type, Engine=engine
-                )
-                try:
-                    region = getattr(client.meta, "region_name", "")
-                    if region and region != POLLY_REGION:
-                        logger.warning(
-                            "Polly voice %s synthesized from fallback region %s (primary %s)",
-                            voice_id, region, POLLY_REGION
-                        )
-                except Exception:
-                    pass
-                return r["AudioStream"].read(), engine, voice_id, client
-            except ClientError as e:
-                code = e.response.get("Error", {}).get("Code", "")
-                if code in {"InvalidSsmlException","EngineNotSupportedException","TextLengthExceededException",
-                            "InvalidVoiceIdException","UnsupportedPlsAlphabetException","LanguageNotSupportedException",
-                            "ValidationException"}:
-                    last = e; continue
-                raise
-    if last: raise last
-    raise RuntimeError("Polly SSML synthesis failed")
+    return _run_plan("sing", voice, plan, stream, budget)
 
 def _visemes(clean: str, engine: str, voice: str, client=None) -> list:
     c = client or polly
@@ -458,35 +850,6 @@ def _visemes(clean: str, engine: str, voice: str, client=None) -> list:
     except Exception:
         return []
 
-VOICE_MAP = {
-    # English
-    "en": "Ruth",
-    # Spanish
-    "es": "Lucia",      # Spain (Neural female)
-    "es-mx": "Mia",     # Mexico (Neural female)
-    # French
-    "fr": "Lea",        # France (Neural female) — fallback to Celine if unavailable
-    "fr-fr": "Lea",
-    "fr-ca": "Chantal",  # Canada (female)
-    # Hindi
-    "hi": "Aditi",       # Bilingual hi-IN / en-IN female
-    # Other examples kept
-    "de": "Vicki",
-    "it": "Bianca",
-    "pt": "Camila",
-    "ja": "Mizuki",
-    "ko": "Seoyeon",
-    "zh": "Zhiyu",
-    "ar": "Zeina",
-    "nl": "Lotte",
-    "sv": "Astrid",
-    "da": "Naja",
-    "nb": "Liv",
-    "pl": "Maja",
-    "ru": "Tatyana",
-    "tr": "Filiz",
-}
-
 def _voice_candidates(lang_hint: Optional[str], mode: Optional[str]) -> List[str]:
     if (mode or "").lower() != "auto":
         return [POLLY_VOICE]
@@ -506,15 +869,94 @@ def _voice_candidates(lang_hint: Optional[str], mode: Optional[str]) -> List[str
     }
     return prefs.get(hint) or prefs.get(f"{base}-{'mx' if base=='es' else 'fr' if base=='fr' else 'in' if base=='hi' else ''}") or prefs.get(base) or [VOICE_MAP.get(hint) or VOICE_MAP.get(base) or VOICE_MAP["en"]]
 
-def polly_tts_with_visemes(text: str, lang: Optional[str] = None, mode: Optional[str] = None) -> Tuple[str, list]:
+def _resolve_lang(text: str, lang: Optional[str], mode: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """Fill in a missing or "auto" language from the text itself.
+
+    A detected language gets the mode the page sends for it (native voice unless
+    English), so the TTS cache and audio pack keys match what the page would ask for.
+    """
+    if lang and lang.strip().lower() != "auto":
+        return lang, mode
+    found = detect_lang(text)
+    if found is None:
+        metrics.incr("lang_detect.undecided")
+        return None, mode
+    metrics.incr("lang_detect.detected")
+    return found, mode or (None if found == "en" else "auto")
+
+# Last (engine, client) that produced audio for each voice; aims the concurrent viseme call
+_last_audio_route: Dict[str, Tuple[str, Any]] = {}
+
+# Where viseme marks come from:
+#   polly  - a second Polly call for speech marks (exact, one extra billed request)
+#   local  - offline grapheme-to-viseme track scaled to the audio length (no extra call)
+#   refine - local marks now; Polly marks fetched in the background replace the cached
+#            entry's marks, so repeats of this audio serve exact marks
+VISEME_MODE = os.getenv("VISEME_MODE", "polly").strip().lower()
+
+class _LocalMarks(list):
+    """Offline viseme marks; in refine mode ``refined`` is the future for Polly's exact marks.
+
+    The list itself is never modified once returned: it may already be serialized
+    into a response or sized by the cache. Exact marks are published as a new list.
+    """
+    refined = None
+
+def _publish_refined(key: str, marks: list, fut):
+    try:
+        exact = fut.result()
+    except Exception:
+        exact = None
+    if exact and _tts_cache.replace_marks(key, marks, list(exact)):
+        metrics.incr("visemes.refined")
+
+def _local_with_audio(synth_audio: Callable[[], tuple], clean: str, lang: Optional[str]) -> Tuple[bytes, list]:
+    audio, used_engine, used_voice, used_client = synth_audio()
+    _last_audio_route[used_voice] = (used_engine, used_client)
+    # Streamed audio (an unread AudioStream) has no known length yet; use the nominal pace
+    duration = mp3_duration_ms(audio) if isinstance(audio, (bytes, bytearray)) else None
+    marks = _LocalMarks(local_visemes(clean, lang, duration))
+    metrics.incr("visemes.local")
+    if VISEME_MODE == "refine":
+        marks.refined = submit_side(_visemes, clean, used_engine, used_voice, used_client)
+    return audio, marks
+
+def _with_visemes(synth_audio: Callable[[], tuple], clean: str, voice: str, lang: Optional[str] = None) -> Tuple[bytes, list]:
+    """Run ``synth_audio()`` and the viseme request concurrently.
+
+    The viseme call is aimed at the route that last worked for this voice
+    (default: neural on the healthiest closed region). If audio ends up on a different
+    engine, or the viseme call failed where audio moved region, the marks are
+    fetched again for the route actually used. In ``local``/``refine`` mode
+    (see ``VISEME_MODE``) marks are generated offline instead.
+    """
+    if VISEME_MODE in ("local", "refine"):
+        return _local_with_audio(synth_audio, clean, lang)
+    # peek, not order: the viseme call's outcome is never recorded, so it must not
+    # take a recovering region's half-open probe away from the audio call
+    engine, client = _last_audio_route.get(voice) or (
+        "neural", _polly_regions.peek([c for c in (polly, polly_fb) if c is not None]))
+    marks_f = submit_side(_visemes, clean, engine, voice, client)
+    try:
+        audio, used_engine, used_voice, used_client = synth_audio()
+    except BaseException:
+        marks_f.cancel()
+        raise
+    _last_audio_route[used_voice] = (used_engine, used_client)
+    marks = marks_f.result()
+    if used_engine != engine or used_voice != voice or (not marks and used_client is not client):
+        metrics.incr("polly.viseme_reconciled")
+        marks = _visemes(clean, used_engine, used_voice, used_client)
+    return audio, marks
+
+def polly_tts_with_visemes(text: str, lang: Optional[str] = None, mode: Optional[str] = None, stream: bool = False,
+                           budget: Optional[AttemptBudget] = None) -> Tuple[bytes, list]:
     clean = strip_stage(text) or text
     candidates = _voice_candidates(lang, mode)
     last_exc = None
     for v in candidates:
         try:
-            audio, engine, used_voice, client = _synthesize_audio(clean, v, lang)
-            marks = _visemes(clean, engine, used_voice, client)
-            return base64.b64encode(audio).decode("ascii"), marks
+            return _with_visemes(lambda: _synthesize_audio(clean, v, lang, stream, budget), clean, v, lang)
         except ClientError as e:
             code = e.response.get("Error", {}).get("Code", "")
             if code in {"InvalidVoiceIdException","LanguageNotSupportedException","ValidationException","EngineNotSupportedException"}:
@@ -522,11 +964,10 @@ def polly_tts_with_visemes(text: str, lang: Optional[str] = None, mode: Optional
             raise
     if last_exc: raise last_exc
     # Fallback to default
-    audio, engine, used_voice, client = _synthesize_audio(clean, POLLY_VOICE, lang)
-    marks = _visemes(clean, engine, used_voice, client)
-    return base64.b64encode(audio).decode("ascii"), marks
+    return _with_visemes(lambda: _synthesize_audio(clean, POLLY_VOICE, lang, stream, budget), clean, POLLY_VOICE, lang)
 
-def polly_sing_with_visemes(text: str, lang: Optional[str] = None, mode: Optional[str] = None) -> Tuple[str, list]:
+def polly_sing_with_visemes(text: str, lang: Optional[str] = None, mode: Optional[str] = None, stream: bool = False,
+                            budget: Optional[AttemptBudget] = None) -> Tuple[bytes, list]:
     # Reject explicit lyrics (basic filter)
     bad = re.compile(r"\b(fuck|shit|bitch|asshole|slut|whore|dick|pussy|cunt|rape|kill|suicide)\b", re.I)
     if bad.search(text or ""):
@@ -547,16 +988,12 @@ def polly_sing_with_visemes(text: str, lang: Optional[str] = None, mode: Optiona
         try:
             # Try singing SSML first
             try:
-                audio, engine, used_voice, client = _synthesize_ssml(ssml, v)
-                marks = _visemes(clean, engine, used_voice, client)
-                return base64.b64encode(audio).decode("ascii"), marks
+                return _with_visemes(lambda: _synthesize_ssml(ssml, v, stream, budget), clean, v, lang)
             except ClientError as e:
                 code = e.response.get("Error", {}).get("Code", "")
                 # Graceful fallback: if SSML is invalid or not supported, use regular TTS SSML
                 if code in {"InvalidSsmlException", "ValidationException"}:
-                    audio2, engine2, used_voice2, client2 = _synthesize_audio(clean, v, lang)
-                    marks2 = _visemes(clean, engine2, used_voice2, client2)
-                    return base64.b64encode(audio2).decode("ascii"), marks2
+                    return _with_visemes(lambda: _synthesize_audio(clean, v, lang, stream, budget), clean, v, lang)
                 else:
                     raise
         except ClientError as e:
@@ -565,31 +1002,36 @@ def polly_sing_with_visemes(text: str, lang: Optional[str] = None, mode: Optiona
                 last_exc = e; continue
             raise
     if last_exc: raise last_exc
-    audio, engine, used_voice, client = _synthesize_ssml(ssml, POLLY_VOICE)
-    marks = _visemes(clean, engine, used_voice, client)
-    return base64.b64encode(audio).decode("ascii"), marks
+    return _with_visemes(lambda: _synthesize_ssml(ssml, POLLY_VOICE, stream, budget), clean, POLLY_VOICE, lang)
 
 # ---- API --------------------------------------------------------------------
+# Time, date, name, creator and greetings are answered without Bedrock (see LOCAL_INTENTS)
+_intents = IntentRouter()
+metrics.register("intents", _intents.stats)
+
 @app.post("/api/chat")
-def chat(payload: ChatIn):
+async def chat(payload: ChatIn):
     txt = payload.text.strip()
     sid = (payload.session_id or "local").strip()
     if not txt:
         raise HTTPException(400, "Empty text")
+    system_prompt = _compose_system(PERSONA_BLESSED_BOY, payload.style)
+    prompt = None
+    local = _intents.answer(txt)
+    if not local:
+        # A cached reply needs no upstream call: answer it before the rate limit and gate
+        prompt = _reply_prompt(system_prompt, sid, txt, payload.style)
+        local = _reply_cache.get(prompt[2])
+    if local:
+        add_turn(sid, "user", txt)
+        add_turn(sid, "assistant", local)
+        return {"reply": local}
     try:
-        if not _chat_gate.acquire(timeout=10):
+        _chat_gate.admit(sid)
+        if not await _chat_gate.acquire(timeout=10, session=sid, priority=CHAT):
             raise HTTPException(429, "Chat busy, try again shortly")
         try:
-            q = txt.lower()
-            from datetime import datetime
-            if "date" in q and "update" not in q:
-                reply = datetime.now().strftime("Today is %B %d, %Y.")
-            elif "time" in q:
-                reply = datetime.now().strftime("It's %I:%M %p.")
-            elif q in {"what's your name","whats your name","your name?","who are you"}:
-                reply = "Rem."
-            else:
-                reply = bedrock_reply(_compose_system(PERSONA_BLESSED_BOY, payload.style), sid, txt, payload.style)
+            reply = await bedrock_reply(system_prompt, sid, txt, payload.style, prompt)
 
             add_turn(sid, "user", txt)
             add_turn(sid, "assistant", reply)
@@ -597,127 +1039,625 @@ def chat(payload: ChatIn):
         finally:
             try: _chat_gate.release()
             except Exception: pass
+    except Overloaded as e:
+        raise HTTPException(429, "Chat busy, try again shortly", headers=e.headers)
+    except HTTPException:
+        raise
     except ClientError as e:
         code = e.response.get("Error", {}).get("Code", "ClientError")
         raise HTTPException(500, f"Bedrock error: {code}")
     except Exception as e:
         raise HTTPException(500, f"Chat failure: {e.__class__.__name__}")
 
+# A sentence ends at . ! or ? (optionally closed by a quote/paren) followed by whitespace.
+# Mirrors the boundary the browser used when it split deltas for /api/tts itself.
+_SENTENCE_RE = re.compile(r'(.+?[.!?][)"\']?\s)')
+
+def _pop_sentences(buf: str) -> Tuple[List[str], str]:
+    """Split complete sentences off the front of ``buf``; return (sentences, remainder)."""
+    out: List[str] = []
+    while True:
+        m = _SENTENCE_RE.match(buf)
+        if not m or len(m.group(1).strip()) <= 3:
+            return out, buf
+        out.append(m.group(1).strip())
+        buf = buf[m.end():]
+
+async def _speak_frame(seq: int, sentence: str, lang: Optional[str], mode: Optional[str], session: str = "") -> dict:
+    try:
+        audio, marks = await _tts_synthesize(sentence, lang, mode, session=session)
+        return {"tts": {"seq": seq, "text": sentence, "audio_b64": base64.b64encode(audio).decode("ascii"), "marks": marks}}
+    except Exception as e:
+        # The client falls back to /api/tts for this sentence
+        detail = e.detail if isinstance(e, HTTPException) else e.__class__.__name__
+        return {"tts": {"seq": seq, "text": sentence, "error": f"TTS failure: {detail}"}}
+
+class _SpeechPipeline:
+    """Starts Polly synthesis per completed sentence and hands frames back in order."""
+
+    def __init__(self, lang: Optional[str], mode: Optional[str], session: str = ""):
+        self.lang, self.mode, self.session = lang, mode, session
+        self.buf = ""
+        self.seq = 0
+        self.pending: deque = deque()
+
+    def _start(self, sentence: str):
+        clean = enforce_identity(sentence)
+        if not clean:
+            return
+        lang, mode = _resolve_lang(clean, self.lang, self.mode)
+        self.pending.append(asyncio.ensure_future(_speak_frame(self.seq, clean, lang, mode, self.session)))
+        self.seq += 1
+
+    def feed(self, delta: str):
+        sentences, self.buf = _pop_sentences(self.buf + delta)
+        for sentence in sentences:
+            self._start(sentence)
+
+    def ready(self) -> List[dict]:
+        """Frames whose synthesis finished, without skipping ahead of a pending one."""
+        out = []
+        while self.pending and self.pending[0].done():
+            out.append(self.pending.popleft().result())
+        return out
+
+    async def drain(self):
+        if self.buf.strip():
+            self._start(self.buf.strip())
+            self.buf = ""
+        while self.pending:
+            yield await self.pending.popleft()
+
+    def cancel(self):
+        for task in self.pending:
+            task.cancel()
+        self.pending.clear()
+
+CHAT_DISCONNECT_POLL = float(os.getenv("CHAT_DISCONNECT_POLL", "0.5"))
+
+class _StreamLease:
+    """A chat stream's gate slot and Bedrock stream, releasable from outside its generator.
+
+    When the client goes away Starlette usually cancels the body iterator, and
+    ``chat_stream`` interrupts the lease from its cancellation handler. When it
+    only stops iterating, the disconnect watcher does it instead; otherwise the
+    slot and the upstream stream would stay held until garbage collection.
+    """
+
+    def __init__(self, gate: FairGate):
+        self.gate = gate
+        self.held = True
+        self.stream = None
+        self.interrupted = False
+
+    def attach(self, stream):
+        self.stream = stream
+        if self.interrupted:
+            self.close()
+
+    def close(self):
+        if self.stream is not None:
+            try: self.stream.close()
+            except Exception: pass
+
+    def release(self):
+        if self.held:
+            self.held = False
+            try: self.gate.release()
+            except Exception: pass
+
+    def interrupt(self) -> bool:
+        """Close and release everything; False if the lease was already interrupted."""
+        if self.interrupted:
+            return False
+        self.interrupted = True
+        self.close()
+        if self.held:
+            self.release()
+            metrics.incr("chat_stream.reclaimed_slots")
+        return True
+
+async def _watch_disconnect(request: Request, lease: _StreamLease, on_interrupt: Callable[[], None]):
+    # Backstop for a body iterator that is abandoned rather than cancelled
+    while lease.held:
+        if await request.is_disconnected():
+            if lease.interrupt():
+                on_interrupt()
+            return
+        await asyncio.sleep(CHAT_DISCONNECT_POLL)
+
 @app.post("/api/chat_stream")
-def chat_stream(payload: ChatStreamIn):
+async def chat_stream(payload: ChatStreamIn, request: Request):
     txt = payload.text.strip()
     sid = (payload.session_id or "local").strip()
     if not txt:
         raise HTTPException(400, "Empty text")
 
-    messages = get_msgs(sid) + [{"role": "user", "content": [{"type": "text", "text": txt}]}]
-    system_prompt = _compose_system(PERSONA_BLESSED_BOY, payload.style)
+    history, summary, usage = _prompt_history(sid)
+    messages = history + [{"role": "user", "content": [{"type": "text", "text": txt}]}]
+    system_prompt = _with_summary(_compose_system(PERSONA_BLESSED_BOY, payload.style), summary)
+    cache_key = _reply_cache.key(system_prompt, payload.style, history, txt)
+    cached = _intents.answer(txt) or _reply_cache.get(cache_key)
+
+    def line(obj: dict) -> bytes:
+        return (json.dumps(obj) + "\n").encode("utf-8")
+
+    async def replay():
+        # Serve a local or cached reply as a synthetic stream: same frames, no gate, no Bedrock
+        speech = _SpeechPipeline(payload.lang, payload.mode, sid) if payload.speak else None
+        try:
+            for token in re.findall(r"\S+\s*", cached):
+                yield line({"delta": token})
+                if speech:
+                    speech.feed(token)
+            if speech:
+                async for frame in speech.drain():
+                    yield line(frame)
+            add_turn(sid, "user", txt)
+            add_turn(sid, "assistant", cached)
+        finally:
+            if speech:
+                speech.cancel()
+
+    async def gen():
+        speech = _SpeechPipeline(payload.lang, payload.mode, sid) if payload.speak else None
+        lease, recorded = None, False
+        buff, sent = [], []
+
+        def interrupted():
+            # Keep what the user actually saw, marked as cut off. With nothing sent the
+            # exchange is dropped: a lone user turn would break role alternation.
+            metrics.incr("chat_stream.interrupted")
+            if sent:
+                add_turn(sid, "user", txt)
+                add_turn(sid, "assistant", "".join(sent) + "…")
+
+        def abandon():
+            # Client gone: Starlette cancels (or closes) this generator, usually before the
+            # watcher's next poll, so reclaim the slot and record the turn right here
+            if lease is not None and not recorded and lease.interrupt():
+                interrupted()
 
-    def gen():
         try:
-            buff = []
-            acquired = _chat_gate.acquire(timeout=10)
+            clean = StreamSanitizer()   # deltas go out already free of stage directions and name slips
+            clamp = _ClampWatch()
+            read_all = _clamp_savings.sample()
+            stream_usage: Dict[str, int] = {}
+            tail_chars = 0
+            try:
+                acquired = await _chat_gate.acquire(timeout=10, session=sid, priority=CHAT)
+            except Overloaded as e:
+                yield line({"error": "Chat busy, try again shortly", "retry_after": e.headers["Retry-After"]})
+                return
             if not acquired:
-                yield (json.dumps({"error": "Chat busy, try again shortly"}) + "\n").encode("utf-8")
+                yield line({"error": "Chat busy, try again shortly"})
                 return
+            lease = _StreamLease(_chat_gate)
+            watcher = asyncio.ensure_future(_watch_disconnect(request, lease, interrupted))
+            tokens = _stream_bedrock_text(BEDROCK_MODEL, system_prompt, messages, payload.style, stream_usage,
+                                          on_open=lease.attach)
             try:
-                for token in _stream_bedrock_text(BEDROCK_MODEL, system_prompt, messages, payload.style):
+                async for token in tokens:
+                    if lease.interrupted:
+                        break
                     token = token.replace("\n", " ")
                     buff.append(token)
-                    yield (json.dumps({"delta": token}) + "\n").encode("utf-8")
+                    if clamp.done:
+                        tail_chars += len(token)   # sampled stream: measuring what the clamp drops
+                        continue
+                    out = clamp.feed(clean.feed(token))
+                    if out:
+                        sent.append(out)
+                        yield line({"delta": out})
+                    if speech:
+                        speech.feed(out)
+                        for frame in speech.ready():
+                            yield line(frame)
+                    if clamp.done and not read_all:
+                        break   # the rest would be clamped away; stop paying for it
+            except (asyncio.CancelledError, GeneratorExit):
+                abandon()   # before the finally below releases the slot
+                raise
+            except Exception:
+                if lease.interrupted:
+                    return   # the read failed because the watcher closed the stream
+                raise
             finally:
-                try: _chat_gate.release()
-                except Exception: pass
+                # Synchronous first: under cancellation the await below may not run
+                watcher.cancel()
+                lease.release()
+                lease.close()
+                await tokens.aclose()
 
-            final = clamp_sentences(enforce_identity("".join(buff)) or "I'm here.")
+            if lease.interrupted:
+                return
+            out = clamp.feed(clean.flush())
+            if out:
+                sent.append(out)
+                yield line({"delta": out})
+                if speech:
+                    speech.feed(out)
+            saved = 0
+            if clamp.done and not read_all:
+                saved = _clamp_savings.early_stop()
+                metrics.incr("chat.clamp_saved_tokens", saved)
+            elif clamp.done and stream_usage.get("output_tokens"):
+                raw = sum(map(len, buff)) or 1
+                _clamp_savings.observe_tail(stream_usage["output_tokens"] * tail_chars / raw)
+            if speech:
+                async for frame in speech.drain():
+                    yield line(frame)
+            final = clamp_sentences("".join(sent) or FALLBACK_REPLIES["empty"])
+            if "".join(buff).strip():
+                _reply_cache.put(cache_key, final)
             add_turn(sid, "user", txt)
             add_turn(sid, "assistant", final)
+            recorded = True
+            yield line({"usage": {**usage, "clamp_saved_tokens": saved}})
+        except (asyncio.CancelledError, GeneratorExit):
+            abandon()
+            raise
         except ClientError as e:
             code = e.response.get("Error", {}).get("Code", "ClientError")
             if code in {"ThrottlingException", "TooManyRequestsException", "ServiceUnavailableException"}:
                 # Fallback: get a full reply non-streaming and send once
                 try:
-                    reply = bedrock_reply(_compose_system(PERSONA_BLESSED_BOY, payload.style), sid, txt, payload.style)
-                    yield (json.dumps({"delta": reply}) + "\n").encode("utf-8")
+                    reply = await bedrock_reply(_compose_system(PERSONA_BLESSED_BOY, payload.style), sid, txt, payload.style)
+                    yield line({"delta": reply})
+                    if speech:
+                        speech.cancel()
+                        speech.buf = ""
+                        speech.feed(reply + " ")
+                        async for frame in speech.drain():
+                            yield line(frame)
                 except Exception:
-                    yield (json.dumps({"error": f"Bedrock error: {code}"}) + "\n").encode("utf-8")
+                    yield line({"error": f"Bedrock error: {code}"})
             else:
-                yield (json.dumps({"error": f"Bedrock error: {code}"}) + "\n").encode("utf-8")
+                yield line({"error": f"Bedrock error: {code}"})
         except Exception as e:
-            yield (json.dumps({"error": f"Stream failure: {e.__class__.__name__}"}) + "\n").encode("utf-8")
-
-    return StreamingResponse(gen(), media_type="application/jsonl")
-
-_TTS_MAX_CONCURRENCY = int(os.getenv("TTS_MAX_CONCURRENCY", "3"))
-_tts_gate = threading.Semaphore(_TTS_MAX_CONCURRENCY)
+            yield line({"error": f"Stream failure: {e.__class__.__name__}"})
+        finally:
+            if speech:
+                speech.cancel()
 
-# Simple in-memory cache: text -> (expires_epoch, audio_b64, marks)
+    if not cached:
+        # Rate-limited sessions are turned away before the stream starts so Retry-After can be sent
+        try:
+            _chat_gate.admit(sid)
+        except Overloaded as e:
+            raise HTTPException(429, "Chat busy, try again shortly", headers=e.headers)
+    return StreamingResponse(replay() if cached else gen(), media_type="application/jsonl")
+
+_TTS_MAX_CONCURRENCY = int(os.getenv("TTS_MAX_CONCURRENCY", "3"))   # starting limit per region; adapts (AIMD)
+_TTS_MAX_LIMIT = int(os.getenv("TTS_MAX_LIMIT", "16"))
+# Direct /api/tts and /api/sing cache misses per session; spoken chat sentences are not counted
+TTS_SESSION_RATE = float(os.getenv("TTS_SESSION_RATE", "2"))
+TTS_SESSION_BURST = float(os.getenv("TTS_SESSION_BURST", "8"))
+
+# Byte-budgeted LRU with frequency-based admission, shared by /api/tts and /api/sing
 _TTS_TTL_SECONDS = int(os.getenv("TTS_CACHE_TTL", "900"))  # 15 minutes
-_tts_cache: Dict[str, Tuple[float, str, list]] = {}
-_tts_cache_lock = threading.Lock()
+_tts_cache = TTSCache(
+    max_bytes=int(os.getenv("TTS_CACHE_MAX_BYTES", str(64 << 20))),
+    ttl=_TTS_TTL_SECONDS,
+    sweep_interval=float(os.getenv("TTS_CACHE_SWEEP_SECONDS", "60")),
+)
+metrics.register("tts_cache", _tts_cache.stats)
+
+def _start_tts_cache_sweeper():
+    _tts_cache.start_sweeper()
 
 def _tts_cache_get(key: str):
-    now = time.time()
-    with _tts_cache_lock:
-        rec = _tts_cache.get(key)
-        if not rec:
-            return None
-        exp, audio_b64, marks = rec
-        if exp < now:
-            _tts_cache.pop(key, None)
-            return None
-        return audio_b64, marks
-
-def _tts_cache_put(key: str, audio_b64: str, marks: list):
-    with _tts_cache_lock:
-        _tts_cache[key] = (time.time() + _TTS_TTL_SECONDS, audio_b64, marks)
-
-def _retry_sleep(attempt: int):
-    base = 0.25 * (2 ** attempt)
-    time.sleep(base + random.random() * 0.2)
+    return _audio_pack.get(key) or _tts_cache.get(key)
+
+def _tts_cache_put(key: str, audio: bytes, marks: list):
+    _tts_cache.put(key, audio, marks)
+    refined = getattr(marks, "refined", None)
+    if refined is not None:
+        # Runs at once if the exact marks already arrived
+        refined.add_done_callback(lambda f: _publish_refined(key, marks, f))
+
+@app.get("/api/tts/cache")
+def tts_cache_stats():
+    return _tts_cache.stats()
+
+def _tts_key(txt: str, lang: Optional[str], mode: Optional[str], prefix: str = "") -> str:
+    # Cache by normalized text, including language and mode to avoid cross-voice collisions
+    norm_txt = re.sub(r"\s+", " ", txt).strip().lower()
+    lang_key = (lang or "").strip().lower()
+    mode_key = (mode or "").strip().lower()
+    return f"{prefix}{lang_key}|{mode_key}|{norm_txt}"
+
+# Concurrent misses for the same key share one synthesis (and one gate slot)
+_tts_flight = SingleFlight()
+metrics.register("tts_singleflight", _tts_flight.stats)
+
+# Canned and fallback replies are pre-rendered for every configured language and
+# served from memory with no expiry. Missing entries are synthesized in the
+# background after startup (at background priority) and the pack is written back
+# to AUDIO_PACK_DIR, so later starts only load it.
+AUDIO_PACK = os.getenv("AUDIO_PACK", "1").lower() in ("1", "true", "yes")
+AUDIO_PACK_DIR = os.getenv("AUDIO_PACK_DIR", str(Path(__file__).parent / "audio_pack"))
+AUDIO_PACK_LANGS = [l.strip().lower() for l in os.getenv("AUDIO_PACK_LANGS", "en,es,es-mx,fr,fr-ca,hi,de,it,pt,ja").split(",") if l.strip()]
+AUDIO_PACK_WAIT = float(os.getenv("AUDIO_PACK_WAIT", "30"))
+
+def _spoken_pieces(text: str) -> List[str]:
+    """``text`` as /api/tts receives it, plus the sentences a speaking chat stream sends."""
+    sentences, rest = _pop_sentences(text + " ")
+    pieces = [text] + [enforce_identity(s) for s in sentences]
+    if rest.strip():
+        pieces.append(enforce_identity(rest.strip()))
+    return list(dict.fromkeys(p for p in pieces if p))
+
+def _audio_pack_entries() -> Dict[str, Tuple[str, Optional[str], Optional[str]]]:
+    """TTS cache key -> (text, lang, mode), using the lang/mode the page sends for each language."""
+    out = {}
+    for phrase_lang, phrase in canned_replies():
+        for lang in AUDIO_PACK_LANGS:
+            if lang.split("-")[0] != phrase_lang:
+                continue
+            mode = None if lang == "en" else "auto"
+            for piece in _spoken_pieces(phrase):
+                out.setdefault(_tts_key(piece, lang, mode), (piece, lang, mode))
+    return out
+
+_audio_pack_plan = _audio_pack_entries() if AUDIO_PACK else {}
+_audio_pack = AudioPack(AUDIO_PACK_DIR, pack_version(
+    sorted(_audio_pack_plan), POLLY_VOICE, POLLY_RATE, POLLY_PITCH, VOICE_MAP, VISEME_MODE))
+metrics.register("audio_pack", _audio_pack.stats)
+
+async def _warm_audio_pack():
+    loaded = await run_io(_audio_pack.load)
+    added = 0
+    for key in _audio_pack.missing(_audio_pack_plan):
+        text, lang, mode = _audio_pack_plan[key]
+        gate = _tts_gate()
+        try:
+            acquired = await gate.acquire(timeout=AUDIO_PACK_WAIT, session="audio-pack", priority=BACKGROUND)
+        except Overloaded:
+            acquired = False
+        if not acquired:
+            metrics.incr("audio_pack.deferred")
+            continue
+        try:
+            audio, marks = await _polly_retry(polly_tts_with_visemes, text, lang, mode, "TTS")
+        except Exception as e:
+            metrics.incr("audio_pack.errors")
+            logger.warning("Audio pack: could not render %r (%s): %r", text, lang, e)
+            continue
+        finally:
+            gate.release()
+        _audio_pack.put(key, audio, marks)
+        added += 1
+    if added:
+        try:
+            await run_io(_audio_pack.save)
+        except OSError as e:
+            logger.warning("Audio pack: could not write %s: %r", _audio_pack.path, e)
+    logger.info("Audio pack %s: %d loaded, %d rendered, %d planned",
+                _audio_pack.version, loaded, added, len(_audio_pack_plan))
+
+_audio_pack_tasks: list = []   # keeps the warm-up task referenced while it runs
+
+def _start_audio_pack():
+    # Runs in the background: startup never waits on Polly
+    if AUDIO_PACK and not _audio_pack_tasks:
+        _audio_pack_tasks.append(asyncio.get_running_loop().create_task(_warm_audio_pack()))
+
+async def _polly_retry(synth, txt: str, lang: Optional[str], mode: Optional[str], what: str, **kw):
+    # Retry Polly on throttling / transient failures; every synthesize_speech call
+    # (across voices, engines, regions and these retries) draws on one budget
+    budget = AttemptBudget(POLLY_ATTEMPT_BUDGET)
+    last_err = None
+    for attempt in range(3):
+        try:
+            return await run_io(synth, txt, lang, mode, budget=budget, **kw)
+        except BudgetExhausted:
+            metrics.incr("polly.budget_exhausted")
+            if last_err: raise last_err
+            raise
+        except ClientError as e:
+            code = e.response.get("Error", {}).get("Code", "ClientError")
+            if code in {"ThrottlingException", "TooManyRequestsException", "ServiceUnavailableException"}:
+                last_err = e; await _retry_sleep(attempt); continue
+            raise
+        except Exception as e:
+            last_err = e; await _retry_sleep(attempt)
+    raise last_err or RuntimeError(f"{what} retries exhausted")
+
+async def _polly_fill(key: str, synth, txt: str, lang: Optional[str], mode: Optional[str], what: str,
+                      session: str = "", priority: int = SPEECH) -> Tuple[bytes, list]:
+    gate = _tts_gate()
+    acquired = await gate.acquire(timeout=10, session=session, priority=priority)
+    if not acquired:
+        raise HTTPException(429, "TTS busy, try again shortly")
+    try:
+        audio, marks = await _polly_retry(synth, txt, lang, mode, what)
+        _tts_cache_put(key, audio, marks)
+    finally:
+        try:
+            gate.release()
+        except Exception:
+            pass
+    return audio, marks
 
-@app.post("/api/tts")
-def tts(payload: TTSIn):
-    txt = payload.text.strip()
-    if not txt:
-        raise HTTPException(400, "Empty text")
+AUDIO_STREAM_CHUNK = int(os.getenv("AUDIO_STREAM_CHUNK", "4096"))
+
+class _AudioTee:
+    """One Polly audio stream, read once and replayed to every concurrent listener."""
+
+    def __init__(self, body, marks: list):
+        self.marks = marks
+        self._body = body
+        self._chunks: List[bytes] = []
+        self._done = False
+        self._error: Optional[BaseException] = None
+        self._changed = asyncio.Event()
+
+    async def pump(self) -> bytes:
+        """Read the stream to the end (whether or not anyone is still listening)."""
+        try:
+            async for chunk in aiter_io(self._body.iter_chunks(chunk_size=AUDIO_STREAM_CHUNK)):
+                self._chunks.append(chunk)
+                self._wake()
+        except BaseException as e:
+            self._error = e
+            raise
+        finally:
+            self._done = True
+            self._wake()
+            self._body.close()
+        return b"".join(self._chunks)
+
+    def _wake(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def follow(self):
+        """Every chunk from the start, then each new one as it is read."""
+        i = 0
+        while True:
+            changed = self._changed
+            while i < len(self._chunks):
+                yield self._chunks[i]
+                i += 1
+            if self._done:
+                if self._error is not None:
+                    raise self._error
+                return
+            await changed.wait()
+
+# key -> future of the _AudioTee of a streaming synthesis in flight (see _stream_fill)
+_tts_tees: Dict[str, "asyncio.Future"] = {}
+
+async def _stream_fill(key: str, synth, txt: str, lang: Optional[str], mode: Optional[str], what: str,
+                       session: str, priority: int, opened: "asyncio.Future") -> Tuple[bytes, list]:
+    """Single-flight leader for streaming requests: open one Polly stream and tee it.
+
+    ``opened`` resolves to the tee as soon as the stream is open, so listeners
+    start forwarding audio right away; the task itself finishes with the full
+    MP3, which fills the TTS cache and answers buffered callers of the same key.
+    The gate covers opening the Polly stream (the billed call) only.
+    """
     try:
-        # Cache by normalized text, including language and mode to avoid cross-voice collisions
-        norm_txt = re.sub(r"\s+", " ", txt).strip().lower()
-        lang_key = (payload.lang or "").strip().lower()
-        mode_key = (payload.mode or "").strip().lower()
-        key = f"{lang_key}|{mode_key}|{norm_txt}"
-        cached = _tts_cache_get(key)
-        if cached:
-            audio_b64, marks = cached
-            return {"audio_b64": audio_b64, "marks": marks}
-
-        acquired = _tts_gate.acquire(timeout=10)
+        gate = _tts_gate()
+        acquired = await gate.acquire(timeout=10, session=session, priority=priority)
         if not acquired:
             raise HTTPException(429, "TTS busy, try again shortly")
         try:
-            # Retry Polly on throttling / transient failures
-            last_err = None
-            for attempt in range(3):
-                try:
-                    audio_b64, marks = polly_tts_with_visemes(txt, payload.lang, payload.mode)
-                    _tts_cache_put(key, audio_b64, marks)
-                    break
-                except ClientError as e:
-                    code = e.response.get("Error", {}).get("Code", "ClientError")
-                    if code in {"ThrottlingException", "TooManyRequestsException", "ServiceUnavailableException"}:
-                        last_err = e; _retry_sleep(attempt); continue
-                    raise
-                except Exception as e:
-                    last_err = e; _retry_sleep(attempt)
-            else:
-                raise last_err or RuntimeError("TTS retries exhausted")
+            body, marks = await _polly_retry(synth, txt, lang, mode, what, stream=True)
         finally:
             try:
-                _tts_gate.release()
+                gate.release()
             except Exception:
                 pass
-        return {"audio_b64": audio_b64, "marks": marks}
+        tee = _AudioTee(body, marks)
+        opened.set_result(tee)
+        audio = await tee.pump()
+        _tts_cache_put(key, audio, marks)
+        return audio, marks
+    except BaseException as e:
+        if not opened.done():
+            if isinstance(e, asyncio.CancelledError):
+                opened.cancel()
+            else:
+                opened.set_exception(e)
+        raise
+    finally:
+        if _tts_tees.get(key) is opened:
+            del _tts_tees[key]
+
+async def _stream_audio(key: str, synth, txt: str, lang: Optional[str], mode: Optional[str], what: str,
+                        session: str = "", priority: int = SPEECH) -> StreamingResponse:
+    """Forward Polly's AudioStream as it arrives; visemes go out first in X-Visemes.
+
+    Concurrent requests for the same key share one Polly call through
+    ``_tts_flight``: streaming callers follow the leader's tee from the first
+    chunk, and a buffered synthesis already in flight is served whole once it lands.
+    """
+    cached = _tts_cache_get(key)
+    if cached:
+        audio, marks = cached
+        return StreamingResponse(iter([audio]), media_type="audio/mpeg", headers={"X-Visemes": _encode_marks(marks)})
+    opened = _tts_tees.get(key)
+    if opened is None and _tts_flight.inflight(key):
+        metrics.incr(f"{what.lower()}.coalesced")
+        audio, marks = await _tts_flight.do(key, None)
+        return StreamingResponse(iter([audio]), media_type="audio/mpeg", headers={"X-Visemes": _encode_marks(marks)})
+    if opened is None:
+        _tts_gate().admit(session)
+        opened = _tts_tees[key] = asyncio.get_running_loop().create_future()
+        # Listeners report failures; keep an abandoned future from logging them again
+        opened.add_done_callback(lambda f: f.cancelled() or f.exception())
+        _tts_flight.start(key, lambda: _stream_fill(key, synth, txt, lang, mode, what, session, priority, opened))
+    else:
+        metrics.incr(f"{what.lower()}.coalesced")
+    tee = await asyncio.shield(opened)
+    metrics.incr(f"{what.lower()}.streamed")
+    return StreamingResponse(tee.follow(), media_type="audio/mpeg", headers={"X-Visemes": _encode_marks(tee.marks)})
+
+async def _synthesize_cached(key: str, synth, txt: str, lang: Optional[str], mode: Optional[str], what: str,
+                             session: str = "", limited: bool = False, priority: int = SPEECH) -> Tuple[bytes, list]:
+    cached = _tts_cache_get(key)
+    if cached:
+        return cached
+    if _tts_flight.inflight(key):
+        metrics.incr(f"{what.lower()}.coalesced")
+    elif limited:
+        _tts_gate().admit(session)   # only requests that will actually reach Polly spend a token
+    return await _tts_flight.do(key, lambda: _polly_fill(key, synth, txt, lang, mode, what, session, priority))
+
+async def _tts_synthesize(txt: str, lang: Optional[str], mode: Optional[str], session: str = "",
+                          limited: bool = False) -> Tuple[bytes, list]:
+    """Cached, gated, single-flight Polly synthesis shared by /api/tts and spoken chat streams."""
+    return await _synthesize_cached(_tts_key(txt, lang, mode), polly_tts_with_visemes, txt, lang, mode, "TTS",
+                                    session, limited)
+
+def _client_session(session_id: Optional[str], request: Request) -> str:
+    """Fairness key for TTS callers: the chat session if given, else the client address."""
+    return (session_id or "").strip() or (request.client.host if request.client else "") or "anon"
+
+def _encode_marks(marks: list) -> str:
+    """Compact viseme track for the X-Visemes header: "time:value,time:value,..."."""
+    return ",".join(f"{int(m.get('time', 0))}:{m.get('value', 'sil')}" for m in marks)
+
+def _audio_response(audio: bytes, marks: list, request: Request):
+    """Content-negotiated speech payload.
+
+    - ``Accept: audio/mpeg``: raw MP3 body, visemes in the ``X-Visemes`` header
+    - ``Accept: multipart/mixed``: a JSON part with the marks, then the MP3 part
+    - anything else: the original ``{"audio_b64", "marks"}`` JSON
+    """
+    accept = (request.headers.get("accept") or "").lower()
+    if "multipart/mixed" in accept:
+        boundary = f"rem-{os.urandom(8).hex()}"
+        body = b"".join([
+            f"--{boundary}\r\nContent-Type: application/json\r\n\r\n".encode("ascii"),
+            json.dumps({"marks": marks}).encode("utf-8"),
+            f"\r\n--{boundary}\r\nContent-Type: audio/mpeg\r\nContent-Length: {len(audio)}\r\n\r\n".encode("ascii"),
+            audio,
+            f"\r\n--{boundary}--\r\n".encode("ascii"),
+        ])
+        return Response(content=body, media_type=f"multipart/mixed; boundary={boundary}")
+    if "audio/mpeg" in accept:
+        return Response(content=audio, media_type="audio/mpeg", headers={"X-Visemes": _encode_marks(marks)})
+    return {"audio_b64": base64.b64encode(audio).decode("ascii"), "marks": marks}
+
+@app.post("/api/tts")
+async def tts(payload: TTSIn, request: Request):
+    txt = payload.text.strip()
+    if not txt:
+        raise HTTPException(400, "Empty text")
+    lang, mode = _resolve_lang(txt, payload.lang, payload.mode)
+    try:
+        session = _client_session(payload.session_id, request)
+        if payload.stream:
+            return await _stream_audio(_tts_key(txt, lang, mode), polly_tts_with_visemes, txt, lang, mode, "TTS", session)
+        audio, marks = await _tts_synthesize(txt, lang, mode, session, limited=True)
+        return _audio_response(audio, marks, request)
+    except Overloaded as e:
+        raise HTTPException(429, "TTS busy, try again shortly", headers=e.headers)
+    except HTTPException:
+        raise
     except ClientError as e:
         err = e.response.get("Error", {})
         code = err.get("Code", "ClientError")
@@ -726,46 +1666,27 @@ def tts(payload: TTSIn):
         raise HTTPException(500, f"Polly error: {code} - {msg}")
     except Exception as e:
         raise HTTPException(500, f"TTS failure: {e.__class__.__name__}")
+
 @app.post("/api/sing")
-def sing(payload: SingIn):
+async def sing(payload: SingIn, request: Request):
     txt = (payload.text or "").strip()
     if not txt:
         raise HTTPException(400, "Provide lyrics to sing.")
     # This feature uses user-provided lyrics. We do not fetch or provide copyrighted lyrics.
+    lang, mode = _resolve_lang(txt, payload.lang, payload.mode)
     try:
         # Cache key includes a 'sing:' prefix
-        norm_txt = re.sub(r"\s+", " ", txt).strip().lower()
-        lang_key = (payload.lang or "").strip().lower()
-        mode_key = (payload.mode or "").strip().lower()
-        key = f"sing:{lang_key}|{mode_key}|{norm_txt}"
-        cached = _tts_cache_get(key)
-        if cached:
-            audio_b64, marks = cached
-            return {"audio_b64": audio_b64, "marks": marks}
-
-        acquired = _tts_gate.acquire(timeout=10)
-        if not acquired:
-            raise HTTPException(429, "TTS busy, try again shortly")
-        try:
-            last_err = None
-            for attempt in range(3):
-                try:
-                    audio_b64, marks = polly_sing_with_visemes(txt, payload.lang, payload.mode or 'auto')
-                    _tts_cache_put(key, audio_b64, marks)
-                    break
-                except ClientError as e:
-                    code = e.response.get("Error", {}).get("Code", "ClientError")
-                    if code in {"ThrottlingException","TooManyRequestsException","ServiceUnavailableException"}:
-                        last_err = e; _retry_sleep(attempt); continue
-                    raise
-                except Exception as e:
-                    last_err = e; _retry_sleep(attempt)
-            else:
-                raise last_err or RuntimeError("SING retries exhausted")
-        finally:
-            try: _tts_gate.release()
-            except Exception: pass
-        return {"audio_b64": audio_b64, "marks": marks}
+        key = _tts_key(txt, lang, mode, prefix="sing:")
+        session = _client_session(payload.session_id, request)
+        if payload.stream:
+            return await _stream_audio(key, polly_sing_with_visemes, txt, lang, mode or 'auto', "SING", session, SING)
+        audio, marks = await _synthesize_cached(key, polly_sing_with_visemes, txt, lang, mode or 'auto', "SING",
+                                                session, limited=True, priority=SING)
+        return _audio_response(audio, marks, request)
+    except Overloaded as e:
+        raise HTTPException(429, "Sing busy, try again shortly", headers=e.headers)
+    except HTTPException:
+        raise
     except ClientError as e:
         err = e.response.get("Error", {})
         code = err.get("Code", "ClientError")
@@ -775,6 +1696,10 @@ def sing(payload: SingIn):
     except Exception as e:
         raise HTTPException(500, f"Sing failure: {e.__class__.__name__}")
 
+@app.get("/api/polly/regions")
+def polly_regions():
+    return {"primary": POLLY_REGION, "fallback": POLLY_FALLBACK_REGION, "regions": _polly_regions.snapshot()}
+
 @app.get("/api/polly/voices")
 def list_voices():
     try:
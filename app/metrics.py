@@ -0,0 +1,54 @@
+"""Process-local counters and stats providers exported on /api/metrics."""
+import threading
+from collections import defaultdict
+from typing import Callable, Dict
+
+_lock = threading.Lock()
+_counters: Dict[str, int] = defaultdict(int)
+_providers: Dict[str, Callable[[], dict]] = {}
+
+def incr(name: str, n: int = 1):
+    with _lock:
+        _counters[name] += n
+
+def register(name: str, fn: Callable[[], dict]):
+    """Expose ``fn()`` under ``name`` in every snapshot (e.g. a cache's stats)."""
+    _providers[name] = fn
+
+def snapshot() -> dict:
+    with _lock:
+        out = {"counters": dict(_counters)}
+    for name, fn in list(_providers.items()):
+        try:
+            out[name] = fn()
+        except Exception as e:
+            out[name] = {"error": e.__class__.__name__}
+    return out
+
+class Histogram:
+    """Fixed-bucket histogram (milliseconds by default) for latency-style values."""
+
+    BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)   # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]:
+            i += 1
+        with _lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.sum += value
+
+    def snapshot(self) -> dict:
+        with _lock:
+            cum, out = 0, {}
+            for le, n in zip(list(self.buckets) + ["+Inf"], self.counts):
+                cum += n
+                out[f"le_{le}"] = cum
+            return {"count": self.count, "sum": round(self.sum, 1), "buckets": out}
@@ -0,0 +1,195 @@
+"""What each Polly voice can do, per region, learned once instead of per request.
+
+Voice/engine support comes from ``describe_voices`` (refreshed every
+``voices_ttl``; a failed lookup is only remembered for ``failure_ttl``). Lookups
+are single-flight per region and never run on the synthesis path: ``plan`` uses
+whatever is cached and, when a region is missing or stale, starts a background
+refresh (``warm`` does the same for every region at startup). Deterministic
+rejections seen at synthesis time (unsupported engine or voice) are remembered
+for ``bad_ttl`` so later requests skip those steps, and the engine/text type
+that last worked for a voice is tried first. Rejections caused by the input
+itself (e.g. malformed SSML) are not remembered.
+
+``AttemptBudget`` caps how many ``synthesize_speech`` calls one request may
+make across voice candidates, engines, regions and outer retries.
+"""
+import threading, time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from botocore.exceptions import ClientError
+
+# Rejections that will repeat for the same (region, voice[, engine[, kind]])
+_VOICE_ERRORS = {"InvalidVoiceIdException", "LanguageNotSupportedException"}
+_ENGINE_ERRORS = {"EngineNotSupportedException"}
+# InvalidSsmlException is left out on purpose: it comes from the request's text, not the voice
+_KIND_ERRORS = {"UnsupportedPlsAlphabetException"}
+
+class BudgetExhausted(RuntimeError):
+    pass
+
+class AttemptBudget:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+
+    def take(self):
+        if self.used >= self.limit:
+            raise BudgetExhausted(f"Polly attempt budget ({self.limit}) exhausted")
+        self.used += 1
+
+def _region(client) -> str:
+    return getattr(getattr(client, "meta", None), "region_name", None) or "default"
+
+class CapabilityIndex:
+    def __init__(self, voices_ttl: float = 6 * 3600.0, failure_ttl: float = 60.0, bad_ttl: float = 3600.0,
+                 submit: Optional[Callable] = None):
+        self.voices_ttl = voices_ttl
+        self.failure_ttl = failure_ttl
+        self.bad_ttl = bad_ttl
+        self._submit = submit or self._spawn   # runs background lookups
+        self._lock = threading.Lock()
+        self._voices: Dict[str, tuple] = {}       # region -> (expires, voices, {voice_id: engines})
+        self._inflight: Dict[str, threading.Event] = {}   # region -> set when its lookup finishes
+        self._bad: Dict[tuple, tuple] = {}        # (region, voice, engine|"*", kind|"*") -> (expires, code)
+        self._good: Dict[tuple, tuple] = {}       # (voice, plan) -> (region, engine, kind)
+        self.lookups = self.lookup_failures = self.skipped = self.learned = 0
+
+    # ---- describe_voices -----------------------------------------------------
+    @staticmethod
+    def _spawn(fn, *args):
+        threading.Thread(target=fn, args=args, name="polly-voices", daemon=True).start()
+
+    def _fresh(self, region: str, now: float) -> Optional[tuple]:
+        rec = self._voices.get(region)
+        return rec if rec and rec[0] > now else None
+
+    def voices(self, client) -> List[dict]:
+        """Voices in ``client``'s region, looking them up if stale; one lookup per region at a time."""
+        region = _region(client)
+        rec = self._fresh(region, time.time())
+        if rec:
+            return rec[1]
+        with self._lock:
+            done = self._inflight.get(region)
+            leader = done is None
+            if leader:
+                done = self._inflight[region] = threading.Event()
+        if not leader:
+            done.wait()
+            rec = self._voices.get(region)
+            return rec[1] if rec else []
+        try:
+            return self._lookup(client, region)
+        finally:
+            with self._lock:
+                del self._inflight[region]
+            done.set()
+
+    def _lookup(self, client, region: str) -> List[dict]:
+        self.lookups += 1
+        rec = self._voices.get(region)
+        try:
+            voices, ttl = client.describe_voices().get("Voices", []), self.voices_ttl
+        except Exception:
+            # Keep serving a stale list if there is one; retry the lookup soon either way
+            self.lookup_failures += 1
+            voices, ttl = (rec[1] if rec else []), self.failure_ttl
+        engines = {v.get("Id"): set(v.get("SupportedEngines", [])) for v in voices}
+        with self._lock:
+            self._voices[region] = (time.time() + ttl, voices, engines)
+        return voices
+
+    def refresh(self, client):
+        """Start a background lookup for ``client``'s region unless it is fresh or already running."""
+        region = _region(client)
+        if self._fresh(region, time.time()) or region in self._inflight:
+            return
+        self._submit(self.voices, client)
+
+    def warm(self, clients: Sequence[Any]):
+        for client in clients:
+            self.refresh(client)
+
+    def _engines(self, region: str, voice: str) -> Optional[set]:
+        """Engines ``voice`` supports in ``region``; None when unknown, empty set when absent."""
+        rec = self._voices.get(region)
+        if not rec or not rec[2]:
+            return None
+        return rec[2].get(voice, set())
+
+    # ---- planning ------------------------------------------------------------
+    def _bad_code(self, region: str, voice: str, engine: str, kind: str, now: float) -> Optional[str]:
+        for key in ((region, voice, "*", "*"), (region, voice, engine, "*"), (region, voice, engine, kind)):
+            rec = self._bad.get(key)
+            if rec and rec[0] > now:
+                return rec[1]
+        return None
+
+    def plan(self, name: str, voice: str, steps: Sequence[tuple], clients: Sequence[Any]) -> List[tuple]:
+        """Order and filter ``(engine, text_type, text, kind)`` steps across ``clients``.
+
+        Returns ``(client, engine, text_type, text, kind)`` tuples. Raises the
+        remembered ``ClientError`` when every step is known to fail, so callers
+        move on to their next voice without a network round trip.
+        """
+        now = time.time()
+        out, code = [], None
+        for client in clients:
+            # Never look voices up here; unknown regions simply allow every step
+            self.refresh(client)
+            region = _region(client)
+            engines = self._engines(region, voice)
+            for engine, text_type, text, kind in steps:
+                if engines is not None and engine not in engines:
+                    self.skipped += 1
+                    code = code or ("EngineNotSupportedException" if engines else "InvalidVoiceIdException")
+                    continue
+                bad = self._bad_code(region, voice, engine, kind, now)
+                if bad:
+                    self.skipped += 1
+                    code = code or bad
+                    continue
+                out.append((client, engine, text_type, text, kind))
+        if not out:
+            raise ClientError(
+                {"Error": {"Code": code or "ValidationException", "Message": f"{voice}: no usable engine (cached)"}},
+                "SynthesizeSpeech",
+            )
+        good = self._good.get((voice, name))
+        if good:
+            # Known-good engine/kind first in every region; region order is the caller's
+            out.sort(key=lambda s: (s[1], s[4]) != good[1:])
+        return out
+
+    # ---- observations ------------------------------------------------------------
+    def record_success(self, name: str, voice: str, client, engine: str, kind: str):
+        self._good[(voice, name)] = (_region(client), engine, kind)
+
+    def record_failure(self, voice: str, client, engine: str, kind: str, code: str):
+        region = _region(client)
+        if code in _VOICE_ERRORS:
+            key = (region, voice, "*", "*")
+        elif code in _ENGINE_ERRORS:
+            key = (region, voice, engine, "*")
+        elif code in _KIND_ERRORS:
+            key = (region, voice, engine, kind)
+        else:
+            return   # depends on the text (length, validation), not on the voice
+        with self._lock:
+            self._bad[key] = (time.time() + self.bad_ttl, code)
+            for gk, gv in list(self._good.items()):
+                if gk[0] == voice and gv[0] == region and key[2] in ("*", gv[1]):
+                    del self._good[gk]
+        self.learned += 1
+
+    def stats(self) -> dict:
+        now = time.time()
+        return {
+            "regions": {r: len(rec[1]) for r, rec in self._voices.items()},
+            "known_bad": sum(1 for rec in self._bad.values() if rec[0] > now),
+            "known_good": len(self._good),
+            "lookups": self.lookups,
+            "lookup_failures": self.lookup_failures,
+            "skipped_attempts": self.skipped,
+            "learned_failures": self.learned,
+        }
@@ -0,0 +1,129 @@
+"""Per-region health for Polly: EWMA latency, error rate and a circuit breaker.
+
+``order(clients)`` returns the regions to try for one request, fastest healthy
+first. A region that keeps failing is opened (skipped) for ``cooldown``
+seconds; after that exactly one request probes it first (half-open). A good
+probe closes the breaker, a bad one re-opens it with a doubled cooldown (up to
+``max_cooldown``). A small share of requests (``explore``) go to the runner-up
+so a recovered region's latency estimate does not go stale.
+"""
+import random, threading, time
+from typing import Any, Dict, List, Optional, Sequence
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+def _region(client) -> str:
+    return getattr(getattr(client, "meta", None), "region_name", None) or "default"
+
+class _Region:
+    __slots__ = ("state", "ewma_ms", "err_rate", "consecutive", "open_until", "cooldown",
+                 "probe_started", "requests", "failures", "last_change")
+
+    def __init__(self, cooldown: float):
+        self.state = CLOSED
+        self.ewma_ms = None
+        self.err_rate = 0.0
+        self.consecutive = 0
+        self.open_until = 0.0
+        self.cooldown = cooldown
+        self.probe_started = 0.0
+        self.requests = self.failures = 0
+        self.last_change = time.time()
+
+class RegionHealth:
+    def __init__(self, alpha: float = 0.2, failure_threshold: int = 3, cooldown: float = 30.0,
+                 max_cooldown: float = 300.0, explore: float = 0.02):
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.explore = explore
+        self._regions: Dict[str, _Region] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, region: str) -> _Region:
+        r = self._regions.get(region)
+        if r is None:
+            r = self._regions[region] = _Region(self.base_cooldown)
+        return r
+
+    @staticmethod
+    def _score(r: _Region) -> tuple:
+        # Unmeasured regions sort after every measured one (callers break ties by
+        # configuration order); they are reached through explore or when nothing
+        # measured is left, rather than outranking a known-good region.
+        if r.ewma_ms is None:
+            return (1, 0.0)
+        return (0, r.ewma_ms * (1.0 + 2.0 * r.err_rate))
+
+    def order(self, clients: Sequence[Any]) -> List[Any]:
+        now = time.time()
+        closed, probe = [], None
+        with self._lock:
+            for i, c in enumerate(clients):
+                r = self._get(_region(c))
+                if r.state == CLOSED:
+                    closed.append((self._score(r), i, c))
+                    continue
+                # Open past its cooldown, or a half-open probe that never reported back
+                due = now >= r.open_until if r.state == OPEN else now - r.probe_started >= r.cooldown
+                if probe is None and due:
+                    r.state, r.probe_started, r.last_change = HALF_OPEN, now, now
+                    probe = c
+            closed.sort(key=lambda x: x[:2])
+            out = [c for _, _, c in closed]
+            if len(out) > 1 and random.random() < self.explore:
+                out[0], out[1] = out[1], out[0]
+            if probe is not None:
+                out.insert(0, probe)
+            if not out and clients:
+                # Everything is open: use the region that is due back first rather than nothing
+                out = [min(clients, key=lambda c: self._get(_region(c)).open_until)]
+        return out
+
+    def peek(self, clients: Sequence[Any]) -> Optional[Any]:
+        """The region ``order()`` would most likely pick, without starting a probe."""
+        with self._lock:
+            closed = [(self._score(self._get(_region(c))), i, c) for i, c in enumerate(clients)
+                      if self._get(_region(c)).state == CLOSED]
+        return min(closed, key=lambda x: x[:2])[2] if closed else (clients[0] if clients else None)
+
+    def record(self, client, elapsed_ms: float, ok: bool):
+        now = time.time()
+        a = self.alpha
+        with self._lock:
+            r = self._get(_region(client))
+            r.requests += 1
+            if ok:
+                # Only successes feed latency; a timeout says nothing about normal speed
+                r.ewma_ms = elapsed_ms if r.ewma_ms is None else (1 - a) * r.ewma_ms + a * elapsed_ms
+                r.err_rate *= 1 - a
+                r.consecutive = 0
+                if r.state != CLOSED:
+                    r.state, r.cooldown, r.last_change = CLOSED, self.base_cooldown, now
+                return
+            r.failures += 1
+            r.err_rate = (1 - a) * r.err_rate + a
+            r.consecutive += 1
+            if r.state == HALF_OPEN:
+                r.cooldown = min(self.max_cooldown, r.cooldown * 2)
+            if r.state == HALF_OPEN or r.consecutive >= self.failure_threshold:
+                r.state, r.open_until, r.last_change = OPEN, now + r.cooldown, now
+
+    def snapshot(self) -> dict:
+        now = time.time()
+        with self._lock:
+            return {
+                name: {
+                    "state": r.state,
+                    "ewma_ms": round(r.ewma_ms, 1) if r.ewma_ms is not None else None,
+                    "error_rate": round(r.err_rate, 4),
+                    "consecutive_failures": r.consecutive,
+                    "retry_in_s": round(max(0.0, r.open_until - now), 1) if r.state == OPEN else 0.0,
+                    "cooldown_s": r.cooldown,
+                    "requests": r.requests,
+                    "failures": r.failures,
+                    "since_s": round(now - r.last_change, 1),
+                }
+                for name, r in self._regions.items()
+            }
@@ -0,0 +1,87 @@
+"""Bounded reply cache for repeated prompts (mostly first-turn greetings).
+
+Entries are keyed by the system prompt (persona + style), a fingerprint of the
+history window and the normalized user text. Each key collects a small pool of
+distinct replies; it only starts serving hits once the pool is full so the
+same greeting does not always get the same answer.
+"""
+import hashlib, json, random, re, threading, time
+from collections import OrderedDict
+from typing import List, Optional
+
+_PUNCT = re.compile(r"[^\w\s']+")
+_SPACE = re.compile(r"\s+")
+
+def normalize(text: str) -> str:
+    return _SPACE.sub(" ", _PUNCT.sub(" ", (text or "").lower())).strip()
+
+class ReplyCache:
+    def __init__(self, max_keys: int = 512, ttl: float = 3600.0, variants: int = 3, max_chars: int = 120):
+        self.max_keys = max_keys
+        self.ttl = ttl
+        self.variants = max(1, variants)
+        self.max_chars = max_chars
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires, [replies])
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.fills = self.evictions = 0
+
+    def key(self, system_prompt: str, style: Optional[str], history: List[dict], user_text: str) -> Optional[str]:
+        """Cache key, or None when the prompt is not worth caching."""
+        norm = normalize(user_text)
+        if not norm or len(norm) > self.max_chars:
+            return None
+        h = hashlib.sha1()
+        h.update(system_prompt.encode("utf-8"))
+        h.update(b"\0" + (style or "").strip().lower().encode("utf-8"))
+        h.update(b"\0" + json.dumps(history, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+        h.update(b"\0" + norm.encode("utf-8"))
+        return h.hexdigest()
+
+    def get(self, key: Optional[str]) -> Optional[str]:
+        if key is None:
+            return None
+        now = time.time()
+        with self._lock:
+            rec = self._data.get(key)
+            if rec and rec[0] < now:
+                self._data.pop(key, None)
+                rec = None
+            if not rec or len(rec[1]) < self.variants:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return random.choice(rec[1])
+
+    def put(self, key: Optional[str], reply: str):
+        if key is None or not reply:
+            return
+        now = time.time()
+        with self._lock:
+            rec = self._data.get(key)
+            if rec and rec[0] >= now:
+                replies = rec[1]
+                if reply in replies or len(replies) >= self.variants:
+                    return
+                replies.append(reply)
+                self._data.move_to_end(key)
+            else:
+                self._data[key] = (now + self.ttl, [reply])
+            self.fills += 1
+            while len(self._data) > self.max_keys:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "keys": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "fills": self.fills,
+                "evictions": self.evictions,
+                "max_keys": self.max_keys,
+                "variants": self.variants,
+            }
@@ -0,0 +1,213 @@
+"""Reply sanitizing: identity rewrites, stage directions, leading name tags.
+
+``enforce_identity`` / ``strip_stage`` clean a whole reply with precompiled
+patterns. ``StreamSanitizer`` produces the same text from a stream of deltas:
+``feed(delta)`` returns whatever is already known to be clean and holds back
+only a possible match in progress (a partial ``Claude``/``Anthropic``/
+``Blessed Boy``, an unclosed ``*...*``, ``[...]`` or ``(laughs...)`` of at most
+``MAX_STAGE`` characters, the opening name tag, and trailing whitespace).
+Plain word pieces and spaces are gathered (up to ``MAX_PENDING`` characters)
+and scanned together, so the per-delta cost is paid at punctuation rather than
+on every token. ``flush()`` returns the rest once the stream ends.
+"""
+import re
+from typing import List
+
+MAX_STAGE = 120   # longest stage direction removed; bounds how much a stream holds back
+MAX_PENDING = 24  # plain text gathered before a scan; bounds the delay it adds
+
+_CUES = r"(?:smiles|laughs|chuckles|sighs|clears throat|giggles)"
+_STAGE = re.compile(rf"\*[^*]{{0,{MAX_STAGE}}}\*|\[[^\]]{{0,{MAX_STAGE}}}\]|\({_CUES}[^)]{{0,{MAX_STAGE}}}\)", re.I)
+# A stage direction that may still close once more text arrives (short "(xyz" may become a cue)
+_STAGE_OPEN = re.compile(
+    rf"\*[^*]{{0,{MAX_STAGE}}}\Z|\[[^\]]{{0,{MAX_STAGE}}}\Z|\({_CUES}[^)]{{0,{MAX_STAGE}}}\Z|\([a-z ]{{0,12}}\Z", re.I)
+
+_CLOSERS = {"*": "*", "[": "]"}
+
+_NAMES = {"claude": "Rem", "blessed boy": "Rem", "anthropic": "my team"}
+_IDENTITY = re.compile(r"(?<!\w)(?:claude|blessed boy|anthropic)(?!\w)", re.I)
+_LONGEST_NAME = max(map(len, _NAMES))
+# A trailing word that is (a prefix of) one of the names, so it may still become one.
+# Matched against the reversed tail so the regex is tried at one position only.
+_NAME_PREFIXES = sorted({n[:i] for n in _NAMES for i in range(1, len(n) + 1)}, key=len, reverse=True)
+_NAME_TAIL_REV = re.compile(r"(?:%s)(?!\w)" % "|".join(re.escape(p[::-1]) for p in _NAME_PREFIXES), re.I)
+
+_NAME_TAG = re.compile(r"\s*Rem\s*[:\-–—.,]\s*", re.I)
+_NAME_TAG_OPEN = re.compile(r"\s*(?:r(?:e(?:m\s*)?)?)?\Z", re.I)
+_AS_AN_AI = re.compile(r"As an AI(?: language model)?[, ]*", re.I)
+_SPACES = re.compile(r"\s{2,}")
+
+def _word(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+def _rename(m: "re.Match") -> str:
+    return _NAMES[m.group(0).lower()]
+
+def strip_stage(text: str) -> str:
+    t = _STAGE.sub("", text)
+    m = _AS_AN_AI.match(t)
+    if m:
+        t = t[m.end():]
+    return _SPACES.sub(" ", t).strip()
+
+def enforce_identity(text: str) -> str:
+    t = _IDENTITY.sub(_rename, text)
+    # Remove leading assistant name tags like "Rem:", "Rem -", "Rem." at the start
+    m = _NAME_TAG.match(t)
+    if m:
+        t = t[m.end():]
+    return strip_stage(t)
+
+class StreamSanitizer:
+    """Incremental ``enforce_identity``: the concatenated output of ``feed()``
+    calls plus ``flush()`` equals ``enforce_identity`` of the concatenated input."""
+
+    __slots__ = ("_pending", "_holding", "_names", "_prev", "_tag", "_stage", "_lead", "_space", "_started", "held")
+
+    def __init__(self):
+        self._pending = ""    # plain deltas not yet run through the pipeline
+        self._holding = 0     # characters the pipeline held after its last run
+        self._names = ""      # text not yet past the identity rewrite
+        self._prev = " "      # stands in for the text already emitted: "x" after a word character
+        self._tag = ""        # opening text while a "Rem:" tag is still possible (None once decided)
+        self._stage = ""      # text that may be inside an unclosed stage direction
+        self._lead = ""       # opening text while "As an AI..." is still possible (None once decided)
+        self._space = ""      # trailing whitespace, emitted only once more text follows
+        self._started = False
+        self.held = 0         # most characters held back at once
+
+    # ---- pipeline stages, in enforce_identity order --------------------------------
+    def _identity(self, text: str, final: bool) -> str:
+        buf = self._names + text
+        cut = len(buf)
+        if not final:
+            # Only the last few characters can start a name; scan from there, with one
+            # character before them (or the emitted text's stand-in) for the word boundary
+            start = max(0, cut - _LONGEST_NAME)
+            window = buf[start - 1:] if start else self._prev + buf
+            m = _NAME_TAIL_REV.match(window[::-1])
+            if m:
+                cut -= m.end()
+        out, self._names = buf[:cut], buf[cut:]
+        if not out:
+            return ""
+        # One character of context keeps the lookbehind right across chunk boundaries
+        done = _IDENTITY.sub(_rename, self._prev + out)[1:]
+        self._prev = "x" if _word(out[-1]) else " "
+        return done
+
+    def _name_tag(self, text: str, final: bool) -> str:
+        if self._tag is None:
+            return text
+        buf = self._tag + text
+        m = _NAME_TAG.match(buf)
+        if m and m.end() < len(buf):
+            self._tag = None
+            return buf[m.end():]
+        if not final and (m or _NAME_TAG_OPEN.fullmatch(buf)):
+            self._tag = buf
+            return ""
+        self._tag = None
+        return buf[m.end():] if m else buf
+
+    def _stage_dirs(self, text: str, final: bool) -> str:
+        held = self._stage
+        buf = held + text
+        if held and not final and held[0] in _CLOSERS:
+            # The held text is one unclosed "*..." or "[...": it was scanned already, so
+            # only the new text can close it
+            if _CLOSERS[held[0]] not in text and len(buf) <= MAX_STAGE + 1:
+                self._stage = buf
+                return ""
+        elif "*" not in buf and "[" not in buf and "(" not in buf:
+            self._stage = ""
+            return buf
+        if final:
+            self._stage = ""
+            return _STAGE.sub("", buf)
+        out: List[str] = []
+        pos = 0
+        while True:
+            o = _STAGE_OPEN.search(buf, pos)
+            hold = o.start() if o else len(buf)
+            m = _STAGE.search(buf, pos)
+            if m is None or m.start() >= hold:
+                break
+            out.append(buf[pos:m.start()])
+            pos = m.end()
+        out.append(buf[pos:hold])
+        self._stage = buf[hold:]
+        return "".join(out)
+
+    def _as_an_ai(self, text: str, final: bool) -> str:
+        if self._lead is None:
+            return text
+        buf = self._lead + text
+        low = buf.lower()
+        if low.startswith("as an ai"):
+            m = _AS_AN_AI.match(buf)
+            # Undecided while " language model" or the trailing ", " may still grow
+            if not final and (m.end() == len(buf) or " language model".startswith(low[8:])):
+                self._lead = buf
+                return ""
+            self._lead = None
+            return buf[m.end():]
+        if not final and "as an ai".startswith(low):
+            self._lead = buf
+            return ""
+        self._lead = None
+        return buf
+
+    def _whitespace(self, text: str, final: bool) -> str:
+        if not text:
+            return ""
+        buf = self._space + text
+        body = buf.rstrip()
+        self._space = buf[len(body):]
+        if not body:
+            if len(self._space) > 1:
+                self._space = " "   # a run collapses to one space anyway
+            return ""
+        if not self._started:
+            body = body.lstrip()
+            self._started = True
+        return _SPACES.sub(" ", body)
+
+    # ---- public API ------------------------------------------------------------------
+    def _run(self, text: str, final: bool) -> str:
+        t = self._identity(text, final)
+        # Stages that have already decided (or have nothing to look at) are skipped
+        if self._tag is not None and (final or t):
+            t = self._name_tag(t, final)
+        if (final or self._stage) or (t and ("*" in t or "[" in t or "(" in t)):
+            t = self._stage_dirs(t, final)
+        if self._lead is not None and (final or t):
+            t = self._as_an_ai(t, final)
+        out = self._whitespace(t, final)
+        held = len(self._names) + len(self._stage) + len(self._space)
+        if self._tag:
+            held += len(self._tag)
+        if self._lead:
+            held += len(self._lead)
+        self._holding = held
+        if held > self.held:
+            self.held = held
+        return out
+
+    def feed(self, delta: str) -> str:
+        # Bedrock deltas are mostly word pieces and spaces, which cannot finish a stage
+        # direction: gather them and scan at punctuation or every MAX_PENDING characters
+        if (delta.isalnum() or delta.isspace()) and len(self._pending) < MAX_PENDING:
+            self._pending += delta
+            if self._holding + len(self._pending) > self.held:
+                self.held = self._holding + len(self._pending)
+            return ""
+        if self._pending:
+            delta, self._pending = self._pending + delta, ""
+        return self._run(delta, False)
+
+    def flush(self) -> str:
+        out = self._run(self._pending, True)
+        self._pending = ""
+        self._space = ""
+        return out
@@ -0,0 +1,172 @@
+"""Fair, priority-aware admission in front of the adaptive upstream gates.
+
+``FairGate`` is an ``AdaptiveGate`` whose waiters are queued by priority class
+and, within a class, per session and served round-robin, so one busy tab or a
+looping script only ever holds its own place in line. Higher classes are
+admitted first; a waiter that has been passed over for longer than its class's
+``starve_after`` is served next regardless, so sing renders and background work
+still make progress under sustained chat load.
+
+``admit(session)`` applies a per-session token bucket before any upstream work
+starts, and overflow (bucket empty, or too many waiters for the session or
+overall) fails fast with ``Overloaded`` carrying a Retry-After hint in seconds.
+"""
+import math, time
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional
+
+try:
+    from concurrency import AdaptiveGate
+    import metrics
+except ImportError:
+    from app.concurrency import AdaptiveGate
+    from app import metrics
+
+# Priority classes, highest first
+CHAT, SPEECH, BACKGROUND, SING = 0, 1, 2, 3
+CLASS_NAMES = ("chat", "speech", "background", "sing")
+# Seconds a waiter may be passed over by higher classes before it is served anyway
+STARVE_AFTER = (0.0, 2.0, 5.0, 5.0)
+
+class Overloaded(Exception):
+    def __init__(self, retry_after: float, reason: str):
+        super().__init__(f"{reason} limit reached, retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+        self.reason = reason
+
+    @property
+    def headers(self) -> dict:
+        return {"Retry-After": str(max(1, math.ceil(self.retry_after)))}
+
+class FairGate(AdaptiveGate):
+    def __init__(self, name: str, initial: int, rate: float = 1.0, burst: float = 5.0,
+                 max_queue_per_session: int = 4, max_queue: int = 64, max_sessions: int = 10000,
+                 starve_after=STARVE_AFTER, **kw):
+        super().__init__(name, initial, **kw)
+        self.rate = rate
+        self.burst = burst
+        self.max_queue_per_session = max_queue_per_session
+        self.max_queue = max_queue
+        self.max_sessions = max_sessions
+        self.starve_after = tuple(starve_after)
+        # per class: session -> deque of (enqueued_at, waiter), sessions in service order
+        self._classes: List["OrderedDict[str, deque]"] = [OrderedDict() for _ in CLASS_NAMES]
+        self._owner: Dict[int, tuple] = {}   # id(waiter) -> (priority, session)
+        self._count = 0
+        self._buckets: Dict[str, list] = {}   # session -> [tokens, last refill]
+        self._wait = [metrics.Histogram() for _ in CLASS_NAMES]
+        self.rejected_rate = self.rejected_queue = self.promoted = 0
+        self.timeouts = [0] * len(CLASS_NAMES)
+
+    # ---- rate limit -----------------------------------------------------------
+    def admit(self, session: str):
+        """Spend one token from ``session``'s bucket or raise ``Overloaded``."""
+        now = time.monotonic()
+        b = self._buckets.get(session)
+        if b is None:
+            if len(self._buckets) >= self.max_sessions:
+                self._prune(now)
+            b = self._buckets[session] = [self.burst, now]
+        tokens = min(self.burst, b[0] + (now - b[1]) * self.rate)
+        b[1] = now
+        if tokens < 1.0:
+            b[0] = tokens
+            self.rejected_rate += 1
+            raise Overloaded((1.0 - tokens) / self.rate, "rate")
+        b[0] = tokens - 1.0
+
+    def _prune(self, now: float):
+        # A bucket that would have refilled completely carries no state worth keeping
+        full = self.burst / self.rate if self.rate > 0 else float("inf")
+        for s in [s for s, b in self._buckets.items() if now - b[1] >= full]:
+            del self._buckets[s]
+
+    # ---- queueing policy --------------------------------------------------------
+    def _push(self, waiter, session: str = "", priority: int = CHAT, **info):
+        queues = self._classes[priority]
+        q = queues.get(session)
+        if q is None:
+            q = queues[session] = deque()
+        q.append((time.monotonic(), waiter))
+        self._owner[id(waiter)] = (priority, session)
+        self._count += 1
+
+    def _pick(self) -> Optional[int]:
+        """Class to serve next: the highest non-empty one, unless a lower one is starving."""
+        now = time.monotonic()
+        top, starving, oldest = None, None, 0.0
+        for prio, queues in enumerate(self._classes):
+            if not queues:
+                continue
+            if top is None:
+                top = prio
+                continue
+            waited = now - min(q[0][0] for q in queues.values())
+            if waited > self.starve_after[prio] and waited > oldest:
+                starving, oldest = prio, waited
+        if starving is not None:
+            self.promoted += 1
+            return starving
+        return top
+
+    def _pop(self):
+        prio = self._pick()
+        if prio is None:
+            return None
+        queues = self._classes[prio]
+        session, q = next(iter(queues.items()))
+        _, w = q.popleft()
+        self._owner.pop(id(w), None)
+        self._count -= 1
+        if q:
+            queues.move_to_end(session)   # next turn in this class goes to the following session
+        else:
+            del queues[session]
+        return w
+
+    def _discard(self, waiter):
+        owner = self._owner.pop(id(waiter), None)
+        if owner is None:
+            return
+        prio, session = owner
+        queues = self._classes[prio]
+        q = queues.get(session)
+        if q is None:
+            return
+        for item in q:
+            if item[1] is waiter:
+                q.remove(item)
+                self._count -= 1
+                break
+        if not q:
+            del queues[session]
+
+    def _queued(self) -> int:
+        return self._count
+
+    async def acquire(self, timeout: Optional[float] = None, session: str = "", priority: int = CHAT, **info) -> bool:
+        if self._count or self._in_use >= self._capacity():
+            q = self._classes[priority].get(session)
+            if (q is not None and len(q) >= self.max_queue_per_session) or self._count >= self.max_queue:
+                self.rejected_queue += 1
+                raise Overloaded(max(1.0, self._count / self._capacity()), "queue")
+        t0 = time.monotonic()
+        ok = await super().acquire(timeout, session=session, priority=priority, **info)
+        if ok:
+            self._wait[priority].observe((time.monotonic() - t0) * 1000)
+        else:
+            self.timeouts[priority] += 1
+        return ok
+
+    def stats(self) -> dict:
+        out = super().stats()
+        out.update({
+            "queued": {name: sum(len(q) for q in self._classes[i].values()) for i, name in enumerate(CLASS_NAMES)},
+            "queued_sessions": sum(len(c) for c in self._classes),
+            "rejected_rate": self.rejected_rate,
+            "rejected_queue": self.rejected_queue,
+            "starvation_promotions": self.promoted,
+            "timeouts": dict(zip(CLASS_NAMES, self.timeouts)),
+            "queue_wait_ms": {name: h.snapshot() for name, h in zip(CLASS_NAMES, self._wait)},
+        })
+        return out
@@ -0,0 +1,204 @@
+"""Bounded conversation memory shared by the FastAPI app and the Vercel handlers.
+
+Sessions are evicted when idle for longer than ``idle_ttl`` and, least recently
+used first, whenever the resident total exceeds ``max_bytes``. Turns are
+slotted records and each session's turns, trim offset and summary live in one
+immutable ``_State`` that is swapped on write, so readers never take the lock
+and never see a half-applied update.
+
+Each turn carries a token estimate computed once on insert. ``window()`` picks
+the newest turns that fit a token budget; turns that fall out of the window are
+folded into a per-session rolling summary by the caller (see ``set_summary``).
+"""
+import sys, threading, time
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+def estimate_tokens(text: str) -> int:
+    """Rough Claude token count: ~4 characters per token plus message framing."""
+    return (len(text) + 3) // 4 + 4
+
+class Turn:
+    __slots__ = ("user", "text", "tokens")
+
+    def __init__(self, user: bool, text: str):
+        self.user = user
+        self.text = text
+        self.tokens = estimate_tokens(text)
+
+    @property
+    def role(self) -> str:
+        return "user" if self.user else "assistant"
+
+_TURN_OVERHEAD = sys.getsizeof(Turn(True, "")) + 8  # record + tuple slot
+
+def _turn_bytes(turn: Turn) -> int:
+    return _TURN_OVERHEAD + sys.getsizeof(turn.text)
+
+class _State(NamedTuple):
+    turns: Tuple[Turn, ...]
+    base: int           # absolute index of turns[0] (turns trimmed so far)
+    summary: str
+    summary_upto: int   # absolute index of the first turn not covered by the summary
+
+_EMPTY = _State((), 0, "", 0)
+
+class _Session:
+    __slots__ = ("state", "nbytes", "touched", "ordered")
+
+    def __init__(self, now: float):
+        self.state = _EMPTY  # replaced whole, never mutated
+        self.nbytes = 0
+        self.touched = now   # last read or write
+        self.ordered = now   # recency the LRU order currently reflects
+
+class Window(NamedTuple):
+    turns: Tuple[Turn, ...]    # newest turns within budget, starting with a user turn
+    summary: str               # rolling summary of older turns ("" if none yet)
+    fold: Tuple[Turn, ...]     # older turns not yet covered by the summary
+    fold_upto: int             # pass to set_summary() once ``fold`` is summarized
+    history_tokens: int        # everything still stored (what the unbudgeted path sent)
+    sent_tokens: int           # window + summary
+
+class SessionStore:
+    def __init__(self, max_turns: int = 20, max_bytes: int = 64 << 20, idle_ttl: float = 3600.0,
+                 sweep_interval: float = 30.0):
+        self.max_turns = max_turns
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self.sweep_interval = sweep_interval
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._last_sweep = time.time()
+        self.expired = 0
+        self.evicted = 0
+
+    # ---- read path (lock-free) ---------------------------------------------
+    def _state(self, session_id: str) -> _State:
+        sess = self._sessions.get(session_id)
+        if sess is None:
+            return _EMPTY
+        now = time.time()
+        if now - sess.touched > self.idle_ttl:
+            return _EMPTY
+        sess.touched = now
+        return sess.state
+
+    def turns(self, session_id: str) -> Tuple[Turn, ...]:
+        return self._state(session_id).turns
+
+    def messages(self, session_id: str) -> List[Dict]:
+        """History in the Bedrock/Claude messages format."""
+        return [
+            {"role": t.role, "content": [{"type": "text", "text": t.text}]}
+            for t in self.turns(session_id)
+        ]
+
+    def window(self, session_id: str, budget: int) -> Window:
+        """Newest turns that fit ``budget`` tokens, plus what should be summarized."""
+        turns, base, summary, upto = self._state(session_id)
+        if not turns:
+            return Window((), "", (), 0, 0, 0)
+        start, used = len(turns), 0
+        for i in range(len(turns) - 1, -1, -1):
+            # Always keep the latest exchange even if it alone is over budget
+            if used + turns[i].tokens > budget and len(turns) - i > 2:
+                break
+            used += turns[i].tokens
+            start = i
+        while start < len(turns) and not turns[start].user:
+            used -= turns[start].tokens
+            start += 1
+        fold = turns[max(0, upto - base):start]
+        summary_tokens = estimate_tokens(summary) if summary else 0
+        return Window(
+            turns[start:], summary, fold, base + start,
+            sum(t.tokens for t in turns), used + summary_tokens,
+        )
+
+    def session_ids(self) -> List[str]:
+        return list(self._sessions.keys())
+
+    # ---- write path -------------------------------------------------------------
+    def append(self, session_id: str, role: str, content: str):
+        turn = Turn(role == "user", content)
+        now = time.time()
+        with self._lock:
+            sess = self._sessions.get(session_id)
+            if sess is None or now - sess.touched > self.idle_ttl:
+                if sess is not None:
+                    self._drop(session_id, sess)
+                    self.expired += 1
+                sess = _Session(now)
+                self._sessions[session_id] = sess
+            st = sess.state
+            turns, base = st.turns + (turn,), st.base
+            if len(turns) > self.max_turns:
+                base += len(turns) - self.max_turns
+                turns = turns[-self.max_turns:]
+            nbytes = sum(_turn_bytes(t) for t in turns) + sys.getsizeof(st.summary)
+            self._bytes += nbytes - sess.nbytes
+            sess.state, sess.nbytes = st._replace(turns=turns, base=base), nbytes
+            sess.touched = sess.ordered = now
+            self._sessions.move_to_end(session_id)
+            if now - self._last_sweep > self.sweep_interval:
+                self._sweep(now)
+            self._enforce_cap(keep=session_id)
+
+    def set_summary(self, session_id: str, summary: str, upto: int):
+        """Record a rolling summary covering every turn before absolute index ``upto``."""
+        with self._lock:
+            sess = self._sessions.get(session_id)
+            if sess is None or upto <= sess.state.summary_upto:
+                return
+            delta = sys.getsizeof(summary) - sys.getsizeof(sess.state.summary)
+            sess.state = sess.state._replace(summary=summary, summary_upto=upto)
+            sess.nbytes += delta
+            self._bytes += delta
+
+    def clear(self, session_id: str):
+        with self._lock:
+            sess = self._sessions.get(session_id)
+            if sess is not None:
+                self._drop(session_id, sess)
+
+    def sweep(self):
+        """Drop idle sessions now (normally done opportunistically on writes)."""
+        with self._lock:
+            self._sweep(time.time())
+
+    # ---- internals (lock held) --------------------------------------------------
+    def _drop(self, session_id: str, sess: _Session):
+        self._sessions.pop(session_id, None)
+        self._bytes -= sess.nbytes
+
+    def _sweep(self, now: float):
+        self._last_sweep = now
+        for sid, sess in list(self._sessions.items()):
+            if now - sess.touched > self.idle_ttl:
+                self._drop(sid, sess)
+                self.expired += 1
+
+    def _enforce_cap(self, keep: Optional[str] = None):
+        # Approximate LRU: a session read since it was last ordered gets a second chance
+        while self._bytes > self.max_bytes and len(self._sessions) > 1:
+            sid, sess = next(iter(self._sessions.items()))
+            if sid == keep:
+                break
+            if sess.touched > sess.ordered:
+                sess.ordered = sess.touched
+                self._sessions.move_to_end(sid)
+                continue
+            self._drop(sid, sess)
+            self.evicted += 1
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self._sessions),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "idle_ttl": self.idle_ttl,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
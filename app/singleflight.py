@@ -0,0 +1,51 @@
+"""In-flight de-duplication of identical async work (single-flight).
+
+The first caller for a key starts the work as its own task; concurrent callers
+with the same key await that task instead of repeating it. Work is shielded,
+so a leader that disconnects does not cancel the result its followers wait on.
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, TypeVar
+
+T = TypeVar("T")
+
+def _consume(task: "asyncio.Task"):
+    # Avoid "exception was never retrieved" when every waiter went away
+    if not task.cancelled():
+        task.exception()
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight: Dict[str, "asyncio.Task"] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def inflight(self, key: str) -> bool:
+        return key in self._inflight
+
+    def start(self, key: str, fn: Callable[[], Awaitable[T]]) -> "asyncio.Task":
+        """The task in flight for ``key``, starting ``fn()`` as its leader if there is none.
+
+        Registration is synchronous, so a caller that checked ``inflight()`` can
+        rely on the answer until its next ``await``.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+        return task
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        return await asyncio.shield(self.start(key, fn))
+
+    def _forget(self, key: str, task: "asyncio.Task"):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        _consume(task)
+
+    def stats(self) -> dict:
+        return {"inflight": len(self._inflight), "leaders": self.leaders, "coalesced": self.coalesced}
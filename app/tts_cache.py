@@ -0,0 +1,158 @@
+"""Byte-budgeted LRU cache for synthesized speech (TTS and sing).
+
+Entries are evicted least-recently-used first once the total payload exceeds
+``max_bytes``. Admission is frequency based (TinyLFU): when the cache is full a
+new entry only gets in if it has been requested more often than the entry it
+would evict, so one-off LLM sentences cannot push out hot greetings. Expired
+entries are removed by a background sweeper thread.
+"""
+import threading, time
+from array import array
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+class _FrequencySketch:
+    """4-row count-min sketch with periodic halving so old popularity fades."""
+
+    ROWS = 4
+
+    def __init__(self, width: int = 4096, sample: Optional[int] = None):
+        self.mask = (1 << max(8, (width - 1).bit_length())) - 1
+        self.rows = [array("B", bytes(self.mask + 1)) for _ in range(self.ROWS)]
+        self.sample = sample or 10 * (self.mask + 1)
+        self.additions = 0
+
+    def _slots(self, key: str):
+        h = hash(key) & 0xFFFFFFFFFFFFFFFF
+        return [(h >> (16 * i)) & self.mask for i in range(self.ROWS)]
+
+    def add(self, key: str):
+        for row, i in zip(self.rows, self._slots(key)):
+            if row[i] < 255:
+                row[i] += 1
+        self.additions += 1
+        if self.additions >= self.sample:
+            self.rows = [array("B", (c >> 1 for c in row)) for row in self.rows]
+            self.additions //= 2
+
+    def estimate(self, key: str) -> int:
+        return min(row[i] for row, i in zip(self.rows, self._slots(key)))
+
+def _entry_size(audio, marks: list) -> int:
+    # Payload dominates; each viseme mark is a small dict
+    return len(audio) + 64 * len(marks)
+
+class TTSCache:
+    def __init__(self, max_bytes: int = 64 << 20, ttl: float = 900.0, sweep_interval: float = 60.0):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires, audio, marks, size)
+        self._freq = _FrequencySketch()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._sweeper: Optional[threading.Thread] = None
+        self.hits = self.misses = self.evictions = self.expirations = self.rejected = 0
+
+    def get(self, key: str) -> Optional[Tuple[object, list]]:
+        now = time.time()
+        with self._lock:
+            self._freq.add(key)
+            rec = self._data.get(key)
+            if rec is None or rec[0] < now:
+                if rec is not None:
+                    self._remove(key)
+                    self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return rec[1], rec[2]
+
+    def put(self, key: str, audio, marks: list, ttl: Optional[float] = None) -> bool:
+        """Store an entry; returns False if the admission policy rejected it."""
+        size = _entry_size(audio, marks)
+        if size > self.max_bytes:
+            return False
+        now = time.time()
+        expires = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            # A refresh frees the old entry's bytes, but the old entry stays cached
+            # unless the new value is actually admitted
+            old = self._data.get(key)
+            freed = old[3] if old is not None else 0
+            if self._bytes - freed + size > self.max_bytes:
+                freq = self._freq.estimate(key)
+                victims = []
+                for vkey, rec in self._data.items():
+                    if self._bytes - freed + size <= self.max_bytes:
+                        break
+                    if vkey == key:
+                        continue
+                    # Expired entries are always fair game; live ones must be colder than the newcomer
+                    if rec[0] >= now and self._freq.estimate(vkey) >= freq:
+                        self.rejected += 1
+                        return False
+                    victims.append(vkey)
+                    freed += rec[3]
+                for vkey in victims:
+                    self._remove(vkey)
+                    self.evictions += 1
+            if old is not None:
+                self._remove(key)
+            self._data[key] = (expires, audio, marks, size)
+            self._bytes += size
+            return True
+
+    def replace_marks(self, key: str, old_marks: list, marks: list) -> bool:
+        """Swap in new marks for ``key`` if it still holds ``old_marks`` (same audio).
+
+        The entry keeps its audio, expiry and LRU position; readers holding the old
+        list are unaffected. Returns False if the entry changed or is gone.
+        """
+        with self._lock:
+            rec = self._data.get(key)
+            if rec is None or rec[2] is not old_marks:
+                return False
+            size = _entry_size(rec[1], marks)
+            self._data[key] = (rec[0], rec[1], marks, size)
+            self._bytes += size - rec[3]
+            return True
+
+    def sweep(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [k for k, rec in self._data.items() if rec[0] < now]
+            for k in expired:
+                self._remove(k)
+            self.expirations += len(expired)
+        return len(expired)
+
+    def start_sweeper(self):
+        if self._sweeper is not None:
+            return
+        def loop():
+            while True:
+                time.sleep(self.sweep_interval)
+                self.sweep()
+        self._sweeper = threading.Thread(target=loop, name="tts-cache-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def _remove(self, key: str):
+        rec = self._data.pop(key)
+        self._bytes -= rec[3]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "rejected": self.rejected,
+            }
@@ -1,12 +1,10 @@
 import base64, json, os, re, html, time, threading, random
-import logging
-from collections import defaultdict, deque
-from pathlib import Path
 from typing import List, Dict, Optional
 
-import boto3
-from botocore.config import Config
-from botocore.exceptions import ClientError
+try:
+    from session_store import SessionStore
+except ImportError:
+    from app.session_store import SessionStore
 
 # Persona definition (hardcoded to avoid import issues)
 PERSONA_BLESSED_BOY = (
@@ -34,33 +32,54 @@ POLLY_VOICE    = os.getenv("POLLY_VOICE",    "Ruth")
 POLLY_RATE     = os.getenv("POLLY_RATE",     "medium")
 POLLY_PITCH    = os.getenv("POLLY_PITCH",    "+4%")
 
-# AWS Clients
-bedrock = boto3.client(
-    "bedrock-runtime",
-    config=Config(region_name=BEDROCK_REGION, retries={"max_attempts": 3, "mode": "adaptive"})
-)
-polly = boto3.client(
-    "polly",
-    config=Config(region_name=POLLY_REGION, retries={"max_attempts": 3, "mode": "standard"})
-)
+# AWS Clients: built on first use and memoized, so a cold start that never talks
+# to AWS (health, history, locally answered chat) skips importing boto3 entirely
+_clients: Dict[str, object] = {}
+_clients_lock = threading.Lock()
+
+def _client(service: str, region: str, retry_mode: str):
+    c = _clients.get(service)
+    if c is None:
+        with _clients_lock:
+            c = _clients.get(service)
+            if c is None:
+                import boto3
+                from botocore.config import Config
+                c = _clients[service] = boto3.client(
+                    service,
+                    config=Config(region_name=region, retries={"max_attempts": 3, "mode": retry_mode})
+                )
+    return c
+
+def bedrock_client():
+    return _client("bedrock-runtime", BEDROCK_REGION, "adaptive")
+
+def polly_client():
+    return _client("polly", POLLY_REGION, "standard")
+
+def __getattr__(name: str):
+    # ``from app.utils import bedrock, polly`` still works; it just builds the client then
+    if name == "bedrock":
+        return bedrock_client()
+    if name == "polly":
+        return polly_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Conversation memory
 MAX_TURNS = 10
-_history: Dict[str, deque] = defaultdict(lambda: deque(maxlen=MAX_TURNS*2))
+_history = SessionStore(
+    max_turns=MAX_TURNS*2,
+    max_bytes=int(os.getenv("SESSION_MAX_BYTES", str(16 << 20))),
+    idle_ttl=float(os.getenv("SESSION_IDLE_TTL", "3600")),
+)
 
 def add_turn(session_id: str, role: str, content: str):
     """Add a conversation turn to memory"""
-    _history[session_id].append({"role": role, "content": content})
+    _history.append(session_id, role, content)
 
 def get_msgs(session_id: str) -> List[Dict]:
-    """Get conversation history in Claude format"""
-    msgs = []
-    for m in _history[session_id]:
-        msgs.append({
-            "role": "user" if m["role"] == "user" else "assistant",
-            "content": [{"type": "text", "text": m["content"]}]
-        })
-    return msgs
+    """Get conversation history in Claude format (reading never creates a session)"""
+    return _history.messages(session_id)
 
 def enforce_identity(text: str) -> str:
     """Remove unwanted identity prefixes"""
@@ -71,11 +90,10 @@ def enforce_identity(text: str) -> str:
     cleaned_lines = []
     for line in lines:
         line = line.strip()
-        if ':' in line and len(line.split(':')[0]) < 20:
-            # Remove potential "Name:" prefix
-            parts = line.split(':', 1)
-            if len(parts) > 1:
-                line = parts[1].strip()
+        head, colon, rest = line.partition(':')
+        # Remove potential "Name:" prefix; a clock time ("02:56", "14:56 Uhr") is not one
+        if colon and len(head) < 20 and not (head[-1:].isdigit() and rest[:1].isdigit()):
+            line = rest.strip()
         cleaned_lines.append(line)
     return '\n'.join(cleaned_lines).strip()
 
@@ -115,12 +133,22 @@ def _user_for_style(user_text: str, style: Optional[str] = None) -> str:
 
 BEDROCK_MAX_RETRIES = 3
 
-def _retry_sleep(attempt: int):
-    """Exponential backoff for retries"""
-    time.sleep((2 ** attempt) + random.uniform(0, 1))
+def _retry_sleep(attempt: int, cancel: Optional[threading.Event] = None):
+    """Exponential backoff for retries; returns early (raising) once ``cancel`` is set"""
+    delay = (2 ** attempt) + random.uniform(0, 1)
+    if cancel is None:
+        time.sleep(delay)
+    elif cancel.wait(delay):
+        raise TimeoutError("Bedrock call abandoned by its caller")
+
+def bedrock_reply(system_prompt: str, session_id: str, user_text: str, style: Optional[str] = None,
+                  cancel: Optional[threading.Event] = None) -> str:
+    """Get AI response from Bedrock.
 
-def bedrock_reply(system_prompt: str, session_id: str, user_text: str, style: Optional[str] = None) -> str:
-    """Get AI response from Bedrock"""
+    ``cancel`` is checked before every attempt and interrupts the retry backoff,
+    so a caller that gave up stops further upstream calls; an attempt already in
+    flight runs to completion and its result is discarded.
+    """
     messages = get_msgs(session_id)
     messages.append({"role":"user","content":[{"type":"text","text":_user_for_style(user_text, style)}]})
     
@@ -142,8 +170,12 @@ def bedrock_reply(system_prompt: str, session_id: str, user_text: str, style: Op
         "messages": messages,
     }
     
+    bedrock = bedrock_client()
+    from botocore.exceptions import ClientError   # loaded with the client above
     last_err = None
     for attempt in range(BEDROCK_MAX_RETRIES):
+        if cancel is not None and cancel.is_set():
+            raise TimeoutError("Bedrock call abandoned by its caller")
         try:
             r = bedrock.invoke_model(
                 modelId=BEDROCK_MODEL, 
@@ -157,7 +189,7 @@ def bedrock_reply(system_prompt: str, session_id: str, user_text: str, style: Op
             code = e.response.get("Error", {}).get("Code", "ClientError")
             if code in {"ThrottlingException", "TooManyRequestsException", "ServiceUnavailableException"}:
                 last_err = e
-                _retry_sleep(attempt)
+                _retry_sleep(attempt, cancel)
                 continue
             raise
     else:
@@ -181,6 +213,8 @@ def polly_tts_with_visemes(text: str, voice: str = None, rate: str = None, pitch
     
     ssml = f'<speak><prosody rate="{rate}" pitch="{pitch}">{html.escape(text)}</prosody></speak>'
     
+    polly = polly_client()
+    from botocore.exceptions import ClientError   # loaded with the client above
     try:
         response = polly.synthesize_speech(
             Text=ssml,
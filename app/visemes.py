@@ -0,0 +1,283 @@
+"""Offline text-to-viseme tracks in Polly's viseme alphabet.
+
+Stands in for (or runs ahead of) the second ``synthesize_speech`` call that only
+exists to fetch viseme speech marks. Text is transliterated to Latin where
+needed, mapped grapheme by grapheme to visemes with small per-language rule
+tables, and laid out on a timeline scaled to the duration of the synthesized
+MP3. The output has the same shape as Polly's marks
+(``{"time", "type": "viseme", "value"}``).
+
+This drives the avatar's mouth (``VMAP`` in the frontend); it is not a
+phoneme-accurate aligner.
+"""
+import re, unicodedata
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+VOWELS = frozenset("aeEiouO@")
+
+# Per-viseme duration weights; one unit is roughly one stressed vowel
+_WEIGHT_VOWEL = 1.0
+_WEIGHT_CONSONANT = 0.55
+_WEIGHT_WORD_GAP = 0.1
+_WEIGHT_COMMA = 1.8
+_WEIGHT_STOP = 3.0
+MS_PER_UNIT = 90      # nominal pace when the audio duration is unknown (streamed audio)
+LEAD_MS = 40          # Polly MP3s open with a short silence...
+TAIL_MS = 120         # ...and close with a longer one
+
+# Fallback letter table shared by every language (Polly's viseme classes:
+# p=bilabial, f=labiodental, T=dental, t=alveolar, S=postalveolar, s=sibilant, k=velar)
+_BASE: Dict[str, str] = {
+    "a": "a", "b": "p", "c": "k", "d": "t", "e": "e", "f": "f", "g": "k", "h": "",
+    "i": "i", "j": "S", "k": "k", "l": "t", "m": "p", "n": "t", "o": "o", "p": "p",
+    "q": "k", "r": "r", "s": "s", "t": "t", "u": "u", "v": "f", "w": "u", "x": "ks",
+    "y": "i", "z": "s",
+}
+
+# language -> (regex rewrites applied per word, grapheme table tried longest-first)
+_RULES: Dict[str, Tuple[List[Tuple[str, str]], Dict[str, str]]] = {
+    "en": (
+        [(r"c(?=[eiy])", "s"), (r"^kn", "n"), (r"^wr", "r"), (r"(?<=\w\w[^aeiou])e$", ""),
+         (r"^y", "i"), (r"tion$", "Son"), (r"igh", "ai")],
+        {"th": "T", "sh": "S", "ch": "S", "ph": "f", "ng": "k", "ck": "k", "qu": "ku",
+         "wh": "u", "gh": "", "ee": "i", "ea": "i", "oo": "u", "ou": "au", "ow": "au",
+         "ai": "ei", "ay": "ei", "oy": "Oi", "oi": "Oi", "aw": "O", "er": "@r", "ir": "@r",
+         "ur": "@r", "S": "S"},
+    ),
+    "es": (
+        [(r"c(?=[eiéí])", "s"), (r"g(?=[eiéí])", "j"), (r"gu(?=[eiéí])", "g")],
+        {"ll": "i", "ch": "S", "ñ": "ti", "qu": "k", "j": "k", "h": "", "z": "s", "v": "p",
+         "rr": "r", "y": "i"},
+    ),
+    "fr": (
+        [(r"(?<=\w)[stxdpe]s?$", ""), (r"^h", ""), (r"c(?=[eiy])", "s"), (r"g(?=[eiy])", "j")],
+        {"eau": "o", "au": "o", "ou": "u", "oi": "ua", "ai": "E", "ei": "E", "ch": "S",
+         "qu": "k", "gn": "ti", "on": "o", "an": "a", "en": "a", "in": "E", "un": "E",
+         "é": "e", "è": "E", "ê": "E", "ç": "s", "j": "S", "eu": "@", "ph": "f"},
+    ),
+    "de": (
+        [(r"^sp", "Sp"), (r"^st", "St")],
+        {"sch": "S", "ch": "k", "ei": "ai", "ie": "i", "eu": "Oi", "äu": "Oi", "w": "f",
+         "v": "f", "z": "ts", "ß": "s", "ä": "E", "ö": "@", "ü": "u", "j": "i", "S": "S",
+         "qu": "kf", "ck": "k", "ng": "k"},
+    ),
+    "it": (
+        [(r"c(?=[ei])", "S"), (r"g(?=[ei])", "S"), (r"sc(?=[ei])", "S"), (r"ci(?=[aou])", "S"),
+         (r"gi(?=[aou])", "S")],
+        {"gli": "i", "gn": "ti", "ch": "k", "gh": "k", "h": "", "z": "ts", "S": "S", "qu": "ku"},
+    ),
+    "pt": (
+        [(r"c(?=[ei])", "s"), (r"g(?=[ei])", "j")],
+        {"lh": "i", "nh": "ti", "ch": "S", "ão": "au", "ã": "a", "õ": "o", "ç": "s",
+         "qu": "k", "j": "S", "h": "", "x": "S", "rr": "r"},
+    ),
+    "nl": (
+        [],
+        {"sch": "sk", "ij": "Ei", "ei": "Ei", "oe": "u", "ui": "@i", "ou": "au", "au": "au",
+         "ee": "e", "oo": "o", "uu": "i", "g": "k", "ch": "k", "w": "f", "v": "f", "j": "i"},
+    ),
+    "sv": (
+        [(r"k(?=[eiyäö])", "S"), (r"g(?=[eiyäö])", "j")],
+        {"skj": "S", "stj": "S", "sj": "S", "tj": "S", "kj": "S", "j": "i", "å": "o",
+         "ä": "E", "ö": "@", "S": "S"},
+    ),
+    "da": (
+        [],
+        {"sj": "S", "j": "i", "å": "o", "æ": "E", "ø": "@", "d": "T", "ng": "k"},
+    ),
+    "nb": (
+        [(r"k(?=[eiy])", "S")],
+        {"skj": "S", "sj": "S", "kj": "S", "j": "i", "å": "o", "æ": "E", "ø": "@", "S": "S"},
+    ),
+    "pl": (
+        [],
+        {"sz": "S", "cz": "S", "rz": "S", "dz": "ts", "ch": "k", "ż": "S", "ź": "S", "ś": "S",
+         "ć": "S", "w": "f", "ł": "u", "j": "i", "ą": "o", "ę": "e", "ó": "u", "ń": "ti",
+         "c": "ts", "y": "@"},
+    ),
+    "tr": (
+        [],
+        {"ş": "S", "ç": "S", "c": "S", "ğ": "", "ı": "@", "ö": "@", "ü": "u", "j": "S"},
+    ),
+    "ru": (
+        [],
+        {"shch": "S", "zh": "S", "sh": "S", "ch": "S", "ts": "ts", "kh": "k", "ya": "ia",
+         "yu": "iu", "yo": "io", "ye": "ie"},
+    ),
+    "hi": (
+        [],
+        {"aa": "a", "ii": "i", "uu": "u", "ai": "E", "au": "O", "kh": "k", "gh": "k",
+         "ch": "S", "jh": "S", "th": "t", "dh": "t", "ph": "p", "bh": "p", "sh": "S", "v": "u"},
+    ),
+}
+# Scripts transliterated below land in these tables as well
+_RULES["ja"] = (
+    [],
+    {"tsu": "ts", "shi": "Si", "chi": "Si", "ji": "Si", "n": "t", "fu": "fu", "ou": "o"},
+)
+_RULES["ko"] = ([], {"ng": "k", "eo": "O", "eu": "@", "ae": "E", "oe": "e"})
+_RULES["zh"] = ([], {})
+_RULES["ar"] = ([], {"kh": "k", "gh": "k", "th": "T", "dh": "T", "sh": "S", "q": "k"})
+
+_CYRILLIC = dict(zip(
+    "абвгдеёжзийклмнопрстуфхцчшщъыьэюя",
+    ["a", "b", "v", "g", "d", "ye", "yo", "zh", "z", "i", "y", "k", "l", "m", "n", "o", "p",
+     "r", "s", "t", "u", "f", "kh", "ts", "ch", "sh", "shch", "", "y", "", "e", "yu", "ya"],
+))
+_ROMAJI_FIX = {"tu": "tsu", "ti": "chi", "si": "shi", "hu": "fu", "zi": "ji", "di": "ji"}
+
+@lru_cache(maxsize=4096)
+def _translit_char(ch: str) -> Tuple[str, str]:
+    """(kind, latin) for one non-Latin character; kind steers Devanagari matra handling."""
+    low = ch.lower()
+    if low in _CYRILLIC:
+        return "", _CYRILLIC[low]
+    name = unicodedata.name(ch, "")
+    if not name:
+        return "", ""
+    word = name.rsplit(" ", 1)[-1].lower()
+    if name.startswith(("HIRAGANA LETTER", "KATAKANA LETTER")):
+        return "", _ROMAJI_FIX.get(word, word)
+    if name.startswith("HANGUL SYLLABLE"):
+        return "", word
+    if name.startswith("DEVANAGARI LETTER"):
+        return "", word
+    if name.startswith("DEVANAGARI VOWEL SIGN"):
+        return "matra", word
+    if name == "DEVANAGARI SIGN VIRAMA":
+        return "matra", ""
+    if name.startswith(("DEVANAGARI SIGN ANUSVARA", "DEVANAGARI SIGN CANDRABINDU")):
+        return "", "n"
+    if name.startswith("ARABIC LETTER"):
+        word = name.split()[2].lower()
+        onset = re.match(r"[^aeiou]*", word).group(0)
+        return "", (onset + "a") if onset else "a"
+    if name.startswith("CJK UNIFIED IDEOGRAPH"):
+        return "", " ta"   # one syllable per character; no reading is available offline
+    if unicodedata.category(ch).startswith("P"):
+        return "", "." if any(w in name for w in ("FULL STOP", "QUESTION", "EXCLAMATION")) else ","
+    return "", ""
+
+def _latinize(text: str) -> str:
+    out: List[str] = []
+    for ch in text:
+        if ord(ch) < 0x250:   # Basic Latin through Latin Extended-B
+            out.append(ch)
+            continue
+        kind, latin = _translit_char(ch)
+        if kind == "matra" and out and out[-1].endswith("a"):
+            out[-1] = out[-1][:-1]   # the vowel sign replaces the consonant's inherent 'a'
+        out.append(latin)
+    return "".join(out)
+
+def _strip_accents(ch: str) -> str:
+    return unicodedata.normalize("NFD", ch)[0]
+
+@lru_cache(maxsize=64)
+def _compiled(lang: str):
+    rewrites, table = _RULES.get(lang) or _RULES["en"]
+    return [(re.compile(p), r) for p, r in rewrites], table, max(map(len, table), default=1)
+
+_TOKEN = re.compile(r"[^\W\d_]+|\d|[.!?;:]+|[,—–-]+", re.UNICODE)
+
+def _word_visemes(word: str, lang: str) -> List[str]:
+    rewrites, table, longest = _compiled(lang)
+    for pat, rep in rewrites:
+        word = pat.sub(rep, word)
+    out: List[str] = []
+    i, n = 0, len(word)
+    while i < n:
+        for size in range(min(longest, n - i), 0, -1):
+            g = word[i:i + size]
+            if g in table:
+                vis = table[g]
+                i += size
+                break
+        else:
+            g = word[i]
+            vis = _BASE.get(g)
+            if vis is None:
+                vis = _BASE.get(_strip_accents(g), "")
+            i += 1
+        for v in vis:
+            # Doubled letters ("ll", "tt") are one mouth shape
+            if not out or out[-1] != v or v in VOWELS:
+                out.append(v)
+    return out
+
+def _units(text: str, lang: str) -> List[Tuple[Optional[str], float]]:
+    """(viseme or None for a silent gap, weight) in reading order."""
+    units: List[Tuple[Optional[str], float]] = []
+    for tok in _TOKEN.findall(_latinize(text or "").lower()):
+        c = tok[0]
+        if c in ".!?;:":
+            units.append(("sil", _WEIGHT_STOP))
+        elif c in ",—–-":
+            units.append(("sil", _WEIGHT_COMMA))
+        else:
+            if units and units[-1][0] != "sil":
+                units.append((None, _WEIGHT_WORD_GAP))
+            vis = ["t", "a"] if c.isdigit() else _word_visemes(tok, lang)
+            units.extend((v, _WEIGHT_VOWEL if v in VOWELS else _WEIGHT_CONSONANT) for v in vis)
+    while units and units[-1][0] in ("sil", None):
+        units.pop()
+    return units
+
+def _lang_key(lang: Optional[str]) -> str:
+    base = (lang or "en").lower().split("-")[0]
+    return base if base in _RULES else "en"
+
+def local_visemes(text: str, lang: Optional[str] = None, duration_ms: Optional[int] = None) -> List[dict]:
+    """Viseme marks for ``text``; times are stretched to ``duration_ms`` when known."""
+    key = _lang_key(lang)
+    units = _units(text, key)
+    if not units:
+        return []
+    total = sum(w for _, w in units)
+    if duration_ms:
+        span = max(duration_ms - LEAD_MS - TAIL_MS, duration_ms * 0.6)
+    else:
+        span = total * MS_PER_UNIT
+    scale = span / total
+    marks, t = [], float(LEAD_MS)
+    for vis, w in units:
+        if vis is not None:
+            marks.append({"time": int(t), "type": "viseme", "value": vis})
+        t += w * scale
+    marks.append({"time": int(t), "type": "viseme", "value": "sil"})
+    return marks
+
+# ---- MP3 duration -----------------------------------------------------------
+_BITRATES = {
+    1: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),   # MPEG-1 layer III
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),       # MPEG-2/2.5 layer III
+}
+_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+def mp3_duration_ms(data: bytes) -> Optional[int]:
+    """Playback length of an MP3 by walking its frame headers (None if none found)."""
+    n, i = len(data), 0
+    if n >= 10 and data[:3] == b"ID3":
+        i = 10 + ((data[6] & 0x7F) << 21 | (data[7] & 0x7F) << 14 | (data[8] & 0x7F) << 7 | (data[9] & 0x7F))
+    seconds, frames = 0.0, 0
+    while i + 4 <= n:
+        b1, b2 = data[i + 1], data[i + 2]
+        if data[i] != 0xFF or (b1 & 0xE0) != 0xE0:
+            i += 1
+            continue
+        version, layer = (b1 >> 3) & 3, (b1 >> 1) & 3
+        br_i, sr_i, pad = (b2 >> 4) & 0xF, (b2 >> 2) & 3, (b2 >> 1) & 1
+        if version == 1 or layer != 1 or br_i in (0, 15) or sr_i == 3:
+            i += 1
+            continue
+        rate = _SAMPLE_RATES[version][sr_i]
+        bitrate = _BITRATES[1 if version == 3 else 2][br_i] * 1000
+        if version == 3:
+            size, samples = 144 * bitrate // rate + pad, 1152
+        else:
+            size, samples = 72 * bitrate // rate + pad, 576
+        seconds += samples / rate
+        frames += 1
+        i += size
+    return int(seconds * 1000) if frames else None
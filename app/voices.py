@@ -0,0 +1,42 @@
+"""Female Polly voice per language, shared by the FastAPI app and the Vercel handlers.
+
+Keys are lower-case language codes, optionally with a region ("es-mx").
+Every base language here is one ``lang_detect`` can identify.
+"""
+from typing import Optional
+
+VOICE_MAP = {
+    # English
+    "en": "Ruth",
+    # Spanish
+    "es": "Lucia",      # Spain (Neural female)
+    "es-mx": "Mia",     # Mexico (Neural female)
+    # French
+    "fr": "Lea",        # France (Neural female) — fallback to Celine if unavailable
+    "fr-fr": "Lea",
+    "fr-ca": "Chantal",  # Canada (female)
+    # Hindi
+    "hi": "Aditi",       # Bilingual hi-IN / en-IN female
+    # Other examples kept
+    "de": "Vicki",
+    "it": "Bianca",
+    "pt": "Camila",
+    "ja": "Mizuki",
+    "ko": "Seoyeon",
+    "zh": "Zhiyu",
+    "ar": "Zeina",
+    "nl": "Lotte",
+    "sv": "Astrid",
+    "da": "Naja",
+    "nb": "Liv",
+    "pl": "Maja",
+    "ru": "Tatyana",
+    "tr": "Filiz",
+}
+
+def voice_for(lang: Optional[str]) -> Optional[str]:
+    """Voice for ``lang`` (exact code first, then its base language), or None if unknown."""
+    if not lang:
+        return None
+    hint = lang.strip().lower()
+    return VOICE_MAP.get(hint) or VOICE_MAP.get(hint.split("-")[0])
@@ -0,0 +1,124 @@
+"""Bounded worker pool with per-job deadlines for the blocking Vercel handlers.
+
+A ``DeadlinePool`` owns a fixed number of worker threads (started on first
+use) and a bounded queue in front of them, so a slow upstream can never grow
+the number of threads or pending calls past ``workers + max_queue``; a
+submission that finds the queue full is rejected at once.
+
+``run(fn, timeout)`` waits at most ``timeout`` seconds. When the deadline
+passes, the job's ``cancel`` event is set: a job still queued is dropped
+without ever calling ``fn``, and a running one is abandoned. ``fn`` receives
+the event and is expected to stop at its next safe point (before a retry,
+during backoff); its eventual result is discarded. Stdlib only, so importing
+it adds nothing noticeable to a cold start.
+"""
+import queue, threading, time
+from typing import Any, Callable, List, Optional, Tuple
+
+class _Job:
+    __slots__ = ("fn", "deadline", "cancel", "done", "started", "value", "error")
+
+    def __init__(self, fn: Callable[[threading.Event], Any], deadline: float):
+        self.fn = fn
+        self.deadline = deadline
+        self.cancel = threading.Event()
+        self.done = threading.Event()
+        self.started = False
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+class DeadlinePool:
+    def __init__(self, name: str, workers: int, max_queue: int):
+        self.name = name
+        self.workers = workers
+        self._queue: "queue.Queue[_Job]" = queue.Queue(maxsize=max_queue)
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self.busy = 0
+        self.completed = self.failed = self.rejected = 0
+        self.timeouts = 0            # callers that stopped waiting
+        self.dropped = 0             # timed-out jobs removed before they started
+        self.abandoned = 0           # timed-out jobs that were already running
+        self.abandoned_running = 0   # ...and have not returned yet
+
+    def _start(self):
+        with self._lock:
+            while len(self._threads) < self.workers:
+                t = threading.Thread(target=self._work, name=f"{self.name}-{len(self._threads)}", daemon=True)
+                self._threads.append(t)
+                t.start()
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            with self._lock:
+                if job.cancel.is_set() or time.monotonic() >= job.deadline:
+                    job.cancel.set()
+                    self.dropped += 1
+                    job.done.set()
+                    continue
+                job.started = True
+                self.busy += 1
+            try:
+                job.value = job.fn(job.cancel)
+            except BaseException as e:
+                job.error = e
+            with self._lock:
+                self.busy -= 1
+                if job.cancel.is_set():
+                    self.abandoned_running -= 1
+                elif job.error is not None:
+                    self.failed += 1
+                else:
+                    self.completed += 1
+                job.done.set()
+
+    def run(self, fn: Callable[[threading.Event], Any], timeout: float) -> Tuple[str, Any]:
+        """Run ``fn(cancel)`` on the pool; returns ``(status, value)``.
+
+        ``status`` is ``"ok"`` (value is the result), ``"error"`` (value is the
+        exception), ``"timeout"`` or ``"rejected"`` (value is ``None``).
+        """
+        if len(self._threads) < self.workers:
+            self._start()
+        job = _Job(fn, time.monotonic() + timeout)
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            return "rejected", None
+        if not job.done.wait(max(0.0, job.deadline - time.monotonic())):
+            with self._lock:
+                if not job.done.is_set():
+                    job.cancel.set()
+                    self.timeouts += 1
+                    if job.started:
+                        self.abandoned += 1
+                        self.abandoned_running += 1
+                    return "timeout", None
+        if job.cancel.is_set():
+            # Dropped by a worker that reached it after the deadline
+            with self._lock:
+                self.timeouts += 1
+            return "timeout", None
+        if job.error is not None:
+            return "error", job.error
+        return "ok", job.value
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "threads": len(self._threads),
+                "busy": self.busy,
+                "queued": self._queue.qsize(),
+                "max_queue": self._queue.maxsize,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+                "dropped_before_start": self.dropped,
+                "abandoned": self.abandoned,
+                "abandoned_running": self.abandoned_running,
+            }
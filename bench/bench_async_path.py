@@ -0,0 +1,167 @@
+"""Compare the old thread-per-request path with the async request path.
+
+Upstream calls are simulated with ``time.sleep`` so the benchmark runs without
+AWS credentials. It models the two things that mattered in production:
+
+* ``chat``: a gated (CHAT_MAX_CONCURRENCY) upstream call with throttling
+  backoff, plus probe requests arriving during the burst. A probe is the same
+  cached-TTS request body in both paths (key normalization, ``TTSCache`` hit,
+  JSON payload); only where it is dispatched differs. A sync FastAPI handler
+  runs on one of anyio's 40 worker threads, which queued chats are holding, so
+  probes stall behind the gate; the async handler runs as a task on the loop.
+* ``streams``: many long-lived streams. The sync path can only advance as many
+  streams as it has worker threads. The async path still reads every chunk on
+  the upstream I/O pool (``aiter_io``), so stream concurrency remains bounded
+  by ``UPSTREAM_IO_THREADS`` (128 by default) reads in flight; it frees the
+  request thread between chunks, it does not remove the thread bound.
+
+Run from the repository root::
+
+    python bench/bench_async_path.py
+"""
+import asyncio, base64, os, random, re, sys, threading, time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.concurrency import UPSTREAM_IO_THREADS, AsyncGate, aiter_io, retry_sleep, run_io  # noqa: E402
+from app.tts_cache import TTSCache  # noqa: E402
+
+ANYIO_THREADS = 40          # anyio's default thread limiter used by sync FastAPI handlers
+GATE = 4                    # CHAT_MAX_CONCURRENCY default
+UPSTREAM_S = 0.05           # simulated Bedrock latency
+THROTTLE_P = 0.2            # share of first attempts that are throttled
+CHAT_N = 120
+PROBES = 40
+STREAMS = 300
+STREAM_EVENTS = 20
+EVENT_S = 0.01
+
+# ---- the probe: /api/tts answered from the cache ---------------------------------
+_cache = TTSCache()
+PROBE_TEXT = "Hello there!"
+
+def _tts_key(txt: str, lang=None, mode=None) -> str:
+    # same normalization as app.main._tts_key
+    norm_txt = re.sub(r"\s+", " ", txt).strip().lower()
+    return f"{(lang or '').strip().lower()}|{(mode or '').strip().lower()}|{norm_txt}"
+
+_cache.put(_tts_key(PROBE_TEXT), os.urandom(12_000), [{"time": i * 60, "value": "a"} for i in range(20)])
+
+def cached_tts():
+    """Handler body for a cache hit: key, lookup, JSON payload."""
+    audio, marks = _cache.get(_tts_key(PROBE_TEXT))
+    return {"audio_b64": base64.b64encode(audio).decode("ascii"), "marks": marks}
+
+def _pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(len(xs) * p))] * 1000
+
+# ---- sync (baseline) -------------------------------------------------------
+def sync_chat():
+    gate = threading.Semaphore(GATE)
+    rnd = random.Random(1)
+    throttles = [rnd.random() < THROTTLE_P for _ in range(CHAT_N)]
+
+    def handler(i):
+        if not gate.acquire(timeout=10):
+            return
+        try:
+            for attempt in range(3):
+                time.sleep(UPSTREAM_S)
+                if attempt == 0 and throttles[i]:
+                    time.sleep(0.25 * (2 ** attempt) + random.random() * 0.2)
+                    continue
+                break
+        finally:
+            gate.release()
+
+    pool = ThreadPoolExecutor(ANYIO_THREADS)
+    t0 = time.perf_counter()
+    futs = [pool.submit(handler, i) for i in range(CHAT_N)]
+    lat = []
+    for _ in range(PROBES):
+        s = time.perf_counter()
+        pool.submit(cached_tts).result()   # a sync handler waits for a worker thread
+        lat.append(time.perf_counter() - s)
+        time.sleep(0.02)
+    for f in futs:
+        f.result()
+    wall = time.perf_counter() - t0
+    pool.shutdown()
+    return wall, lat
+
+def sync_streams():
+    def stream():
+        for _ in range(STREAM_EVENTS):
+            time.sleep(EVENT_S)
+
+    pool = ThreadPoolExecutor(ANYIO_THREADS)
+    t0 = time.perf_counter()
+    for f in [pool.submit(stream) for _ in range(STREAMS)]:
+        f.result()
+    wall = time.perf_counter() - t0
+    pool.shutdown()
+    return wall
+
+# ---- async ------------------------------------------------------------------
+async def async_chat():
+    gate = AsyncGate(GATE)
+    rnd = random.Random(1)
+    throttles = [rnd.random() < THROTTLE_P for _ in range(CHAT_N)]
+
+    async def handler(i):
+        if not await gate.acquire(timeout=10):
+            return
+        try:
+            for attempt in range(3):
+                await run_io(time.sleep, UPSTREAM_S)
+                if attempt == 0 and throttles[i]:
+                    await retry_sleep(attempt)
+                    continue
+                break
+        finally:
+            gate.release()
+
+    async def probe():
+        return cached_tts()
+
+    t0 = time.perf_counter()
+    tasks = [asyncio.create_task(handler(i)) for i in range(CHAT_N)]
+    lat = []
+    for _ in range(PROBES):
+        s = time.perf_counter()
+        await asyncio.create_task(probe())   # an async handler is a task on the loop
+        lat.append(time.perf_counter() - s)
+        await asyncio.sleep(0.02)
+    await asyncio.gather(*tasks)
+    return time.perf_counter() - t0, lat
+
+def _blocking_events():
+    for _ in range(STREAM_EVENTS):
+        time.sleep(EVENT_S)
+        yield b"{}"
+
+async def async_streams():
+    async def stream():
+        async for _ in aiter_io(_blocking_events()):
+            pass
+    t0 = time.perf_counter()
+    await asyncio.gather(*[stream() for _ in range(STREAMS)])
+    return time.perf_counter() - t0
+
+def main():
+    sw, slat = sync_chat()
+    aw, alat = asyncio.run(async_chat())
+    print(f"chat burst: {CHAT_N} requests, gate={GATE}, upstream={UPSTREAM_S*1000:.0f}ms, throttle={THROTTLE_P:.0%}")
+    print(f"  sync : wall {sw:6.2f}s  probe p50 {_pct(slat, .5):8.1f}ms  p99 {_pct(slat, .99):8.1f}ms")
+    print(f"  async: wall {aw:6.2f}s  probe p50 {_pct(alat, .5):8.1f}ms  p99 {_pct(alat, .99):8.1f}ms")
+    ss = sync_streams()
+    as_ = asyncio.run(async_streams())
+    ideal = STREAM_EVENTS * EVENT_S
+    print(f"streams: {STREAMS} concurrent x {STREAM_EVENTS} events @ {EVENT_S*1000:.0f}ms (ideal {ideal:.2f}s)")
+    print(f"  sync : wall {ss:6.2f}s  (limited to {ANYIO_THREADS} worker threads)")
+    print(f"  async: wall {as_:6.2f}s  (each chunk read holds one of UPSTREAM_IO_THREADS={UPSTREAM_IO_THREADS};")
+    print(f"         beyond that many concurrent reads, streams queue for a thread just like the sync path)")
+
+if __name__ == "__main__":
+    main()
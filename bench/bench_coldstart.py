@@ -0,0 +1,146 @@
+"""Cold start of the Vercel handlers in ``api/``: module import time and the
+first response, each measured in a fresh interpreter.
+
+Run from the repository root::
+
+    python bench/bench_coldstart.py              # table + import breakdown
+    python bench/bench_coldstart.py --check      # exit 1 when a budget is exceeded
+    python bench/bench_coldstart.py chat --top 15
+
+Every request below is answered without AWS (health checks, history, a
+greeting the intent router answers locally, empty TTS/sing input rejected
+with 400), so the numbers are pure start-up cost and need no credentials. A
+handler that loads boto3 on one of these paths is reported as a failure too:
+AWS clients are meant to be built on first use only.
+
+The breakdown re-runs each handler under ``python -X importtime`` and lists the
+costliest top-level imports made while loading the module and while serving
+the first request.
+"""
+import argparse, json, os, statistics, subprocess, sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# handler -> (method, path, body, import budget ms, first response budget ms)
+CASES = {
+    "health":      ("GET",  "/api/health", None, 5, 5),
+    "simple_test": ("GET",  "/api/simple_test", None, 5, 5),
+    "history":     ("GET",  "/api/history?session_id=bench", None, 5, 25),
+    "chat":        ("POST", "/api/chat", {"text": "hello", "session_id": "bench"}, 25, 25),
+    "tts":         ("POST", "/api/tts", {"text": ""}, 5, 25),
+    "sing":        ("POST", "/api/sing", {"text": ""}, 5, 25),
+}
+MARK = "-- coldstart:"
+
+# Runs in the child interpreter: load the handler file, then serve one request
+# through it with in-memory request/response streams. http.server is loaded up
+# front because the Vercel runtime has already imported it before any handler.
+CHILD = r"""
+import http.server, importlib.util, io, json, sys, time
+name, method, path, body = sys.argv[1], sys.argv[2], sys.argv[3], sys.argv[4].encode()
+mark = lambda phase: print(MARK + phase, file=sys.stderr, flush=True)
+mark("import")
+t0 = time.perf_counter()
+spec = importlib.util.spec_from_file_location("api_" + name, "api/%s.py" % name)
+mod = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(mod)
+t1 = time.perf_counter()
+mark("request")
+h = mod.handler.__new__(mod.handler)
+h.rfile, h.wfile = io.BytesIO(body), io.BytesIO()
+h.headers = {"Content-Length": str(len(body)), "Content-Type": "application/json"}
+h.command, h.path, h.request_version, h.requestline = method, path, "HTTP/1.1", method + " " + path
+h.client_address, h.close_connection = ("127.0.0.1", 0), True
+h.log_message = lambda *a: None
+getattr(h, "do_" + method)()
+t2 = time.perf_counter()
+mark("done")
+status = h.wfile.getvalue().split(b" ", 2)[1].decode()
+print(json.dumps({"import_ms": (t1 - t0) * 1000, "first_ms": (t2 - t1) * 1000,
+                  "status": status, "boto3": "boto3" in sys.modules}))
+""".replace("MARK", repr(MARK))
+
+def _child(name: str, importtime: bool = False):
+    method, path, body = CASES[name][:3]
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + [
+        "-c", CHILD, name, method, path, json.dumps(body) if body is not None else ""]
+    env = dict(os.environ, AWS_EC2_METADATA_DISABLED="true")
+    p = subprocess.run(cmd, cwd=ROOT, env=env, capture_output=True, text=True, timeout=120)
+    if p.returncode:
+        raise RuntimeError(f"{name}: child failed\n{p.stderr[-2000:]}")
+    return json.loads(p.stdout.strip().splitlines()[-1]), p.stderr
+
+def measure(name: str, runs: int) -> dict:
+    samples = [_child(name)[0] for _ in range(runs)]
+    return {
+        "import_ms": statistics.median(s["import_ms"] for s in samples),
+        "first_ms": statistics.median(s["first_ms"] for s in samples),
+        "status": samples[-1]["status"],
+        "boto3": any(s["boto3"] for s in samples),
+    }
+
+def breakdown(name: str, top: int) -> dict:
+    """Top-level imports per phase from ``-X importtime``: phase -> [(cumulative us, module)]."""
+    _, err = _child(name, importtime=True)
+    phases, phase = {}, None
+    for line in err.splitlines():
+        if line.startswith(MARK):
+            phase = line[len(MARK):]
+            continue
+        if phase not in ("import", "request") or not line.startswith("import time:"):
+            continue
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue   # the column header
+        mod = parts[2][1:]
+        if mod.startswith(" "):
+            continue   # nested; its cost is already in its parent's cumulative time
+        phases.setdefault(phase, []).append((int(parts[1]), mod))
+    return {p: sorted(rows, reverse=True)[:top] for p, rows in phases.items()}
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("handlers", nargs="*", help=f"subset of: {', '.join(CASES)}")
+    ap.add_argument("--runs", type=int, default=5, help="fresh interpreters per handler (median is reported)")
+    ap.add_argument("--top", type=int, default=6, help="imports listed per phase in the breakdown")
+    ap.add_argument("--check", action="store_true", help="exit 1 when a handler is over budget")
+    ap.add_argument("--scale", type=float, default=1.0, help="multiply every budget (slow CI machines)")
+    ap.add_argument("--no-breakdown", action="store_true")
+    args = ap.parse_args()
+    names = args.handlers or list(CASES)
+    unknown = [n for n in names if n not in CASES]
+    if unknown:
+        ap.error(f"unknown handler(s): {', '.join(unknown)}")
+
+    failures = []
+    print(f"{'handler':12s} {'status':>6s} {'import ms':>10s} {'budget':>7s} {'first ms':>9s} {'budget':>7s}  boto3")
+    for name in names:
+        r = measure(name, args.runs)
+        imp_budget, first_budget = (b * args.scale for b in CASES[name][3:])
+        over = []
+        if r["import_ms"] > imp_budget:
+            over.append(f"import {r['import_ms']:.1f}ms > {imp_budget:.0f}ms")
+        if r["first_ms"] > first_budget:
+            over.append(f"first response {r['first_ms']:.1f}ms > {first_budget:.0f}ms")
+        if r["boto3"]:
+            over.append("boto3 imported on a path that never calls AWS")
+        failures += [f"{name}: {o}" for o in over]
+        print(f"{name:12s} {r['status']:>6s} {r['import_ms']:10.1f} {imp_budget:7.0f} "
+              f"{r['first_ms']:9.1f} {first_budget:7.0f}  {'yes' if r['boto3'] else 'no'}"
+              f"{'  OVER' if over else ''}")
+
+    if not args.no_breakdown:
+        for name in names:
+            print(f"\n{name} (-X importtime, cumulative ms of top-level imports)")
+            for phase, rows in breakdown(name, args.top).items():
+                print(f"  {phase}:")
+                for us, mod in rows:
+                    print(f"    {us / 1000:8.2f}  {mod}")
+
+    if failures:
+        print("\nover budget:\n  " + "\n  ".join(failures))
+        if args.check:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
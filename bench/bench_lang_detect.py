@@ -0,0 +1,127 @@
+"""Language identification: accuracy on held-out fixtures and throughput.
+
+Run from the repository root::
+
+    python bench/bench_lang_detect.py            # accuracy table + timings
+    python bench/bench_lang_detect.py --check    # exit 1 below the accuracy floor
+
+Accuracy counts a sentence as right when ``detect`` returns the expected code
+(or no answer where the fixture expects "-"). A confident wrong answer is worse
+than none, since it picks a foreign voice, so ``--check`` also fails on any.
+Short texts (under ``MARGIN_LETTERS`` letters) are also reported on their own:
+they are where trigrams mislead, and the sentence-length fixtures would
+otherwise hide them in the aggregate.
+Throughput compares the per-request Hinglish word list ``api/tts.py`` used to
+rebuild with ``detect`` per sentence and ``detect_batch``.
+"""
+import argparse, os, statistics, subprocess, sys, time
+from collections import Counter, defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from app.lang_detect import MARGIN_LETTERS, classify, detect, detect_batch  # noqa: E402
+
+FIXTURES = os.path.join(ROOT, "bench", "fixtures", "lang_detect.tsv")
+MIN_ACCURACY = 0.9
+REPS = 5
+
+def load(path: str = FIXTURES):
+    rows = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip() and not line.startswith("#"):
+                lang, text = line.rstrip("\n").split("\t", 1)
+                rows.append((lang, text))
+    return rows
+
+# ---- what api/tts.py did before: a 100-item list rebuilt per request, O(n) membership per word
+def legacy_hinglish(text: str):
+    hinglish_words = [
+        'aap', 'aapka', 'aapki', 'haan', 'nahin', 'nahi', 'kya', 'kaise', 'kab', 'kahan',
+        'kyun', 'kaun', 'main', 'meri', 'mera', 'mujhe', 'tumhara', 'tumhari', 'tumhe',
+        'woh', 'yeh', 'yah', 'iske', 'uske', 'iska', 'uska', 'bahut', 'accha', 'achha',
+        'bura', 'theek', 'thik', 'samjha', 'samjhi', 'pata', 'malum', 'dekho', 'suno',
+        'bol', 'bolo', 'kar', 'karo', 'mat', 'padh', 'padho', 'likh', 'likho', 'chal',
+        'chalo', 'aa', 'aao', 'ja', 'jao', 'paani', 'pani', 'khana', 'ghar', 'kaam',
+        'kitna', 'kitni', 'kuch', 'sab', 'sabhi', 'mere', 'tere', 'humara', 'tumhara',
+        'bhi', 'toh', 'to', 'se', 'mein', 'pe', 'par', 'ke', 'ki', 'ka', 'hai', 'hain',
+        'tha', 'thi', 'the', 'hoga', 'hogi', 'honge', 'dost', 'bhai', 'behen', 'mama',
+        'papa', 'dada', 'dadi', 'nana', 'nani', 'beta', 'beti'
+    ]
+    words = text.lower().split()
+    ratio = sum(1 for w in words if w in hinglish_words) / len(words) if words else 0
+    return 'hi' if ratio > 0.2 else None
+
+def is_short(text: str) -> bool:
+    return sum(map(str.isalpha, text)) < MARGIN_LETTERS
+
+def accuracy(rows):
+    per = defaultdict(Counter)
+    wrong, confident_wrong = [], 0
+    for lang, text in rows:
+        g = classify(text)
+        got = g.lang or "-"
+        ok = got == lang
+        per[lang]["ok" if ok else "miss"] += 1
+        if not ok:
+            wrong.append((lang, got, g.label, g.margin, text))
+            confident_wrong += g.lang is not None
+    return per, wrong, confident_wrong
+
+def _summary(name, rows):
+    per, _, confident_wrong = accuracy(rows)
+    right = sum(c["ok"] for c in per.values())
+    print(f"{name:6s} {right}/{len(rows)} = {right / len(rows):.1%}, confident misses {confident_wrong}")
+
+def _time(fn):
+    best = float("inf")
+    for _ in range(REPS):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+def import_ms(runs: int = 5) -> float:
+    code = ("import time; t = time.perf_counter(); import app.lang_detect; "
+            "print((time.perf_counter() - t) * 1000)")
+    out = [float(subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True,
+                                check=True).stdout) for _ in range(runs)]
+    return statistics.median(out)
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--check", action="store_true", help=f"exit 1 below {MIN_ACCURACY:.0%} or on a confident miss")
+    ap.add_argument("--repeat", type=int, default=200, help="copies of the fixture set timed per run")
+    args = ap.parse_args()
+
+    rows = load()
+    per, wrong, confident_wrong = accuracy(rows)
+    total = sum(sum(c.values()) for c in per.values())
+    right = sum(c["ok"] for c in per.values())
+    print(f"{'lang':5s} {'ok':>4s} {'miss':>5s}")
+    for lang in sorted(per):
+        print(f"{lang:5s} {per[lang]['ok']:4d} {per[lang]['miss']:5d}")
+    print(f"accuracy {right}/{total} = {right / total:.1%}, confident misses {confident_wrong}")
+    _summary("short", [r for r in rows if is_short(r[1])])
+    _summary("long", [r for r in rows if not is_short(r[1])])
+    for lang, got, label, margin, text in wrong:
+        print(f"  expected {lang:2s} got {got:2s} (best {label}, margin {margin:.3f})  {text}")
+
+    texts = [t for _, t in rows] * args.repeat
+    n = len(texts)
+    legacy = _time(lambda: [legacy_hinglish(t) for t in texts])
+    single = _time(lambda: [detect(t) for t in texts])
+    batch = _time(lambda: detect_batch(texts))
+    unique = _time(lambda: [detect_batch([t]) for t in texts[:len(rows)]]) * args.repeat
+    print(f"\n{n} sentences ({len(rows)} distinct)")
+    print(f"{'variant':26s} {'us/sentence':>12s}")
+    for name, secs in (("legacy Hinglish list", legacy), ("detect per sentence", single),
+                       ("detect_batch", batch), ("detect_batch, all distinct", unique)):
+        print(f"{name:26s} {secs / n * 1e6:12.2f}")
+    print(f"import app.lang_detect: {import_ms():.1f} ms (median, fresh interpreter)")
+
+    if args.check and (right / total < MIN_ACCURACY or confident_wrong):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
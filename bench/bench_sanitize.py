@@ -0,0 +1,124 @@
+"""Reply sanitizing throughput: the old per-call ``re.sub`` chain vs the
+precompiled batch functions vs ``StreamSanitizer`` fed token-sized deltas.
+
+Run from the repository root::
+
+    python bench/bench_sanitize.py
+    python bench/bench_sanitize.py --check   # exit 1 past MAX_STREAM_RATIO or on a mismatch
+
+Besides throughput it reports what sanitizing costs per reply (each variant
+against the legacy chain that ran once per finished reply), checks that the
+streamed output matches the batch functions and reports the most characters
+the stream held back at once.
+"""
+import argparse, os, random, re, statistics, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.sanitize import StreamSanitizer, enforce_identity  # noqa: E402
+
+REPLIES = 2000
+REPS = 5
+MAX_STREAM_RATIO = 4.0   # streamed per-reply cost allowed, as a multiple of the legacy chain
+
+# ---- the functions chat_stream used before (patterns resolved through re's cache per call)
+ACTION_PATTERNS = [
+    r"\*[^*]{0,120}\*", r"\[[^\]]{0,120}\]",
+    r"\((?:smiles|laughs|chuckles|sighs|clears throat|giggles)[^)]*\)"
+]
+def legacy_strip_stage(text: str) -> str:
+    t = text
+    for pat in ACTION_PATTERNS:
+        t = re.sub(pat, "", t, flags=re.I)
+    t = re.sub(r"^As an AI(?: language model)?[, ]*", "", t, flags=re.I)
+    t = re.sub(r"\s{2,}", " ", t).strip()
+    return t
+
+def legacy_enforce_identity(text: str) -> str:
+    t = re.sub(r"\bClaude\b", "Rem", text, flags=re.I)
+    t = re.sub(r"\bBlessed Boy\b", "Rem", t, flags=re.I)
+    t = re.sub(r"\bAnthropic\b", "my team", t, flags=re.I)
+    t = re.sub(r"^\s*Rem\s*[:\-–—.,]\s*", "", t, flags=re.I)
+    return legacy_strip_stage(t)
+
+# ---- corpus -------------------------------------------------------------------
+SENTENCES = [
+    "That sounds like a lovely plan for the weekend.",
+    "I think you should give it another try tomorrow!",
+    "How did the interview go?",
+    "Honestly, Claude would say the same thing.",
+    "Anthropic made sure I could help with that.",
+    "Let me know if you want more ideas.",
+    "Blessed Boy built and named me.",
+    "Coffee first, then the hard problems.",
+]
+EXTRAS = ["*smiles*", "*tilts head thoughtfully*", "[laughs]", "(chuckles softly)", "(see above)", "  "]
+LEADS = ["", "", "", "Rem: ", "As an AI, ", "*waves* "]
+
+def corpus(n: int, seed: int = 1):
+    rnd = random.Random(seed)
+    out = []
+    for _ in range(n):
+        parts = [rnd.choice(LEADS)]
+        for _ in range(rnd.randint(1, 4)):
+            if rnd.random() < 0.3:
+                parts.append(rnd.choice(EXTRAS) + " ")
+            parts.append(rnd.choice(SENTENCES) + " ")
+        out.append("".join(parts).rstrip())
+    return out
+
+def deltas(text: str):
+    # Bedrock text deltas are roughly word-piece sized
+    return re.findall(r"\S{1,4}|\s+", text)
+
+# ---- runs -----------------------------------------------------------------------
+def _time(fn, texts):
+    best = float("inf")
+    for _ in range(REPS):
+        t0 = time.perf_counter()
+        for t in texts:
+            fn(t)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+def _stream(chunks):
+    s = StreamSanitizer()
+    out = [s.feed(c) for c in chunks]
+    out.append(s.flush())
+    return "".join(out), s.held
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--check", action="store_true",
+                    help=f"exit 1 when streaming costs over {MAX_STREAM_RATIO:g}x legacy per reply or output differs")
+    args = ap.parse_args()
+
+    texts = corpus(REPLIES)
+    split = [deltas(t) for t in texts]
+    chars = sum(map(len, texts))
+    n_deltas = sum(map(len, split))
+
+    legacy = _time(legacy_enforce_identity, texts)
+    batch = _time(enforce_identity, texts)
+    stream = _time(_stream, split)
+
+    mismatch, held = 0, []
+    for t, chunks in zip(texts, split):
+        got, h = _stream(chunks)
+        held.append(h)
+        mismatch += got != enforce_identity(t)
+    legacy_diff = sum(legacy_enforce_identity(t) != enforce_identity(t) for t in texts)
+
+    print(f"{REPLIES} replies, {chars} chars, {n_deltas} deltas")
+    print(f"{'variant':18s} {'MB/s':>7s} {'us/reply':>9s} {'x legacy':>9s}")
+    for name, secs in (("legacy re.sub", legacy), ("precompiled", batch), ("stream (deltas)", stream)):
+        print(f"{name:18s} {chars / secs / 1e6:7.2f} {secs / REPLIES * 1e6:9.1f} {secs / legacy:9.2f}")
+    ratio = stream / legacy
+    print(f"stream: {stream / n_deltas * 1e6:.2f} us/delta, {(stream - legacy) / REPLIES * 1e6:+.1f} us/reply "
+          f"over legacy; held chars median {statistics.median(held):.0f} max {max(held)}")
+    print(f"stream vs batch mismatches: {mismatch}; legacy vs batch differences: {legacy_diff}")
+
+    if args.check and (ratio > MAX_STREAM_RATIO or mismatch):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
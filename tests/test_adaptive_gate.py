@@ -0,0 +1,75 @@
+"""AIMD admission: the limit grows while busy and healthy, and shrinks on trouble."""
+import asyncio, threading
+
+from app.concurrency import AdaptiveGate
+
+def _busy(gate):
+    gate._in_use = gate._capacity()
+
+def test_grows_additively_only_while_the_limit_is_what_binds():
+    g = AdaptiveGate("t", 4, max_limit=8)
+    g.observe(latency=0.1)
+    assert g.limit == 4   # idle: nothing to learn
+    _busy(g)
+    for _ in range(4):
+        g.observe(latency=0.1)
+    assert 4.9 < g.limit < 5.0   # about +1 per ``limit`` successes
+    for _ in range(200):
+        _busy(g)
+        g.observe(latency=0.1)
+    assert g.limit == 8
+
+def test_throttle_cuts_multiplicatively_once_per_cooldown():
+    g = AdaptiveGate("t", 10, decrease=0.5, cooldown=60)
+    g.observe(throttled=True)
+    g.observe(throttled=True)
+    assert g.limit == 5 and g.cuts == 1 and g.throttles == 2
+
+def test_never_below_min_limit():
+    g = AdaptiveGate("t", 2, min_limit=2, decrease=0.1, cooldown=0)
+    g.observe(throttled=True)
+    assert g.limit == 2
+
+def test_latency_spike_cuts_within_its_own_series():
+    g = AdaptiveGate("t", 10, decrease=0.5, tolerance=2.0, cooldown=0)
+    for _ in range(10):
+        g.observe(latency=0.1, series="ttft")
+    g.observe(latency=1.0, series="total")   # slower kind of call, not a spike
+    assert g.cuts == 0
+    g.observe(latency=0.5, series="ttft")
+    assert g.cuts == 1 and g.limit == 5
+
+def test_waiters_are_admitted_when_a_slot_frees():
+    async def run():
+        g = AdaptiveGate("t", 1, max_limit=4)
+        assert await g.acquire()
+        assert not g.try_acquire()
+        assert not await g.acquire(timeout=0.01)
+        w = asyncio.ensure_future(g.acquire(timeout=1))
+        await asyncio.sleep(0)
+        assert g.waiting == 1
+        g.release()
+        assert await w
+        return g
+    g = asyncio.run(run())
+    assert g.in_use == 1 and g.waiting == 0
+
+def test_feedback_from_an_io_thread_runs_on_the_loop_and_admits_waiters():
+    async def run():
+        g = AdaptiveGate("t", 1, max_limit=4, increase=1.0)
+        assert await g.acquire()
+        waiter = asyncio.ensure_future(g.acquire(timeout=1))
+        await asyncio.sleep(0)
+        loop_thread, seen = threading.get_ident(), []
+        original = g._observe
+        def spy(*args):
+            seen.append(threading.get_ident())
+            original(*args)
+        g._observe = spy
+        await asyncio.get_running_loop().run_in_executor(None, lambda: g.observe(latency=0.1))
+        # No release(): the grown limit alone lets the waiter in
+        assert await asyncio.wait_for(waiter, 0.5)
+        return g, seen, loop_thread
+    g, seen, loop_thread = asyncio.run(run())
+    assert seen == [loop_thread]
+    assert g.limit == 2 and g.in_use == 2
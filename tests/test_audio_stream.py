@@ -0,0 +1,62 @@
+"""Streamed /api/tts audio: one Polly call per key, failures charged to the region."""
+import asyncio, functools, importlib, os, threading, time
+from types import SimpleNamespace
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def main(monkeypatch):
+    pytest.importorskip("fastapi")
+    pytest.importorskip("boto3")
+    from fastapi import staticfiles
+    monkeypatch.setattr(staticfiles, "StaticFiles", functools.partial(staticfiles.StaticFiles, check_dir=False))
+    monkeypatch.syspath_prepend(os.path.join(ROOT, "app"))
+    return importlib.import_module("main")
+
+class _Body:
+    def __init__(self, chunks, fail=False):
+        self.chunks, self.fail, self.closed = chunks, fail, False
+
+    def iter_chunks(self, chunk_size=1024):
+        for c in self.chunks:
+            time.sleep(0.01)
+            yield c
+        if self.fail:
+            raise ConnectionError("reset mid-stream")
+
+    def close(self):
+        self.closed = True
+
+async def _read(response):
+    return b"".join([c async for c in response.body_iterator])
+
+def test_concurrent_streams_share_one_polly_call(main):
+    calls, bodies = [], []
+    def synth(txt, lang, mode, stream=False, budget=None):
+        calls.append(stream)
+        bodies.append(_Body([b"ab", b"cd", b"ef"]))
+        return bodies[-1], [{"time": 0, "value": "a"}]
+    key = main._tts_key("shared stream test", "en", None)
+
+    async def run():
+        first = await main._stream_audio(key, synth, "shared stream test", "en", None, "TTS", "s1")
+        second = await main._stream_audio(key, synth, "shared stream test", "en", None, "TTS", "s2")
+        buffered = asyncio.ensure_future(main._synthesize_cached(key, synth, "shared stream test", "en", None, "TTS"))
+        audio = await asyncio.gather(_read(first), _read(second))
+        return audio, await buffered, first.headers["X-Visemes"]
+    audio, (full, marks), visemes = asyncio.run(run())
+    assert calls == [True]
+    assert audio == [b"abcdef", b"abcdef"] and full == b"abcdef"
+    assert visemes == "0:a" and bodies[0].closed
+    assert main._tts_cache_get(key) == (b"abcdef", marks)
+    assert key not in main._tts_tees
+
+def test_mid_stream_failure_is_recorded_against_the_region(main):
+    client = SimpleNamespace(meta=SimpleNamespace(region_name="test-region-1"))
+    stream = main._RegionStream(_Body([b"ab"], fail=True), client)
+    before = main._polly_regions.snapshot().get("test-region-1", {}).get("failures", 0)
+    with pytest.raises(ConnectionError):
+        list(stream.iter_chunks())
+    assert main._polly_regions.snapshot()["test-region-1"]["failures"] == before + 1
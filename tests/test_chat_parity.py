@@ -0,0 +1,67 @@
+"""The FastAPI app and the Vercel handler give the same local answers.
+
+Time replies contain "HH:MM", which the Vercel path used to cut at the colon
+as if it were a "Name:" speaker tag ("It's 02:56 PM." became "56 PM.").
+"""
+import functools, importlib, importlib.util, io, json, os
+from datetime import datetime
+
+import pytest
+
+from app import intents
+from app.utils import enforce_identity
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+NOW = datetime(2026, 3, 14, 14, 56)
+TIME_QUERIES = ["what time is it", "que horas são", "wie spät ist es", "quelle heure est-il", "कितने बजे हैं"]
+
+class _FrozenDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return NOW
+
+@pytest.fixture(autouse=True)
+def frozen_clock(monkeypatch):
+    monkeypatch.setattr(intents, "datetime", _FrozenDatetime)
+
+def _vercel_chat(text: str) -> str:
+    spec = importlib.util.spec_from_file_location("api_chat", os.path.join(ROOT, "api", "chat.py"))
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    body = json.dumps({"text": text, "session_id": "parity"}).encode()
+    h = mod.handler.__new__(mod.handler)
+    h.rfile, h.wfile = io.BytesIO(body), io.BytesIO()
+    h.headers = {"Content-Length": str(len(body)), "Content-Type": "application/json"}
+    h.command, h.path, h.request_version, h.requestline = "POST", "/api/chat", "HTTP/1.1", "POST /api/chat"
+    h.client_address, h.close_connection = ("127.0.0.1", 0), True
+    h.log_message = lambda *a: None
+    h.do_POST()
+    return json.loads(h.wfile.getvalue().split(b"\r\n\r\n", 1)[1])["reply"]
+
+@pytest.mark.parametrize("text", TIME_QUERIES)
+def test_vercel_time_reply_is_the_rendered_intent(text):
+    expected = intents.IntentRouter().answer(text)
+    assert expected
+    assert _vercel_chat(text) == expected
+
+@pytest.mark.parametrize("text", TIME_QUERIES)
+def test_fastapi_and_vercel_time_replies_match(text, monkeypatch):
+    testclient = pytest.importorskip("fastapi.testclient")
+    from fastapi import staticfiles
+    # app/static is provisioned at deploy time; the mount need not find it here
+    monkeypatch.setattr(staticfiles, "StaticFiles", functools.partial(staticfiles.StaticFiles, check_dir=False))
+    # The app imports its siblings top-level, as when uvicorn runs from app/
+    monkeypatch.syspath_prepend(os.path.join(ROOT, "app"))
+    main = importlib.import_module("main")
+    monkeypatch.setattr(importlib.import_module("intents"), "datetime", _FrozenDatetime)
+    r = testclient.TestClient(main.app).post("/api/chat", json={"text": text, "session_id": "parity"})
+    assert r.status_code == 200
+    assert r.json()["reply"] == _vercel_chat(text)
+
+@pytest.mark.parametrize("text", ["It's 02:56 PM.", "São 14:56.", "Es ist 14:56 Uhr.", "Meet me at 9:30 tomorrow."])
+def test_enforce_identity_keeps_clock_times(text):
+    assert enforce_identity(text) == text
+
+def test_enforce_identity_still_strips_speaker_tags():
+    assert enforce_identity("Rem: Hi there!") == "Hi there!"
+    assert enforce_identity("Assistant:Sure, 10:30 works.") == "Sure, 10:30 works."
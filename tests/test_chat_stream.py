@@ -0,0 +1,60 @@
+"""A chat stream cut off by the client keeps the session's roles alternating."""
+import asyncio, functools, importlib, os
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def main(monkeypatch):
+    pytest.importorskip("fastapi")
+    pytest.importorskip("boto3")
+    from fastapi import staticfiles
+    monkeypatch.setattr(staticfiles, "StaticFiles", functools.partial(staticfiles.StaticFiles, check_dir=False))
+    monkeypatch.syspath_prepend(os.path.join(ROOT, "app"))
+    return importlib.import_module("main")
+
+class _Request:
+    async def is_disconnected(self):
+        return False
+
+def _disconnect_after(main, monkeypatch, sid, tokens):
+    """Run one chat_stream for ``sid`` and cancel it once ``tokens`` have been read."""
+    async def bedrock(model, system, messages, style, usage, on_open=None):
+        for t in tokens:
+            yield t
+        await asyncio.sleep(10)   # the model is still thinking when the client leaves
+    monkeypatch.setattr(main, "_stream_bedrock_text", bedrock)
+
+    async def run():
+        payload = main.ChatStreamIn(text="tell me about rivers and lakes", session_id=sid)
+        response = await main.chat_stream(payload, _Request())
+        body = response.body_iterator
+        frames = []
+        async def read():
+            async for frame in body:
+                frames.append(frame)
+        reader = asyncio.ensure_future(read())
+        await asyncio.sleep(0.05)
+        reader.cancel()
+        await asyncio.gather(reader, return_exceptions=True)
+        return frames
+    return asyncio.run(run())
+
+def _roles(main, sid):
+    return [t.role for t in main._history.window(sid, 10 ** 6).turns]
+
+def test_disconnect_before_first_delta_records_nothing(main, monkeypatch):
+    sid = "stream-cut-early"
+    main.add_turn(sid, "user", "hi")
+    main.add_turn(sid, "assistant", "Hey there!")
+    assert _disconnect_after(main, monkeypatch, sid, []) == []
+    main.add_turn(sid, "user", "are you there?")
+    assert _roles(main, sid) == ["user", "assistant", "user"]
+
+def test_disconnect_mid_reply_keeps_the_partial_exchange(main, monkeypatch):
+    sid = "stream-cut-late"
+    frames = _disconnect_after(main, monkeypatch, sid, ["Rivers are ", "long. ", "Lakes are "])
+    assert frames
+    assert _roles(main, sid) == ["user", "assistant"]
+    assert main._history.turns(sid)[-1].text.endswith("…")
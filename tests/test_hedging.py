@@ -0,0 +1,106 @@
+"""Hedged requests: adaptive delay, credit budget, gate slots and loser cleanup."""
+import asyncio
+
+from app.concurrency import AdaptiveGate
+from app.hedging import Hedger
+
+def _warm(h, n=20, latency=0.0):
+    h._lat.extend([latency] * n)
+
+def test_no_hedging_until_enough_samples():
+    h = Hedger(enabled=True, min_samples=5, min_delay=0.01)
+    assert h.delay() is None
+    _warm(h, 5, 0.05)
+    assert h.delay() == 0.05
+    h._lat.clear(); _warm(h, 5, 0.0)
+    assert h.delay() == 0.01   # never below min_delay
+
+def test_slow_primary_is_hedged_and_the_loser_is_cancelled():
+    h = Hedger(enabled=True, budget_ratio=1.0, min_delay=0.01)
+    _warm(h)
+    calls, cancelled = [], []
+    async def start():
+        n = len(calls)
+        calls.append(n)
+        try:
+            await asyncio.sleep(1.0 if n == 0 else 0.01)
+        except asyncio.CancelledError:
+            cancelled.append(n)
+            raise
+        return n
+    async def run():
+        result = await h.run(start)
+        await asyncio.sleep(0)
+        return result
+    assert asyncio.run(run()) == 1
+    assert cancelled == [0]
+    assert (h.hedged, h.hedge_wins) == (1, 1)
+
+def test_hedges_are_limited_by_the_credit_budget():
+    h = Hedger(enabled=True, budget_ratio=0.5, min_delay=0.005)
+    _warm(h, 100)   # keep the adaptive delay at min_delay throughout
+    async def start():
+        await asyncio.sleep(0.02)
+        return "ok"
+    async def run():
+        for _ in range(4):
+            await h.run(start)
+    asyncio.run(run())
+    # 0.5 credit per request: a hedge on every second request at most
+    assert h.hedged == 2 and h.denied == 2
+
+def test_saturated_gate_means_no_hedge_and_no_spent_credit():
+    h = Hedger(enabled=True, budget_ratio=1.0, min_delay=0.005)
+    _warm(h)
+    async def run():
+        gate = AdaptiveGate("t", 1, max_limit=1)
+        assert await gate.acquire()
+        result = await h.run(lambda: asyncio.sleep(0.02, "primary"), gate=gate)
+        return result, gate
+    result, gate = asyncio.run(run())
+    assert result == "primary"
+    assert (h.hedged, h.saturated) == (0, 1) and h._credit == 1.0
+    assert gate.in_use == 1
+
+def test_hedge_gate_slot_is_returned():
+    h = Hedger(enabled=True, budget_ratio=1.0, min_delay=0.005)
+    _warm(h)
+    async def run():
+        gate = AdaptiveGate("t", 2, max_limit=2)
+        assert await gate.acquire()   # the primary's slot, held by the caller
+        await h.run(lambda: asyncio.sleep(0.02, "x"), gate=gate)
+        await asyncio.sleep(0.03)
+        return gate
+    gate = asyncio.run(run())
+    assert h.hedged == 1 and gate.in_use == 1
+
+def test_simultaneous_finish_discards_the_spare_result():
+    h = Hedger(enabled=True, budget_ratio=1.0, min_delay=0.005)
+    _warm(h)
+    discarded = []
+    async def run():
+        release = asyncio.Event()
+        async def start():
+            await release.wait()
+            return object()
+        async def go():
+            return await h.run(start, discard=discarded.append)
+        task = asyncio.ensure_future(go())
+        await asyncio.sleep(0.02)   # primary and hedge are both waiting now
+        release.set()
+        return await task
+    winner = asyncio.run(run())
+    assert h.hedged == 1 and len(discarded) == 1 and discarded[0] is not winner
+
+def test_failed_attempt_falls_back_to_the_other():
+    h = Hedger(enabled=True, budget_ratio=1.0, min_delay=0.005)
+    _warm(h)
+    calls = []
+    async def start():
+        calls.append(1)
+        if len(calls) == 1:
+            await asyncio.sleep(0.02)
+            raise RuntimeError("throttled")
+        await asyncio.sleep(0.03)
+        return "hedge"
+    assert asyncio.run(h.run(start)) == "hedge"
@@ -0,0 +1,29 @@
+"""Intent router stats: unmatched messages are counted, never published as text."""
+import json
+
+from app.intents import IntentRouter, miss_id
+
+def test_misses_are_published_as_ids_only():
+    r = IntentRouter()
+    for _ in range(3):
+        r.answer("my password is hunter2")
+    st = r.stats()
+    assert st["top_misses"] == {miss_id("My password is hunter2!"): 3}
+    assert "hunter2" not in json.dumps(st)
+
+def test_long_messages_and_matches_are_not_candidates():
+    r = IntentRouter()
+    r.answer("what time is it")
+    r.answer("tell me a very long story about rivers")
+    assert r.stats()["miss_candidates"] == 0
+
+def test_new_misses_replace_the_rarest_when_full():
+    r = IntentRouter(max_candidates=3)
+    for text, n in (("alpha", 5), ("beta", 4), ("gamma", 1)):
+        for _ in range(n):
+            r.answer(text)
+    for _ in range(3):
+        r.answer("delta")
+    top = r.stats()["top_misses"]
+    assert len(top) == 3 and miss_id("gamma") not in top
+    assert top[miss_id("delta")] == 4   # inherits gamma's count, then its own
@@ -0,0 +1,35 @@
+"""Short English must never be routed to a foreign voice.
+
+Sentence-length fixtures (bench/fixtures/lang_detect.tsv) score well in
+aggregate while one- and two-word replies used to come out confidently
+wrong ("Cool" -> pt, "Bye" -> pl).
+"""
+import pytest
+
+from app.lang_detect import classify, detect, detect_batch
+
+SHORT_ENGLISH = ["Cool", "Bye", "No problem", "Perfect", "Sentence 1", "la la la sing along",
+                 "Okay", "Sounds good", "Great job", "Nice", "Wow", "Awesome", "Tell me a joke"]
+
+@pytest.mark.parametrize("text", SHORT_ENGLISH)
+def test_short_english_is_english_or_undecided(text):
+    assert classify(text).lang in (None, "en")
+    assert detect(text, "en") == "en"
+
+def test_short_english_batch():
+    assert detect_batch(SHORT_ENGLISH, "en") == ["en"] * len(SHORT_ENGLISH)
+
+@pytest.mark.parametrize("text, lang", [
+    ("Hola", "es"), ("Gracias", "es"), ("Bonjour", "fr"), ("Merci beaucoup", "fr"), ("Danke schön", "de"),
+    ("Ciao", "it"), ("Obrigado", "pt"), ("kya haal hai", "hi"), ("Dzień dobry", "pl"), ("你好", "zh"),
+])
+def test_short_text_with_real_evidence_is_still_detected(text, lang):
+    assert detect(text) == lang
+
+@pytest.mark.parametrize("text, lang", [
+    ("Can you remind me to call my mother tomorrow morning?", "en"),
+    ("¿Puedes recordarme que llame a mi madre mañana por la mañana?", "es"),
+    ("Tu peux me rappeler d'appeler ma mère demain matin ?", "fr"),
+])
+def test_sentences(text, lang):
+    assert detect(text) == lang
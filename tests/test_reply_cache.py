@@ -0,0 +1,71 @@
+"""Reply cache: keyed by persona, style, history and normalized text.
+
+A key only serves hits once it holds ``variants`` distinct replies, so a
+repeated greeting is not answered identically every time.
+"""
+import asyncio, functools, importlib, os, time
+
+import pytest
+
+from app.reply_cache import ReplyCache
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_key_ignores_case_and_punctuation_but_not_context():
+    c = ReplyCache()
+    k = c.key("persona", "calm", [], "Hi there!")
+    assert k == c.key("persona", "calm", [], "  hi   THERE ")
+    assert k != c.key("persona", "playful", [], "hi there")
+    assert k != c.key("other persona", "calm", [], "hi there")
+    assert k != c.key("persona", "calm", [{"role": "user", "content": "yo"}], "hi there")
+
+def test_long_or_empty_prompts_are_not_cached():
+    c = ReplyCache(max_chars=20)
+    assert c.key("p", None, [], "?!") is None
+    assert c.key("p", None, [], "x" * 21) is None
+    assert c.get(None) is None
+
+def test_hits_only_once_the_variant_pool_is_full():
+    c = ReplyCache(variants=2)
+    k = c.key("p", None, [], "hello")
+    c.put(k, "Hey!")
+    c.put(k, "Hey!")   # duplicates do not count
+    assert c.get(k) is None
+    c.put(k, "Hi there!")
+    assert c.get(k) in ("Hey!", "Hi there!")
+    c.put(k, "A third one")   # pool is full
+    assert {c.get(k) for _ in range(50)} <= {"Hey!", "Hi there!"}
+
+def test_expired_entries_miss():
+    c = ReplyCache(variants=1, ttl=0.01)
+    k = c.key("p", None, [], "hello")
+    c.put(k, "Hey!")
+    time.sleep(0.02)
+    assert c.get(k) is None
+
+def test_least_recently_used_key_is_evicted():
+    c = ReplyCache(max_keys=2, variants=1)
+    a, b, d = (c.key("p", None, [], t) for t in ("a", "b", "d"))
+    c.put(a, "A"); c.put(b, "B")
+    assert c.get(a) == "A"   # a is now more recent than b
+    c.put(d, "D")
+    assert c.get(b) is None and c.get(a) == "A" and c.get(d) == "D"
+    assert c.stats()["evictions"] == 1
+
+def test_chat_serves_a_cached_reply_without_spending_a_rate_token(monkeypatch):
+    pytest.importorskip("fastapi")
+    pytest.importorskip("boto3")
+    from fastapi import staticfiles
+    monkeypatch.setattr(staticfiles, "StaticFiles", functools.partial(staticfiles.StaticFiles, check_dir=False))
+    monkeypatch.syspath_prepend(os.path.join(ROOT, "app"))
+    main = importlib.import_module("main")
+    sid, text = "cached-chat", "how is the weather up there"
+    system = main._compose_system(main.PERSONA_BLESSED_BOY, None)
+    _, _, key = main._reply_prompt(system, sid, text)
+    for reply in ("Sunny!", "Breezy.", "Cloudy, a bit."):
+        main._reply_cache.put(key, reply)
+    with pytest.raises(main.Overloaded):
+        for _ in range(100):
+            main._chat_gate.admit(sid)   # this session's bucket is now empty
+    out = asyncio.run(main.chat(main.ChatIn(text=text, session_id=sid)))
+    assert out["reply"] in ("Sunny!", "Breezy.", "Cloudy, a bit.")
@@ -0,0 +1,97 @@
+"""Fair admission: priority classes, starvation promotion, per-session round-robin,
+rate limits and overflow errors."""
+import asyncio
+
+import pytest
+
+from app.scheduler import CHAT, SING, SPEECH, FairGate, Overloaded
+
+def _order(gate, requests):
+    """Queue ``(session, priority)`` waiters behind a held slot; return the order they get in."""
+    async def run():
+        served = []
+        assert await gate.acquire()
+        async def waiter(session, priority):
+            assert await gate.acquire(timeout=1, session=session, priority=priority)
+            served.append(session)
+            await asyncio.sleep(0)
+            gate.release()
+        tasks = []
+        for session, priority in requests:
+            tasks.append(asyncio.ensure_future(waiter(session, priority)))
+            await asyncio.sleep(0)
+        gate.release()
+        await asyncio.gather(*tasks)
+        return served
+    return asyncio.run(run())
+
+def test_sessions_take_turns_within_a_class():
+    gate = FairGate("t", 1, max_limit=1, max_queue_per_session=8)
+    order = _order(gate, [("a", SPEECH)] * 3 + [("b", SPEECH), ("c", SPEECH)])
+    assert order == ["a", "b", "c", "a", "a"]
+
+def test_higher_classes_are_served_first():
+    gate = FairGate("t", 1, max_limit=1)
+    order = _order(gate, [("sing", SING), ("tts", SPEECH), ("chat", CHAT)])
+    assert order == ["chat", "tts", "sing"]
+
+def test_starving_waiter_is_promoted_past_higher_classes():
+    gate = FairGate("t", 1, max_limit=1, starve_after=(0.0, 5.0, 5.0, 0.05))
+    async def run():
+        served = []
+        assert await gate.acquire()
+        async def waiter(session, priority):
+            assert await gate.acquire(timeout=1, session=session, priority=priority)
+            served.append(session)
+            gate.release()
+        sing = asyncio.ensure_future(waiter("sing", SING))
+        await asyncio.sleep(0.06)   # sing has now waited longer than its starve_after
+        chat = asyncio.ensure_future(waiter("chat", CHAT))
+        await asyncio.sleep(0)
+        gate.release()
+        await asyncio.gather(sing, chat)
+        return served
+    assert asyncio.run(run()) == ["sing", "chat"]
+    assert gate.stats()["starvation_promotions"] == 1
+
+def test_token_bucket_allows_a_burst_then_retry_after():
+    gate = FairGate("t", 1, rate=0.5, burst=2)
+    gate.admit("a"); gate.admit("a")
+    with pytest.raises(Overloaded) as e:
+        gate.admit("a")
+    assert e.value.reason == "rate"
+    assert 1.9 < e.value.retry_after <= 2.0
+    assert e.value.headers == {"Retry-After": "2"}
+    gate.admit("b")   # other sessions have their own bucket
+    assert gate.stats()["rejected_rate"] == 1
+
+def test_queue_overflow_fails_fast_per_session_and_overall():
+    async def run():
+        gate = FairGate("t", 1, max_limit=1, max_queue_per_session=1, max_queue=2)
+        assert await gate.acquire()
+        pending = [asyncio.ensure_future(gate.acquire(timeout=1, session="a"))]
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as per_session:
+            await gate.acquire(timeout=1, session="a")
+        pending.append(asyncio.ensure_future(gate.acquire(timeout=1, session="b")))
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as overall:
+            await gate.acquire(timeout=1, session="c")
+        for t in pending:
+            t.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        return gate, per_session.value, overall.value
+    gate, per_session, overall = asyncio.run(run())
+    assert per_session.reason == overall.reason == "queue"
+    assert overall.retry_after >= 1.0 and int(overall.headers["Retry-After"]) >= 1
+    assert gate.stats()["rejected_queue"] == 2 and gate.waiting == 0
+
+def test_timed_out_waiter_leaves_the_queue():
+    async def run():
+        gate = FairGate("t", 1, max_limit=1)
+        assert await gate.acquire()
+        assert not await gate.acquire(timeout=0.01, session="a", priority=SPEECH)
+        return gate
+    gate = asyncio.run(run())
+    st = gate.stats()
+    assert gate.waiting == 0 and st["queued_sessions"] == 0 and st["timeouts"]["speech"] == 1
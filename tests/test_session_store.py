@@ -0,0 +1,57 @@
+"""Session memory: budgeted prompt windows and the turns left to summarize."""
+from app.session_store import SessionStore, estimate_tokens
+
+def _fill(store, sid, n, start=0):
+    for i in range(start, start + n):
+        store.append(sid, "user" if i % 2 == 0 else "assistant", f"turn {i} " + "x" * 40)
+
+def test_window_keeps_the_newest_turns_within_budget_starting_with_user():
+    s = SessionStore()
+    _fill(s, "a", 8)
+    per_turn = s.turns("a")[0].tokens
+    w = s.window("a", per_turn * 3)
+    # Three turns fit, but a window never opens on an assistant turn
+    assert [t.text.split()[1] for t in w.turns] == ["6", "7"]
+    assert w.turns[0].user
+    assert w.sent_tokens == per_turn * 2
+    assert w.history_tokens == per_turn * 8
+    assert [t.text.split()[1] for t in w.fold] == ["0", "1", "2", "3", "4", "5"]
+    assert w.fold_upto == 6
+
+def test_latest_exchange_is_kept_even_over_budget():
+    s = SessionStore()
+    _fill(s, "a", 4)
+    w = s.window("a", 1)
+    assert [t.text.split()[1] for t in w.turns] == ["2", "3"]
+
+def test_summary_covers_folded_turns_and_survives_trimming():
+    s = SessionStore(max_turns=6)
+    _fill(s, "a", 6)
+    per_turn = s.turns("a")[0].tokens
+    w = s.window("a", per_turn * 2)
+    s.set_summary("a", "they said hello", w.fold_upto)
+    _fill(s, "a", 2, start=6)   # turns 0 and 1 are trimmed
+    w = s.window("a", per_turn * 2)
+    assert w.summary == "they said hello"
+    # Only turns past the old summary and outside the window are left to fold
+    assert [t.text.split()[1] for t in w.fold] == ["4", "5"]
+    assert [t.text.split()[1] for t in w.turns] == ["6", "7"]
+    assert w.fold_upto == 6
+    assert w.sent_tokens == per_turn * 2 + estimate_tokens("they said hello")
+
+def test_stale_summary_is_ignored():
+    s = SessionStore()
+    _fill(s, "a", 6)
+    s.set_summary("a", "newer", 4)
+    s.set_summary("a", "older", 2)
+    assert s.window("a", 10 ** 6).summary == "newer"
+
+def test_idle_sessions_expire_and_byte_cap_evicts_lru():
+    s = SessionStore(idle_ttl=0)
+    _fill(s, "a", 2)
+    assert s.turns("a") == ()
+    s = SessionStore(max_bytes=2000)
+    for sid in ("a", "b", "c"):
+        _fill(s, sid, 4)
+    assert "c" in s.session_ids() and "a" not in s.session_ids()
+    assert s.stats()["bytes"] <= 2000 and s.stats()["evicted"] >= 1
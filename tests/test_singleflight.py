@@ -0,0 +1,65 @@
+"""Concurrent identical work runs once; a departing leader does not cancel it."""
+import asyncio
+
+import pytest
+
+from app.singleflight import SingleFlight
+
+def test_concurrent_callers_share_one_call():
+    calls = []
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "audio"
+    async def run():
+        sf = SingleFlight()
+        results = await asyncio.gather(*(sf.do("k", work) for _ in range(5)))
+        return sf, results
+    sf, results = asyncio.run(run())
+    assert results == ["audio"] * 5 and len(calls) == 1
+    assert sf.stats() == {"inflight": 0, "leaders": 1, "coalesced": 4}
+
+def test_keys_are_independent_and_forgotten_when_done():
+    async def run():
+        sf = SingleFlight()
+        a = await sf.do("a", lambda: asyncio.sleep(0, "A"))
+        b = await sf.do("b", lambda: asyncio.sleep(0, "B"))
+        again = await sf.do("a", lambda: asyncio.sleep(0, "A2"))
+        return a, b, again, sf
+    a, b, again, sf = asyncio.run(run())
+    assert (a, b, again) == ("A", "B", "A2")
+    assert not sf.inflight("a") and sf.leaders == 3
+
+def test_errors_reach_every_waiter():
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("polly down")
+    async def run():
+        sf = SingleFlight()
+        return await asyncio.gather(sf.do("k", fail), sf.do("k", fail), return_exceptions=True)
+    results = asyncio.run(run())
+    assert [type(r) for r in results] == [RuntimeError, RuntimeError]
+
+def test_cancelled_leader_does_not_cancel_followers():
+    async def work():
+        await asyncio.sleep(0.02)
+        return "done"
+    async def run():
+        sf = SingleFlight()
+        leader = asyncio.ensure_future(sf.do("k", work))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(sf.do("k", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await follower, leader
+    result, leader = asyncio.run(run())
+    assert result == "done" and leader.cancelled()
+
+def test_start_registers_synchronously():
+    async def run():
+        sf = SingleFlight()
+        task = sf.start("k", lambda: asyncio.sleep(0.01, "x"))
+        assert sf.inflight("k")
+        assert sf.start("k", None) is task
+        return await task
+    assert asyncio.run(run()) == "x"
@@ -0,0 +1,66 @@
+"""Spoken chat streams hand TTS frames back strictly in sentence order.
+
+Sentences are synthesized concurrently, so a short later sentence can finish
+before a long earlier one; the pipeline must still never skip ahead.
+"""
+import asyncio, functools, importlib, os
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def main(monkeypatch):
+    pytest.importorskip("fastapi")
+    pytest.importorskip("boto3")
+    from fastapi import staticfiles
+    monkeypatch.setattr(staticfiles, "StaticFiles", functools.partial(staticfiles.StaticFiles, check_dir=False))
+    monkeypatch.syspath_prepend(os.path.join(ROOT, "app"))
+    return importlib.import_module("main")
+
+def test_pop_sentences_keeps_the_unfinished_tail(main):
+    assert main._pop_sentences("Hi there. How are you? I was") == (["Hi there.", "How are you?"], "I was")
+    # Too short to be worth a Polly call on its own
+    assert main._pop_sentences("Ok. fine") == ([], "Ok. fine")
+
+def test_frames_come_back_in_order(main, monkeypatch):
+    async def synth(sentence, lang, mode, session="", limited=False):
+        await asyncio.sleep(0.05 if sentence.startswith("First") else 0.0)
+        if "fail" in sentence:
+            raise RuntimeError("boom")
+        return sentence.encode(), []
+    monkeypatch.setattr(main, "_tts_synthesize", synth)
+
+    async def run():
+        p = main._SpeechPipeline("en", None)
+        p.feed("First a long one. Second is ")
+        p.feed("short. This will fail. And the")
+        await asyncio.sleep(0.01)
+        early = p.ready()   # later sentences are done, the first is not
+        frames = early + [f async for f in p.drain()]
+        return early, frames
+    early, frames = asyncio.run(run())
+    assert early == []
+    assert [f["tts"]["seq"] for f in frames] == [0, 1, 2, 3]
+    assert [f["tts"]["text"] for f in frames] == ["First a long one.", "Second is short.", "This will fail.", "And the"]
+    assert "error" in frames[2]["tts"] and "audio_b64" not in frames[2]["tts"]
+    assert all("audio_b64" in f["tts"] for i, f in enumerate(frames) if i != 2)
+
+def test_cancel_stops_pending_synthesis(main, monkeypatch):
+    started = []
+    async def synth(sentence, lang, mode, session="", limited=False):
+        started.append(sentence)
+        await asyncio.sleep(10)
+    monkeypatch.setattr(main, "_tts_synthesize", synth)
+
+    async def run():
+        p = main._SpeechPipeline("en", None)
+        p.feed("One more thing here. ")
+        await asyncio.sleep(0)
+        tasks = list(p.pending)
+        p.cancel()
+        await asyncio.sleep(0)
+        return tasks, p
+    tasks, p = asyncio.run(run())
+    assert started == ["One more thing here."]
+    assert all(t.cancelled() for t in tasks) and not p.pending
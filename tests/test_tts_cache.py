@@ -0,0 +1,74 @@
+"""TTS cache: byte budget, LRU order and frequency-based (TinyLFU) admission."""
+import time
+
+from app.tts_cache import TTSCache, _entry_size
+
+AUDIO = b"x" * 1000
+ENTRY = _entry_size(AUDIO, [])
+
+def test_round_trip_and_stats():
+    c = TTSCache()
+    assert c.get("a") is None
+    assert c.put("a", AUDIO, [{"time": 0, "value": "sil"}])
+    assert c.get("a") == (AUDIO, [{"time": 0, "value": "sil"}])
+    st = c.stats()
+    assert (st["entries"], st["hits"], st["misses"], st["bytes"]) == (1, 1, 1, ENTRY + 64)
+
+def test_byte_budget_evicts_least_recently_used():
+    c = TTSCache(max_bytes=ENTRY * 3)
+    for k in "abc":
+        c.get(k); c.put(k, AUDIO, [])
+    c.get("a")   # a is hot and recent; b is now the LRU entry
+    c.get("d"); c.get("d")
+    assert c.put("d", AUDIO, [])
+    assert c.get("b") is None and c.get("a") and c.get("d")
+    assert c.stats()["bytes"] <= c.max_bytes and c.stats()["evictions"] == 1
+
+def test_one_off_entry_cannot_push_out_a_popular_one():
+    c = TTSCache(max_bytes=ENTRY * 2)
+    for k in "ab":
+        for _ in range(5):
+            c.get(k)
+        c.put(k, AUDIO, [])
+    assert not c.put("once", AUDIO, [])
+    assert c.get("a") and c.get("b")
+    assert c.stats()["rejected"] == 1
+
+def test_oversized_entries_are_refused():
+    c = TTSCache(max_bytes=ENTRY - 1)
+    assert not c.put("a", AUDIO, [])
+    assert c.stats()["bytes"] == 0
+
+def test_rejected_refresh_keeps_the_cached_entry():
+    c = TTSCache(max_bytes=ENTRY * 2)
+    for k in "ab":
+        for _ in range(5):
+            c.get(k)
+        c.put(k, AUDIO, [])
+    assert not c.put("a", b"y" * (ENTRY * 2), [])
+    assert c.get("a") == (AUDIO, [])
+
+def test_expired_entries_are_evicted_first_and_swept():
+    c = TTSCache(max_bytes=ENTRY * 2)
+    for _ in range(5):
+        c.get("old")
+    c.put("old", AUDIO, [], ttl=-1)
+    c.put("live", AUDIO, [])
+    assert c.put("new", AUDIO, [])   # the expired entry is fair game despite its frequency
+    assert c.get("old") is None
+    c = TTSCache()
+    c.put("gone", AUDIO, [], ttl=0.001)
+    c.put("kept", AUDIO, [])
+    time.sleep(0.01)
+    assert c.sweep() == 1
+    assert c.stats()["entries"] == 1 and c.stats()["bytes"] == ENTRY
+
+def test_replace_marks_only_swaps_the_expected_list():
+    c = TTSCache()
+    local = [{"time": 0, "value": "a"}]
+    c.put("a", AUDIO, local)
+    exact = [{"time": 0, "value": "p"}, {"time": 50, "value": "a"}]
+    assert not c.replace_marks("a", list(local), exact)   # not the list that was cached
+    assert c.replace_marks("a", local, exact)
+    assert c.get("a") == (AUDIO, exact) and local == [{"time": 0, "value": "a"}]
+    assert c.stats()["bytes"] == ENTRY + 128